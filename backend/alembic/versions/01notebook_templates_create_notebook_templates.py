@@ -0,0 +1,43 @@
+"""Create notebook templates metadata index
+
+Revision ID: 01notebook_templates
+Revises: 00base_tables
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '01notebook_templates'
+down_revision: Union[str, None] = '00base_tables'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Parsed metadata of notebook templates, keyed by storage path and ETag
+    op.create_table(
+        'notebook_templates',
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('etag', sa.String(), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('last_modified', sa.DateTime(), nullable=True),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('tags', sa.JSON(), nullable=True),
+        sa.Column('python_version', sa.String(), nullable=True),
+        sa.Column('requirements', sa.JSON(), nullable=True),
+        sa.Column('parameters', sa.JSON(), nullable=True),
+        sa.Column('resources', sa.JSON(), nullable=True),
+        sa.Column('indexed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('path')
+    )
+    op.create_index(op.f('ix_notebook_templates_path'), 'notebook_templates', ['path'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_notebook_templates_path'), table_name='notebook_templates')
+    op.drop_table('notebook_templates')
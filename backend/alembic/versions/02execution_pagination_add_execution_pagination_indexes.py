@@ -0,0 +1,30 @@
+"""Add indexes for paginated execution listing
+
+Revision ID: 02execution_pagination
+Revises: 01notebook_templates
+Create Date: 2026-10-17 11:04:27.506913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '02execution_pagination'
+down_revision: Union[str, None] = '01notebook_templates'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination on (created_at, id) and the per-owner filters of GET /executions
+    op.create_index('ix_executions_created_at_id', 'executions', ['created_at', 'id'], unique=False)
+    op.create_index('ix_executions_user_id_created_at', 'executions', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_executions_service_account_id_created_at', 'executions', ['service_account_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_executions_service_account_id_created_at', table_name='executions')
+    op.drop_index('ix_executions_user_id_created_at', table_name='executions')
+    op.drop_index('ix_executions_created_at_id', table_name='executions')
@@ -0,0 +1,54 @@
+"""Store notebook identity on executions
+
+Existing executions are only backfilled from the notebook template index. On a
+database upgraded straight from the baseline that index is still empty; the
+rest is filled from storage by scripts/backfill_execution_notebook_identity.py,
+which docker-entrypoint.sh runs after the migrations. Run it by hand after an
+`alembic upgrade` outside the container.
+
+Revision ID: 03execution_notebook_identity
+Revises: 02execution_pagination
+Create Date: 2026-10-17 12:31:08.774150
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '03execution_notebook_identity'
+down_revision: Union[str, None] = '02execution_pagination'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('executions', sa.Column('notebook_name', sa.String(), nullable=True))
+    op.add_column('executions', sa.Column('notebook_description', sa.String(), nullable=True))
+    op.add_column('executions', sa.Column('notebook_tags', sa.JSON(), nullable=True))
+
+    # Backfill from the notebook template index; executions of templates that were
+    # never indexed (all of them when upgrading from the baseline) are filled by
+    # scripts/backfill_execution_notebook_identity.py
+    op.execute(
+        """
+        UPDATE executions
+        SET notebook_name = (
+                SELECT name FROM notebook_templates WHERE notebook_templates.path = executions.notebook_path
+            ),
+            notebook_description = (
+                SELECT description FROM notebook_templates WHERE notebook_templates.path = executions.notebook_path
+            ),
+            notebook_tags = (
+                SELECT tags FROM notebook_templates WHERE notebook_templates.path = executions.notebook_path
+            )
+        WHERE notebook_path IN (SELECT path FROM notebook_templates)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('executions', 'notebook_tags')
+    op.drop_column('executions', 'notebook_description')
+    op.drop_column('executions', 'notebook_name')
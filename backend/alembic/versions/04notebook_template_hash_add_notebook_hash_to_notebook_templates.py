@@ -0,0 +1,26 @@
+"""Add notebook hash to notebook templates
+
+Revision ID: 04notebook_template_hash
+Revises: 03execution_notebook_identity
+Create Date: 2026-10-17 14:02:55.410736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '04notebook_template_hash'
+down_revision: Union[str, None] = '03execution_notebook_identity'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Output-stripped notebook hash used for duplicate detection, valid for the stored ETag
+    op.add_column('notebook_templates', sa.Column('notebook_hash', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notebook_templates', 'notebook_hash')
@@ -0,0 +1,40 @@
+"""Create execution queue
+
+Revision ID: 05execution_queue
+Revises: 04notebook_template_hash
+Create Date: 2026-10-17 16:21:08.532914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '05execution_queue'
+down_revision: Union[str, None] = '04notebook_template_hash'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Executions waiting for a warm-pool runner worker
+    op.create_table(
+        'execution_queue',
+        sa.Column('execution_id', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('notebook_content', sa.LargeBinary(), nullable=True),
+        sa.Column('enqueued_at', sa.DateTime(), nullable=False),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('claimed_by', sa.String(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['execution_id'], ['executions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('execution_id')
+    )
+    op.create_index('ix_execution_queue_claimed_at_enqueued_at', 'execution_queue', ['claimed_at', 'enqueued_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_execution_queue_claimed_at_enqueued_at', table_name='execution_queue')
+    op.drop_table('execution_queue')
@@ -0,0 +1,28 @@
+"""Add requirements lock to executions
+
+Revision ID: 06requirements_lock
+Revises: 05execution_queue
+Create Date: 2026-10-17 19:52:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '06requirements_lock'
+down_revision: Union[str, None] = '05execution_queue'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Exact versions of the requirements resolved when the execution was submitted
+    op.add_column('executions', sa.Column('requirements_lock', sa.JSON(), nullable=True))
+    op.add_column('executions', sa.Column('requirements_lock_hash', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('executions', 'requirements_lock_hash')
+    op.drop_column('executions', 'requirements_lock')
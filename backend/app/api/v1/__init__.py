@@ -1,7 +1,7 @@
-from . import auth, notebooks, executions, health, service_accounts, users, static
+from . import auth, notebooks, executions, health, service_accounts, users, static, runner_pool
 from fastapi import APIRouter
 
-__all__ = ["notebooks", "executions", "health", "service_accounts", "users", "static"]
+__all__ = ["notebooks", "executions", "health", "service_accounts", "users", "static", "runner_pool"]
 
 api_router = APIRouter()
 api_router.include_router(notebooks.router, tags=["notebooks"])
@@ -10,4 +10,5 @@ api_router.include_router(health.router, tags=["health"])
 api_router.include_router(auth.router, tags=["auth"], prefix="/auth")
 api_router.include_router(service_accounts.router, tags=["service-accounts"])
 api_router.include_router(users.router, tags=["users"])
-api_router.include_router(static.router, tags=["static"]) 
\ No newline at end of file
+api_router.include_router(static.router, tags=["static"])
+api_router.include_router(runner_pool.router, tags=["runner-pool"]) 
\ No newline at end of file
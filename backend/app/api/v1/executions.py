@@ -1,25 +1,32 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Header, Query
-from typing import Dict, Optional, List, Any, Union
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Header, Query, Response
+from typing import Dict, Optional, List, Any, Tuple, Union
 from pydantic import BaseModel
 from app.core.config import get_settings
 import logging
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.services.execution_service import ExecutionService
+from app.services.requirements_resolver import RequirementsResolutionError
 from app.db.session import get_db
 from app.schemas.execution import (
     ExecutionCreate,
     ExecutionResponse,
     ExecutionStatusUpdate,
     ExecutionCreateResponse,
-    DuplicateExecutionResponse
+    DuplicateExecutionResponse,
+    ExecutionCancelRequest,
+    ExecutionCancelResponse,
+    ExecutionBatchCreate,
+    ExecutionBatchResponse
 )
 from app.models.execution import Execution
 from uuid import UUID
 from app.crud import execution as crud
+from app.crud.execution import decode_cursor
 from app.models.user import User
 from app.models.service_account import ServiceAccount
 from app.api import deps
+from app.api.v1.static import deliver_object, parse_storage_path
 from fastapi import status
 
 logger = logging.getLogger(__name__)
@@ -27,10 +34,31 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 settings = get_settings()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 def get_execution_service(db: Session = Depends(get_db)) -> ExecutionService:
     """Dependency to get execution service"""
     return ExecutionService(db)
 
+def execution_owner(current_principal: Union[User, ServiceAccount]) -> Tuple[Optional[str], Optional[str]]:
+    """(user_id, service_account_id) of new executions; service accounts need the create_execution permission"""
+    if isinstance(current_principal, ServiceAccount):
+        if not current_principal.permissions.get("create_execution", False):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="This service account does not have permission to create executions"
+            )
+        return None, current_principal.id
+    return current_principal.id, None
+
+def effective_force_rerun(current_principal: Union[User, ServiceAccount], force_rerun: Optional[bool],
+                          check_duplicate: bool) -> bool:
+    """Whether to skip duplicate detection"""
+    # For API executions, always force rerun unless explicitly set to False
+    if isinstance(current_principal, ServiceAccount) and force_rerun is None:
+        return True
+    return bool(force_rerun) or not check_duplicate
+
 @router.post("/executions/check-duplicate", response_model=DuplicateExecutionResponse, 
              summary="Check for duplicate executions",
              description="Check if a notebook execution with the same notebook and parameters already exists.")
@@ -79,34 +107,12 @@ async def create_execution(
     current_principal: Union[User, ServiceAccount] = Depends(deps.get_current_user_or_service_account)
 ):
     """Create a new notebook execution"""
-    # Check if this is a service account or a user
-    user_id = None
-    service_account_id = None
-    # Whether to force rerun and skip duplicate checks
-    api_execution = False
-    
-    if isinstance(current_principal, User):
-        user_id = current_principal.id
-    elif isinstance(current_principal, ServiceAccount):
-        # For service accounts, check permission
-        if not current_principal.permissions.get("create_execution", False):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="This service account does not have permission to create executions"
-            )
-        service_account_id = current_principal.id
-        # Mark as API execution for force_rerun logic below
-        api_execution = True
+    user_id, service_account_id = execution_owner(current_principal)
     
     # Log the force_rerun and check_duplicate flags
     logger.info(f"Execution request - force_rerun: {execution.force_rerun}, check_duplicate: {check_duplicate}")
     
-    # For API executions, always force rerun unless explicitly set to False
-    if api_execution and execution.force_rerun is None:
-        force_rerun = True
-    else:
-        force_rerun = execution.force_rerun or not check_duplicate
-    
+    force_rerun = effective_force_rerun(current_principal, execution.force_rerun, check_duplicate)
     logger.info(f"Effective force_rerun flag: {force_rerun}")
     
     try:
@@ -129,29 +135,103 @@ async def create_execution(
             is_duplicate=is_duplicate
         )
         return response
+    except RequirementsResolutionError as e:
+        logger.info(f"Rejected execution of {execution.notebook_path}: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to create execution: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/executions/batch", response_model=ExecutionBatchResponse,
+             summary="Create many executions of a notebook",
+             description="Execute a notebook once per parameter set, e.g. for a parameter sweep")
+async def create_executions(
+    batch: ExecutionBatchCreate,
+    check_duplicate: bool = Query(True, description="Whether to check for duplicates before creating the executions"),
+    service: ExecutionService = Depends(get_execution_service),
+    current_principal: Union[User, ServiceAccount] = Depends(deps.get_current_user_or_service_account)
+):
+    """
+    Create one execution per parameter set of a notebook.
+    
+    The notebook is loaded and hashed once for the whole batch, and the jobs are
+    created with bounded concurrency. Each parameter set gets its own result, so
+    a failed job or invalid parameters do not fail the other executions.
+    """
+    if len(batch.parameter_sets) > settings.EXECUTION_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can have at most {settings.EXECUTION_BATCH_MAX_ITEMS} parameter sets"
+        )
+    user_id, service_account_id = execution_owner(current_principal)
+    force_rerun = effective_force_rerun(current_principal, batch.force_rerun, check_duplicate)
+    
+    try:
+        results = await service.create_executions(
+            notebook_path=batch.notebook_path,
+            parameter_sets=batch.parameter_sets,
+            python_version=batch.python_version,
+            cpu_milli=batch.cpu_milli,
+            memory_mib=batch.memory_mib,
+            user_id=user_id,
+            service_account_id=service_account_id,
+            force_rerun=force_rerun
+        )
+        submitted = sum(1 for result in results if result["execution"] is not None
+                        and not result["is_duplicate"] and result["error"] is None)
+        return {"submitted": submitted, "results": results}
+    except RequirementsResolutionError as e:
+        logger.info(f"Rejected executions of {batch.notebook_path}: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to create executions: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/executions", response_model=List[ExecutionResponse])
 async def list_executions(
-    skip: int = 0, 
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     notebook_path: Optional[str] = None,
+    status: Optional[str] = None,
+    user_id: Optional[str] = None,
+    service_account_id: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
     service: ExecutionService = Depends(get_execution_service),
     current_user: User = Depends(deps.get_current_user),
 ):
     """
-    Retrieve executions with notebook metadata.
+    Retrieve executions with notebook metadata, newest first.
     
-    This endpoint returns executions enriched with notebook names.
+    This endpoint returns executions with the notebook names captured at submission.
+    Filtering and pagination are done in the database. When more executions are
+    available, the X-Next-Cursor response header holds the cursor of the next page;
+    pass it back as the cursor query parameter.
     """
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        # Use the service to get executions with notebook metadata
-        executions = await service.list_executions(notebook_path)
+        executions, next_cursor = await service.list_executions(
+            notebook_path,
+            limit=limit,
+            cursor=cursor,
+            skip=skip,
+            status=status,
+            user_id=user_id,
+            service_account_id=service_account_id,
+            created_after=created_after,
+            created_before=created_before
+        )
         
-        # Apply skip and limit after all metadata is added
-        return executions[skip:skip+limit]
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return executions
     except Exception as e:
         logger.error(f"Failed to list executions: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -284,6 +364,42 @@ async def cancel_execution(
         logger.error(f"Failed to cancel execution: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/executions/cancel", response_model=ExecutionCancelResponse)
+async def cancel_executions(
+    request: ExecutionCancelRequest,
+    service: ExecutionService = Depends(get_execution_service),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Cancel many executions at once, by ID and/or by filter.
+    
+    Only pending, submitted and running executions are cancelled, up to limit,
+    oldest first. Users other than admins can only cancel their own executions.
+    The result of each execution is returned instead of failing the request.
+    """
+    if not (request.execution_ids or request.notebook_path or request.status or request.created_before):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Give execution_ids or at least one filter"
+        )
+    
+    try:
+        results = await service.cancel_executions(
+            execution_ids=request.execution_ids,
+            notebook_path=request.notebook_path,
+            status=request.status,
+            user_id=None if current_user.is_superuser else current_user.id,
+            created_before=request.created_before,
+            limit=request.limit
+        )
+        return {
+            "cancelled": sum(1 for result in results if result["success"]),
+            "results": results
+        }
+    except Exception as e:
+        logger.error(f"Failed to cancel executions: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/executions/{execution_id}/logs")
 async def get_execution_logs(
     execution_id: str,
@@ -305,10 +421,18 @@ async def get_execution_logs(
 async def get_execution_output(
     execution_id: str,
     format: str = "html",
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
     service: ExecutionService = Depends(get_execution_service),
     current_principal: Union[User, ServiceAccount] = Depends(deps.get_current_user_or_service_account)
 ):
-    """Get the output of a completed execution in the specified format"""
+    """
+    Get the output of a completed execution in the specified format.
+    
+    Depending on OUTPUT_DELIVERY_MODE the output is either a 307 redirect to a
+    short-lived presigned URL or streamed through the API.
+    """
     try:
         execution = await service.get_execution(execution_id)
         if not execution:
@@ -318,15 +442,21 @@ async def get_execution_output(
             raise HTTPException(status_code=400, detail="Execution not completed")
             
         if format == "html" and execution.output_html:
-            # Return HTML output
-            # This would need to be implemented to fetch the HTML from storage
-            raise HTTPException(status_code=501, detail="HTML output retrieval not implemented")
+            location = execution.output_html
         elif format == "notebook" and execution.output_notebook:
-            # Return notebook output
-            # This would need to be implemented to fetch the notebook from storage
-            raise HTTPException(status_code=501, detail="Notebook output retrieval not implemented")
+            location = execution.output_notebook
         else:
             raise HTTPException(status_code=400, detail=f"Output format {format} not available")
+        
+        return await deliver_object(
+            service.storage,
+            parse_storage_path(location),
+            range_header=range_header,
+            if_none_match=if_none_match,
+            accept_encoding=accept_encoding
+        )
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
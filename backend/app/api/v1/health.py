@@ -55,10 +55,13 @@ async def detailed_health_check(db: Session = Depends(get_db)):
     # Check storage
     try:
         storage = create_storage_service()
-        await storage.list_notebooks("")
+        await storage.list_notebooks_page("", page_size=1)
         health_status["components"]["storage"] = {
             "status": "healthy"
         }
+        cache_stats = storage.cache_stats()
+        if cache_stats is not None:
+            health_status["components"]["storage"]["cache"] = cache_stats
     except Exception as e:
         health_status["components"]["storage"] = {
             "status": "unhealthy",
@@ -80,7 +83,7 @@ async def readiness_check(db: Session = Depends(get_db)):
         
         # Check storage
         storage = create_storage_service()
-        await storage.list_notebooks("")
+        await storage.list_notebooks_page("", page_size=1)
         
         return {"status": "ready"}
     except Exception as e:
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, status, Response
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, status, Response, Query
 from typing import List, Dict, Optional, Union
 from pydantic import BaseModel
-from app.services.storage.interface import BaseStorageService
+from app.services.storage.interface import BaseStorageService, InvalidContinuationTokenError, decode_continuation_token
 from app.services.notebook_metadata import NotebookMetadataExtractor
+from app.services.notebook_index import NotebookIndex
 from app.core.config import get_settings
 from app.services.storage.factory import create_storage_service
 from datetime import datetime, timedelta
@@ -11,6 +12,8 @@ from botocore.exceptions import ClientError
 from app.models.user import User
 from app.models.service_account import ServiceAccount
 from app.api import deps
+from sqlalchemy.orm import Session
+import io
 import json
 import nbformat
 import os
@@ -32,10 +35,16 @@ class NotebookMetadata(BaseModel):
     last_modified: str
     size: int
 
+CONTINUATION_TOKEN_HEADER = "X-Continuation-Token"
+
 @router.get("/notebooks", response_model=List[NotebookMetadata])
 async def list_notebooks(
+    response: Response,
     storage: BaseStorageService = Depends(create_storage_service),
     prefix: Optional[str] = "",
+    page_size: Optional[int] = Query(None, ge=1, le=1000, description="Return at most this many templates per page"),
+    continuation_token: Optional[str] = Query(None, description="Token of the next page, from the X-Continuation-Token header"),
+    db: Session = Depends(deps.get_db),
     current_principal: Union[User, ServiceAccount] = Depends(deps.get_current_user_or_service_account)
 ):
     """
@@ -43,7 +52,19 @@ async def list_notebooks(
     
     This endpoint lists notebook templates from the configured S3 bucket, 
     using the S3_NOTEBOOK_TEMPLATES_PREFIX setting to filter only template notebooks.
+    Metadata is served from the notebook template index; only templates whose
+    ETag changed since they were last indexed are downloaded and parsed.
+    
+    Without page_size all templates are returned. With page_size one page is
+    returned and the token of the next page, if any, is sent in the
+    X-Continuation-Token response header.
     """
+    if continuation_token:
+        try:
+            decode_continuation_token(continuation_token)
+        except InvalidContinuationTokenError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         # If no prefix is provided, use the notebook templates prefix from settings
         if not prefix:
@@ -52,13 +73,21 @@ async def list_notebooks(
         elif not prefix.startswith(settings.S3_NOTEBOOK_TEMPLATES_PREFIX):
             prefix = f"{settings.S3_NOTEBOOK_TEMPLATES_PREFIX}/{prefix}"
             
-        notebooks = await storage.list_notebooks(prefix)
+        if page_size or continuation_token:
+            notebooks, next_token = await storage.list_notebooks_page(
+                prefix,
+                page_size=page_size or 1000,
+                continuation_token=continuation_token
+            )
+            if next_token:
+                response.headers[CONTINUATION_TOKEN_HEADER] = next_token
+        else:
+            notebooks = await storage.list_notebooks(prefix)
+        notebooks_metadata = await NotebookIndex(db, storage).get_metadata(notebooks)
         result = []
         
         for notebook in notebooks:
-            content = await storage.read_notebook(notebook['path'])
-            metadata_extractor = NotebookMetadataExtractor(content.read())
-            metadata = metadata_extractor.extract_metadata()
+            metadata = notebooks_metadata[notebook['path']]
             
             result.append(NotebookMetadata(
                 path=notebook['path'],
@@ -73,6 +102,9 @@ async def list_notebooks(
             ))
             
         return result
+    except InvalidContinuationTokenError as e:
+        # Well-formed, but not a token of this storage backend
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -138,6 +170,7 @@ async def download_notebook_by_query(
 async def upload_notebook(
     file: UploadFile = File(...),
     storage: BaseStorageService = Depends(create_storage_service),
+    db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user),
 ):
     """Upload a notebook template file"""
@@ -151,7 +184,12 @@ async def upload_notebook(
         
         # Upload the notebook to storage using the notebook templates prefix
         path = f"{settings.S3_NOTEBOOK_TEMPLATES_PREFIX}/{file.filename}"
-        await storage.write_notebook(path, content)
+        await storage.write_notebook(path, io.BytesIO(content))
+        
+        # Index the metadata right away so listing does not need to parse it again
+        notebook_info = await storage.stat_notebook(path)
+        if notebook_info:
+            NotebookIndex(db, storage).record(notebook_info, metadata)
         
         # Store metadata in database or return it
         return NotebookResponse(
@@ -250,6 +288,7 @@ async def update_notebook_metadata(
 async def get_notebook(
     path: str,
     storage: BaseStorageService = Depends(create_storage_service),
+    db: Session = Depends(deps.get_db),
     current_principal: Union[User, ServiceAccount] = Depends(deps.get_current_user_or_service_account)
 ):
     """Get details about a specific notebook template"""
@@ -260,14 +299,12 @@ async def get_notebook(
         else:
             full_path = path
             
-        content = await storage.read_notebook(full_path)
-        metadata_extractor = NotebookMetadataExtractor(content.read())
-        metadata = metadata_extractor.extract_metadata()
-        
-        notebook_info = await storage.list_notebooks(full_path)
+        notebook_info = await storage.stat_notebook(full_path)
         if not notebook_info:
             raise HTTPException(status_code=404, detail="Notebook not found")
         
+        metadata = await NotebookIndex(db, storage).get_notebook_metadata(notebook_info)
+        
         return NotebookMetadata(
             path=full_path,
             name=metadata["identity"].get('name', path),
@@ -276,9 +313,11 @@ async def get_notebook(
             python_version=metadata["identity"].get('python_version', ''),
             requirements=metadata.get('requirements', {}),
             parameters=metadata.get('parameters', []),
-            last_modified=notebook_info[0]['last_modified'].isoformat(),
-            size=notebook_info[0]['size']
+            last_modified=notebook_info['last_modified'].isoformat(),
+            size=notebook_info['size']
         )   
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+import asyncio
+import base64
+import hmac
+import logging
+from app.core.config import get_settings
+from app.db.session import get_db
+from app import crud
+from app.schemas.execution import RunnerClaimRequest, RunnerHeartbeat, RunnerJob
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+settings = get_settings()
+
+# Interval at which a waiting claim looks at the queue again
+CLAIM_POLL_SECONDS = 1.0
+
+def verify_pool_token(pool_token: str = Header(..., alias="X-Pool-Token")) -> None:
+    """Only warm-pool workers holding WARM_POOL_TOKEN may claim executions"""
+    if not settings.WARM_POOL_TOKEN:
+        raise HTTPException(status_code=404, detail="The warm runner pool is not enabled")
+    if not hmac.compare_digest(pool_token.encode('utf-8'), settings.WARM_POOL_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=401, detail="Invalid pool token")
+
+@router.post("/runner-pool/claim", response_model=RunnerJob,
+             responses={204: {"description": "No execution was queued within the wait time"}},
+             dependencies=[Depends(verify_pool_token)])
+async def claim_execution(
+    claim_request: RunnerClaimRequest,
+    wait: int = Query(0, ge=0, le=30, description="Seconds to wait for an execution to be queued"),
+    db: Session = Depends(get_db)
+):
+    """Claim the oldest queued execution (called by warm-pool workers)"""
+    for execution_id in crud.execution_queue.expire_runs(db, lease_seconds=settings.WARM_POOL_LEASE_SECONDS):
+        logger.warning(f"Execution {execution_id} failed: its worker sent no heartbeat "
+                       f"within {settings.WARM_POOL_LEASE_SECONDS}s")
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        item = crud.execution_queue.claim(
+            db, worker_id=claim_request.worker_id, lease_seconds=settings.WARM_POOL_LEASE_SECONDS
+        )
+        if item is not None:
+            break
+        if loop.time() >= deadline:
+            return Response(status_code=204)
+        await asyncio.sleep(min(CLAIM_POLL_SECONDS, max(deadline - loop.time(), 0)))
+
+    logger.info(f"Worker {claim_request.worker_id} claimed execution {item.execution_id} (attempt {item.attempts})")
+    payload = item.payload
+    notebook_content = None
+    if item.notebook_content is not None:
+        notebook_content = base64.b64encode(item.notebook_content).decode('ascii')
+    return RunnerJob(
+        execution_id=item.execution_id,
+        notebook_path=payload["notebook_path"],
+        parameters=payload.get("parameters") or {},
+        python_version=payload["python_version"],
+        requirements=payload.get("requirements"),
+        requirements_lock=payload.get("requirements_lock"),
+        callback_token=payload["callback_token"],
+        s3_bucket=payload["s3_bucket"],
+        output_path=payload["output_path"],
+        notebook_content=notebook_content
+    )
+
+@router.post("/runner-pool/heartbeat", status_code=204,
+             responses={404: {"description": "The execution is no longer claimed by the worker"}},
+             dependencies=[Depends(verify_pool_token)])
+async def heartbeat(heartbeat_request: RunnerHeartbeat, db: Session = Depends(get_db)):
+    """Renew the claim of a running execution (called by warm-pool workers while they run it)"""
+    if not crud.execution_queue.heartbeat(db, heartbeat_request.execution_id, worker_id=heartbeat_request.worker_id):
+        raise HTTPException(status_code=404, detail="The execution is not claimed by this worker")
+    return Response(status_code=204)
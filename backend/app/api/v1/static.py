@@ -1,14 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends, Response
-from fastapi.responses import StreamingResponse
-import io
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
+from email.utils import format_datetime
 import logging
 from typing import Optional, Union
-import os
-import boto3
-from botocore.exceptions import ClientError
 from app.core.config import get_settings
 from app.services.storage.factory import create_storage_service
-from app.services.storage.s3_storage import get_s3_client  # Import the get_s3_client function
+from app.services.storage.interface import BaseStorageService, RangeNotSatisfiableError
+from app.utils.compression import accepts_encoding, can_decompress, decompress_stream
 from app.models.user import User
 from app.models.service_account import ServiceAccount
 from app.api import deps
@@ -18,19 +16,23 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Remove the direct initialization and use lazy initialization instead
-# by importing get_s3_client from s3_storage.py
-
 @router.get("/static/reports/{path:path}")
 async def get_static_report(
     path: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
     current_principal: Union[User, ServiceAccount] = Depends(deps.get_current_user_or_service_account)
 ):
     """
     Serve static files from S3 storage.
     
-    This endpoint retrieves static files like notebooks and HTML reports from S3
-    and returns them with the appropriate content type.
+    This endpoint delivers static files like notebooks and HTML reports from S3
+    according to OUTPUT_DELIVERY_MODE: a 307 redirect to a presigned URL, or a
+    stream with the appropriate content type. When streaming, a single byte range
+    in the Range header is answered with 206, and a matching If-None-Match header
+    with 304. Compressed outputs are decompressed for clients whose Accept-Encoding
+    does not include the stored encoding.
     """
     # Explicitly verify authentication
     if current_principal is None:
@@ -42,48 +44,150 @@ async def get_static_report(
         )
         
     try:
-        # Log debugging information
-        logger.info(f"Attempting to fetch file from S3: {path}")
-        logger.info(f"S3 bucket: {settings.S3_BUCKET}")
-        
-        # Get the singleton S3 client
-        s3 = get_s3_client()
-        
-        # Get the object from S3
-        response = s3.get_object(
-            Bucket=settings.S3_BUCKET,
-            Key=path
-        )
-        
-        # Read the content and create a streaming response
-        content = response['Body'].read()
-        
-        # Determine content type based on file extension
-        content_type = 'application/octet-stream'  # Default content type
-        if path.endswith('.html'):
-            content_type = 'text/html'
-        elif path.endswith('.ipynb'):
-            content_type = 'application/x-ipynb+json'
-        elif path.endswith('.json'):
-            content_type = 'application/json'
-        elif path.endswith('.css'):
-            content_type = 'text/css'
-        elif path.endswith('.js'):
-            content_type = 'application/javascript'
-        
-        # Return the streaming response with the appropriate content type
-        return Response(
-            content=content,
-            media_type=content_type
+        storage = create_storage_service()
+        return await deliver_object(
+            storage,
+            path,
+            range_header=range_header,
+            if_none_match=if_none_match,
+            accept_encoding=accept_encoding
         )
-        
-    except ClientError as e:
-        error_code = e.response.get('Error', {}).get('Code', '')
-        if error_code == 'NoSuchKey':
-            logger.error(f"File not found in S3: {path}")
-            raise HTTPException(status_code=404, detail="File not found")
-        logger.error(f"S3 ClientError: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error retrieving file: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching file from S3: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error retrieving file: {str(e)}") 
\ No newline at end of file
+        logger.error(f"Error fetching file from storage: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving file: {str(e)}")
+
+
+async def deliver_object(
+    storage: BaseStorageService,
+    path: str,
+    range_header: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+    mode: Optional[str] = None
+) -> Response:
+    """
+    Deliver a stored object according to OUTPUT_DELIVERY_MODE.
+    
+    In "redirect" mode the client is sent to a short-lived presigned URL, so the
+    bytes go straight from object storage to the client. The object is streamed
+    through the API in "proxy" mode, whenever no presigned URL can be created, and
+    for clients that may not accept the encoding the runner stores outputs with.
+    Callers must have authorised access to the object.
+    """
+    mode = mode or settings.OUTPUT_DELIVERY_MODE
+    if mode == "redirect" and accepts_output_encodings(accept_encoding):
+        try:
+            url = await storage.get_presigned_url(path, expires_in=settings.OUTPUT_PRESIGNED_URL_EXPIRES_SECONDS)
+            # The URL grants access on its own; keep it out of shared caches
+            return RedirectResponse(url, status_code=307, headers={"Cache-Control": "private, no-store"})
+        except Exception as e:
+            logger.warning(f"Could not presign {path}, streaming it instead: {str(e)}")
+    
+    return await stream_object(
+        storage, path, range_header=range_header, if_none_match=if_none_match, accept_encoding=accept_encoding
+    )
+
+
+def accepts_output_encodings(accept_encoding: Optional[str]) -> bool:
+    """Whether a client can be handed output artifacts in their stored encoding"""
+    if not accepts_encoding(accept_encoding, "gzip"):
+        return False
+    return settings.OUTPUT_COMPRESSION != "zstd" or accepts_encoding(accept_encoding, "zstd")
+
+
+async def stream_object(
+    storage: BaseStorageService,
+    path: str,
+    range_header: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    accept_encoding: Optional[str] = None
+) -> Response:
+    """
+    Stream a stored object through the API, honouring Range and If-None-Match.
+    
+    Content-encoded objects are passed through as they are to clients that accept
+    the encoding, and decompressed on the fly for the others.
+    """
+    # Decoded representations carry a weak ETag; storage compares the strong one
+    weak = bool(if_none_match) and if_none_match.startswith("W/")
+    stored_etag = if_none_match[2:] if weak else if_none_match
+    
+    try:
+        logger.info(f"Streaming file from storage: {path}")
+        stored = await storage.open_object(path, byte_range=range_header, if_none_match=stored_etag)
+        
+        encoding = stored.content_encoding
+        decode = not stored.not_modified and not accepts_encoding(accept_encoding, encoding)
+        if decode and not can_decompress(encoding):
+            await stored.body.aclose()
+            raise HTTPException(status_code=406, detail=f"Output is stored with unsupported encoding {encoding}")
+        if decode and stored.content_range:
+            # Ranges address the encoded bytes, so serve the whole decoded object instead
+            await stored.body.aclose()
+            stored = await storage.open_object(path, if_none_match=stored_etag)
+    except FileNotFoundError:
+        logger.error(f"File not found in storage: {path}")
+        raise HTTPException(status_code=404, detail="File not found")
+    except RangeNotSatisfiableError as e:
+        raise HTTPException(status_code=416, detail=str(e))
+    
+    headers = {"Accept-Ranges": "bytes", "Vary": "Accept-Encoding"}
+    if stored.etag:
+        headers["ETag"] = f"W/{stored.etag}" if decode or (stored.not_modified and weak) else stored.etag
+    
+    if stored.not_modified:
+        return Response(status_code=304, headers=headers)
+    
+    body = stored.body
+    if decode:
+        # The decoded length is unknown until the stream ends
+        body = decompress_stream(stored.body, encoding)
+    else:
+        if stored.content_length is not None:
+            headers["Content-Length"] = str(stored.content_length)
+        if stored.content_range:
+            headers["Content-Range"] = stored.content_range
+        if encoding:
+            headers["Content-Encoding"] = encoding
+    if stored.last_modified:
+        headers["Last-Modified"] = format_datetime(stored.last_modified, usegmt=True)
+    
+    # Stream the body in chunks so large reports use constant memory
+    return StreamingResponse(
+        body,
+        status_code=206 if stored.content_range and not decode else 200,
+        media_type=get_content_type(path),
+        headers=headers
+    )
+
+
+def parse_storage_path(location: str) -> str:
+    """
+    Get the object path of an output location such as "s3://bucket/key".
+    
+    Raises:
+        ValueError: If the location points to a bucket other than S3_BUCKET
+    """
+    if location.startswith("s3://"):
+        bucket, _, key = location[len("s3://"):].partition("/")
+        if bucket != settings.S3_BUCKET:
+            raise ValueError(f"Output is stored outside bucket {settings.S3_BUCKET}: {location}")
+        return key
+    return location
+
+
+def get_content_type(path: str) -> str:
+    """Determine content type based on file extension"""
+    if path.endswith('.html'):
+        return 'text/html'
+    elif path.endswith('.ipynb'):
+        return 'application/x-ipynb+json'
+    elif path.endswith('.json'):
+        return 'application/json'
+    elif path.endswith('.css'):
+        return 'text/css'
+    elif path.endswith('.js'):
+        return 'application/javascript'
+    return 'application/octet-stream'  # Default content type
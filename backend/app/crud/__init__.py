@@ -1,3 +1,5 @@
 from app.crud.user import user as user
 from app.crud.execution import execution
-from app.crud import service_account 
\ No newline at end of file
+from app.crud import service_account
+from app.crud import notebook_template
+from app.crud import execution_queue
@@ -1,9 +1,16 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
+import base64
+import binascii
 from app.models.execution import Execution
 from app.schemas.execution import ExecutionCreate, ExecutionUpdate
 from app.crud.base import CRUDBase
 
+# Executions in these states can still be cancelled
+CANCELLABLE_STATUSES = ("pending", "submitted", "running")
+
 class CRUDExecution(CRUDBase[Execution, ExecutionCreate, ExecutionUpdate]):
     def get_by_user(
         self, db: Session, *, user_id: str, skip: int = 0, limit: int = 100
@@ -16,6 +23,90 @@ class CRUDExecution(CRUDBase[Execution, ExecutionCreate, ExecutionUpdate]):
             .all()
         )
     
+    def get_page(
+        self,
+        db: Session,
+        *,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        notebook_path: Optional[str] = None,
+        status: Optional[str] = None,
+        user_id: Optional[str] = None,
+        service_account_id: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None
+    ) -> Tuple[List[Execution], Optional[str]]:
+        """
+        Get one page of executions, newest first, filtered in the database.
+        
+        Pages are addressed with a keyset cursor on (created_at, id), so the cost of a
+        page does not grow with the size of the execution history. The offset-based
+        skip is still honoured when no cursor is given.
+        
+        Returns:
+            Tuple of (executions, next_cursor); next_cursor is None on the last page
+        """
+        query = db.query(self.model)
+        if notebook_path:
+            query = query.filter(Execution.notebook_path == notebook_path)
+        if status:
+            query = query.filter(Execution.status == status)
+        if user_id:
+            query = query.filter(Execution.user_id == user_id)
+        if service_account_id:
+            query = query.filter(Execution.service_account_id == service_account_id)
+        if created_after:
+            query = query.filter(Execution.created_at >= created_after)
+        if created_before:
+            query = query.filter(Execution.created_at < created_before)
+        
+        query = query.order_by(Execution.created_at.desc(), Execution.id.desc())
+        if cursor:
+            created_at, execution_id = decode_cursor(cursor)
+            query = query.filter(
+                or_(
+                    Execution.created_at < created_at,
+                    and_(Execution.created_at == created_at, Execution.id < execution_id)
+                )
+            )
+        elif skip:
+            query = query.offset(skip)
+        
+        # Fetch one extra row to know whether another page follows
+        executions = query.limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(executions) > limit:
+            executions = executions[:limit]
+            next_cursor = encode_cursor(executions[-1])
+        return executions, next_cursor
+    
+    def get_cancellable(
+        self,
+        db: Session,
+        *,
+        execution_ids: Optional[List[str]] = None,
+        notebook_path: Optional[str] = None,
+        status: Optional[str] = None,
+        user_id: Optional[str] = None,
+        created_before: Optional[datetime] = None,
+        limit: int = 1000
+    ) -> List[Execution]:
+        """Executions that can still be cancelled, selected by ID and/or filter, oldest first"""
+        query = db.query(self.model).filter(Execution.status.in_(CANCELLABLE_STATUSES))
+        if execution_ids:
+            query = query.filter(Execution.id.in_(execution_ids))
+        if notebook_path:
+            query = query.filter(Execution.notebook_path == notebook_path)
+        if status:
+            query = query.filter(Execution.status == status)
+        if user_id:
+            query = query.filter(Execution.user_id == user_id)
+        if created_before:
+            query = query.filter(Execution.created_at < created_before)
+        return query.order_by(Execution.created_at, Execution.id).limit(limit).all()
+    
     def create_with_owner(
         self, db: Session, *, obj_in: ExecutionCreate, user_id: str
     ) -> Execution:
@@ -26,4 +117,20 @@ class CRUDExecution(CRUDBase[Execution, ExecutionCreate, ExecutionUpdate]):
         db.refresh(db_obj)
         return db_obj
 
-execution = CRUDExecution(Execution) 
\ No newline at end of file
+execution = CRUDExecution(Execution) 
+
+
+def encode_cursor(execution: Execution) -> str:
+    """Create an opaque cursor pointing just after the given execution"""
+    raw = f"{execution.created_at.isoformat()}|{execution.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor created by encode_cursor into (created_at, id)"""
+    try:
+        raw = base64.b64decode(cursor.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+        created_at, execution_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), execution_id
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,159 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.models.execution import Execution
+from app.models.execution_queue import ExecutionQueueItem
+
+
+def get(db: Session, execution_id: str) -> Optional[ExecutionQueueItem]:
+    """Get the queue item of an execution"""
+    return db.get(ExecutionQueueItem, execution_id)
+
+
+def enqueue(
+    db: Session,
+    *,
+    execution_id: str,
+    payload: Dict[str, Any],
+    notebook_content: Optional[bytes] = None,
+    commit: bool = True
+) -> ExecutionQueueItem:
+    """Queue an execution for the warm-pool workers"""
+    item = ExecutionQueueItem(
+        execution_id=execution_id,
+        payload=payload,
+        notebook_content=notebook_content,
+        enqueued_at=datetime.utcnow(),
+        attempts=0
+    )
+    db.add(item)
+    if commit:
+        db.commit()
+    return item
+
+
+def claim(db: Session, *, worker_id: str, lease_seconds: int) -> Optional[ExecutionQueueItem]:
+    """
+    Claim the oldest queued execution for a worker
+    
+    Items claimed by a worker that never reported the execution running within
+    lease_seconds (e.g. the pod was killed while downloading) are handed out
+    again; started items are expired by expire_runs instead. Rows locked by a concurrent claim are skipped on PostgreSQL, so
+    workers never wait on each other.
+    """
+    now = datetime.utcnow()
+    item = (
+        db.query(ExecutionQueueItem)
+        .filter(
+            or_(
+                ExecutionQueueItem.claimed_at.is_(None),
+                and_(
+                    ExecutionQueueItem.started_at.is_(None),
+                    ExecutionQueueItem.claimed_at < now - timedelta(seconds=lease_seconds)
+                )
+            )
+        )
+        .order_by(ExecutionQueueItem.enqueued_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if item is None:
+        db.rollback()
+        return None
+
+    item.claimed_at = now
+    item.claimed_by = worker_id
+    item.attempts = (item.attempts or 0) + 1
+    db.commit()
+    return item
+
+
+def mark_started(db: Session, execution_id: str, *, commit: bool = True) -> None:
+    """Record that the worker holding the item started the execution"""
+    item = get(db, execution_id)
+    if item is not None and item.started_at is None:
+        item.started_at = datetime.utcnow()
+        if commit:
+            db.commit()
+
+
+def heartbeat(db: Session, execution_id: str, *, worker_id: str) -> bool:
+    """
+    Renew the claim of a worker that is still running the execution
+
+    Returns False if the item is gone (e.g. the execution was cancelled) or was
+    handed to another worker.
+    """
+    renewed = db.query(ExecutionQueueItem).filter(
+        ExecutionQueueItem.execution_id == execution_id,
+        ExecutionQueueItem.claimed_by == worker_id
+    ).update({"claimed_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return renewed > 0
+
+
+def expire_runs(db: Session, *, lease_seconds: int) -> List[str]:
+    """
+    Fail started executions whose worker sent no heartbeat within lease_seconds
+
+    The worker most likely died mid-run. The notebook may already have had side
+    effects, so the execution is failed rather than handed out again. Returns the
+    IDs of the expired executions.
+    """
+    expired = [
+        execution_id for (execution_id,) in
+        db.query(ExecutionQueueItem.execution_id).filter(
+            ExecutionQueueItem.started_at.isnot(None),
+            ExecutionQueueItem.claimed_at < datetime.utcnow() - timedelta(seconds=lease_seconds)
+        ).all()
+    ]
+    if not expired:
+        return []
+    db.query(Execution).filter(
+        Execution.id.in_(expired),
+        Execution.status.in_(("pending", "submitted", "running"))
+    ).update({
+        "status": "failed",
+        "error": "The warm-pool worker stopped responding while running the execution",
+        "completed_at": datetime.utcnow()
+    }, synchronize_session=False)
+    db.query(ExecutionQueueItem).filter(
+        ExecutionQueueItem.execution_id.in_(expired)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return expired
+
+
+def remove(db: Session, execution_id: str, *, commit: bool = True) -> bool:
+    """Remove the queue item of an execution; returns whether there was one"""
+    removed = db.query(ExecutionQueueItem).filter(ExecutionQueueItem.execution_id == execution_id).delete()
+    if commit:
+        db.commit()
+    return removed > 0
+
+
+def remove_many(db: Session, execution_ids: List[str]) -> List[str]:
+    """Remove the queue items of executions; returns the IDs of the executions that had one"""
+    removed = [
+        execution_id for (execution_id,) in
+        db.query(ExecutionQueueItem.execution_id).filter(ExecutionQueueItem.execution_id.in_(execution_ids)).all()
+    ]
+    if removed:
+        db.query(ExecutionQueueItem).filter(
+            ExecutionQueueItem.execution_id.in_(removed)
+        ).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def depth(db: Session) -> Tuple[int, int]:
+    """Number of (queued, claimed) items"""
+    rows = (
+        db.query(ExecutionQueueItem.claimed_at.is_(None), func.count())
+        .group_by(ExecutionQueueItem.claimed_at.is_(None))
+        .all()
+    )
+    counts = {bool(unclaimed): count for unclaimed, count in rows}
+    return counts.get(True, 0), counts.get(False, 0)
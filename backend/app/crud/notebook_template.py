@@ -0,0 +1,85 @@
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from app.models.notebook_template import NotebookTemplate
+
+
+def get(db: Session, path: str) -> Optional[NotebookTemplate]:
+    """Get the indexed metadata of a notebook template by path"""
+    return db.query(NotebookTemplate).filter(NotebookTemplate.path == path).first()
+
+
+def get_by_paths(db: Session, paths: List[str]) -> Dict[str, NotebookTemplate]:
+    """Get the indexed metadata of several notebook templates in one query, keyed by path"""
+    if not paths:
+        return {}
+    templates = db.query(NotebookTemplate).filter(NotebookTemplate.path.in_(paths)).all()
+    return {template.path: template for template in templates}
+
+
+def upsert(
+    db: Session,
+    *,
+    path: str,
+    etag: Optional[str],
+    metadata: Dict[str, Any],
+    size: Optional[int] = None,
+    last_modified: Optional[datetime] = None,
+    commit: bool = True
+) -> NotebookTemplate:
+    """Create or replace the indexed metadata of a notebook template"""
+    template = get(db, path)
+    if template is None:
+        template = NotebookTemplate(path=path)
+
+    identity = metadata.get('identity', {})
+    if template.etag != etag:
+        # The stored hash belongs to the previous version of the object
+        template.notebook_hash = None
+    template.etag = etag
+    template.size = size
+    template.last_modified = last_modified
+    template.name = identity.get('name', '')
+    template.description = identity.get('description', '')
+    template.tags = identity.get('tags', [])
+    template.python_version = identity.get('python_version', '')
+    template.requirements = metadata.get('requirements', {})
+    template.parameters = metadata.get('parameters', [])
+    template.resources = metadata.get('resources', {})
+    template.indexed_at = datetime.utcnow()
+
+    db.add(template)
+    if commit:
+        db.commit()
+    return template
+
+
+def get_notebook_hash(db: Session, *, path: str, etag: str) -> Optional[str]:
+    """Get the stored hash of a notebook template if it was computed for this ETag"""
+    template = get(db, path)
+    if template is None or template.etag != etag:
+        return None
+    return template.notebook_hash
+
+
+def set_notebook_hash(db: Session, *, path: str, etag: str, notebook_hash: str) -> bool:
+    """Store the hash of an indexed notebook template, if the index holds the same ETag"""
+    updated = (
+        db.query(NotebookTemplate)
+        .filter(NotebookTemplate.path == path, NotebookTemplate.etag == etag)
+        .update({NotebookTemplate.notebook_hash: notebook_hash}, synchronize_session=False)
+    )
+    db.commit()
+    return updated > 0
+
+
+def delete(db: Session, *, path: str) -> bool:
+    """Delete the indexed metadata of a notebook template"""
+    template = get(db, path)
+    if not template:
+        return False
+
+    db.delete(template)
+    db.commit()
+    return True
@@ -9,6 +9,8 @@ from app.core.middleware import rate_limit_middleware
 from app.core.logging import setup_logging
 from app.db.session import SessionLocal
 from app.db.init_db import init_db
+from app.services.storage.async_s3_storage import AsyncS3ClientManager
+from app.services.job_reconciler import get_job_reconciler_manager
 import asyncio
 import logging
 import os
@@ -36,6 +38,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Continuation-Token", "X-Next-Cursor"],
 )
 
 # Add rate limiting middleware
@@ -52,6 +55,17 @@ def on_startup():
     finally:
         db.close()
 
+@app.on_event("startup")
+async def start_job_reconciler():
+    # Follow runner jobs with one watch instead of polling each execution
+    get_job_reconciler_manager().start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await get_job_reconciler_manager().stop()
+    # Close the pooled connections of the async S3 client, if one was created
+    await AsyncS3ClientManager.get_instance().close()
+
 @app.get("/")
 def read_root():
     return {"message": f"Welcome to {settings.PROJECT_NAME} API"}
@@ -2,5 +2,7 @@ from app.db.base_class import Base
 from app.models.user import User
 from app.models.execution import Execution
 from app.models.service_account import ServiceAccount
+from app.models.notebook_template import NotebookTemplate
+from app.models.execution_queue import ExecutionQueueItem
 
-__all__ = ['Base', 'User', 'Execution', 'ServiceAccount'] 
\ No newline at end of file
+__all__ = ['Base', 'User', 'Execution', 'ServiceAccount', 'NotebookTemplate', 'ExecutionQueueItem'] 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, JSON, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, JSON, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 from datetime import datetime
@@ -6,9 +6,19 @@ import uuid
 
 class Execution(Base):
     __tablename__ = "executions"
+    __table_args__ = (
+        # Keyset pagination of the execution history, newest first
+        Index("ix_executions_created_at_id", "created_at", "id"),
+        Index("ix_executions_user_id_created_at", "user_id", "created_at"),
+        Index("ix_executions_service_account_id_created_at", "service_account_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     notebook_path = Column(String, index=True)
+    # Identity of the notebook captured at submission, so reads never touch storage
+    notebook_name = Column(String, nullable=True)
+    notebook_description = Column(String, nullable=True)
+    notebook_tags = Column(JSON, nullable=True)
     parameters = Column(JSON)
     status = Column(String, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -21,6 +31,8 @@ class Execution(Base):
     cpu_milli = Column(Integer)
     memory_mib = Column(Integer)
     requirements = Column(JSON, nullable=True, default=[])
+    requirements_lock = Column(JSON, nullable=True)  # Exact "name==version" lines resolved at submission
+    requirements_lock_hash = Column(String, nullable=True)
     outputs = Column(JSON, nullable=True)
     # New fields for duplicate detection
     notebook_hash = Column(String, nullable=True, index=True)
@@ -35,6 +47,4 @@ class Execution(Base):
     # Add relationship to service account for API executions
     service_account_id = Column(String, ForeignKey("service_accounts.id"), nullable=True)
     service_account = relationship("ServiceAccount", back_populates="executions")
-    
-    # Transient attribute (not stored in DB) for the human-readable notebook name
-    notebook_name = None
+
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, DateTime, JSON, Integer, ForeignKey, LargeBinary, Index
+from app.db.base_class import Base
+from datetime import datetime
+
+class ExecutionQueueItem(Base):
+    """An execution waiting for, or being run by, a warm-pool runner worker"""
+    __tablename__ = "execution_queue"
+    __table_args__ = (
+        # Claiming scans for the oldest unclaimed (or expired) item
+        Index("ix_execution_queue_claimed_at_enqueued_at", "claimed_at", "enqueued_at"),
+    )
+
+    execution_id = Column(String, ForeignKey("executions.id", ondelete="CASCADE"), primary_key=True)
+    payload = Column(JSON, nullable=False)  # Everything the worker needs to run the notebook
+    notebook_content = Column(LargeBinary, nullable=True)  # Notebook bytes, so the worker skips the download
+    enqueued_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claimed_at = Column(DateTime, nullable=True)
+    claimed_by = Column(String, nullable=True)  # Worker (pod) that claimed the item
+    started_at = Column(DateTime, nullable=True)  # Set when the worker reports the execution running
+    attempts = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, DateTime, JSON, Integer
+from app.db.base_class import Base
+from datetime import datetime
+from typing import Any, Dict
+
+class NotebookTemplate(Base):
+    """Parsed metadata of a notebook template, keyed by its storage path and ETag"""
+    __tablename__ = "notebook_templates"
+
+    path = Column(String, primary_key=True, index=True)
+    etag = Column(String, nullable=True)  # ETag of the object the metadata was parsed from
+    size = Column(Integer, nullable=True)
+    last_modified = Column(DateTime, nullable=True)
+    name = Column(String, nullable=True)
+    description = Column(String, nullable=True)
+    tags = Column(JSON, nullable=True)
+    python_version = Column(String, nullable=True)
+    requirements = Column(JSON, nullable=True)
+    parameters = Column(JSON, nullable=True)
+    resources = Column(JSON, nullable=True)
+    notebook_hash = Column(String, nullable=True)  # Output-stripped hash of the object with this ETag
+    indexed_at = Column(DateTime, default=datetime.utcnow)
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """Return the metadata in the format produced by NotebookMetadataExtractor.extract_metadata()"""
+        return {
+            'parameters': self.parameters or [],
+            'requirements': self.requirements or {},
+            'identity': {
+                'name': self.name or '',
+                'description': self.description or '',
+                'tags': self.tags or [],
+                'python_version': self.python_version or ''
+            },
+            'resources': self.resources or {}
+        }
@@ -60,6 +60,52 @@ class ExecutionStatusUpdate(BaseModel):
             raise ValueError('end_time cannot be before start_time')
         return v
 
+class ExecutionBatchCreate(BaseModel):
+    """Executions of one notebook with different parameters, e.g. a parameter sweep"""
+    notebook_path: str = Field(..., min_length=1)
+    parameter_sets: List[Dict] = Field(..., min_length=1, description="Parameters of each execution")
+    python_version: Optional[str] = None
+    cpu_milli: Optional[int] = None
+    memory_mib: Optional[int] = None
+    force_rerun: Optional[bool] = Field(default=None, description="Force rerun even if duplicates exist")
+
+    @validator('notebook_path')
+    def validate_notebook_path(cls, v):
+        if not v.endswith('.ipynb'):
+            raise ValueError('notebook_path must end with .ipynb')
+        return v
+
+class ExecutionBatchResult(BaseModel):
+    """Outcome of one parameter set of a batch"""
+    execution: Optional["ExecutionResponse"] = None
+    is_duplicate: bool = False
+    error: Optional[str] = None
+
+class ExecutionBatchResponse(BaseModel):
+    """Outcome of a batch, with one result per parameter set in order"""
+    submitted: int = Field(..., description="Number of new executions whose jobs were created")
+    results: List[ExecutionBatchResult]
+
+class ExecutionCancelRequest(BaseModel):
+    """Executions to cancel, by ID and/or by filter"""
+    execution_ids: Optional[List[str]] = Field(None, max_length=1000)
+    notebook_path: Optional[str] = None
+    status: Optional[Literal['pending', 'submitted', 'running']] = None
+    created_before: Optional[datetime] = None
+    limit: int = Field(1000, ge=1, le=1000, description="Maximum number of executions to cancel")
+
+class ExecutionCancelResult(BaseModel):
+    """Outcome of cancelling one execution"""
+    execution_id: str
+    success: bool
+    reason: str
+    status: Optional[ExecutionStatusType] = None
+
+class ExecutionCancelResponse(BaseModel):
+    """Outcome of a bulk cancellation"""
+    cancelled: int = Field(..., description="Number of executions that were cancelled")
+    results: List[ExecutionCancelResult]
+
 class UserInfo(BaseModel):
     id: str
     username: str
@@ -82,6 +128,8 @@ class ExecutionResponse(BaseModel):
     id: str
     notebook_path: str
     notebook_name: Optional[str] = None  # Human-readable notebook name
+    notebook_description: Optional[str] = None
+    notebook_tags: Optional[List[str]] = None
     parameters: Dict
     status: ExecutionStatusType
     created_at: datetime
@@ -98,6 +146,28 @@ class ExecutionResponse(BaseModel):
     notebook_hash: Optional[str] = None
     parameters_hash: Optional[str] = None
     execution_hash: Optional[str] = None
+    requirements_lock_hash: Optional[str] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+class RunnerClaimRequest(BaseModel):
+    """Request of a warm-pool worker for the next queued execution"""
+    worker_id: str = Field(..., min_length=1)
+
+class RunnerHeartbeat(BaseModel):
+    """A warm-pool worker reporting that it is still running an execution"""
+    worker_id: str = Field(..., min_length=1)
+    execution_id: str = Field(..., min_length=1)
+
+class RunnerJob(BaseModel):
+    """A queued execution handed to a warm-pool worker"""
+    execution_id: str
+    notebook_path: str
+    parameters: Dict = Field(default_factory=dict)
+    python_version: str
+    requirements: Any = None
+    requirements_lock: Optional[List[str]] = None
+    callback_token: str
+    s3_bucket: str
+    output_path: str
+    notebook_content: Optional[str] = Field(None, description="Base64-encoded notebook, if sent with the job")
@@ -3,5 +3,7 @@ Batch executors for running notebook jobs.
 """
 
 from .k8s_executor import K8sExecutor
+from .warm_pool_executor import WarmPoolExecutor
+from .factory import create_batch_executor
 
-__all__ = ['K8sExecutor']
+__all__ = ['K8sExecutor', 'WarmPoolExecutor', 'create_batch_executor']
@@ -1,5 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Union
+from app.core.config import get_settings
+from app.utils.concurrency import gather_bounded
+
+settings = get_settings()
 
 class BaseBatchExecutor(ABC):
     @abstractmethod
@@ -13,11 +17,35 @@ class BaseBatchExecutor(ABC):
         memory_mib: int = 16384,
         output_bucket: Optional[str] = None,
         requirements: Optional[List[str]] = None,
-        callback_token: Optional[str] = None
+        callback_token: Optional[str] = None,
+        notebook_content: Optional[bytes] = None,
+        requirements_lock: Optional[List[str]] = None
     ) -> str:
-        """Create a job to execute the notebook"""
+        """
+        Create a job to execute the notebook
+        
+        notebook_content holds the exact bytes of the notebook at notebook_path as
+        they were hashed for the execution. Executors may hand them to the job
+        instead of having it download the notebook again.
+        
+        requirements_lock holds the "name==version" lines the requirements were
+        resolved to at submission, if they were; the runner installs exactly these.
+        """
         pass
 
+    async def create_jobs(self, jobs: List[Dict]) -> List[Union[str, BaseException]]:
+        """
+        Create many jobs; each item holds the keyword arguments of create_job
+        
+        Returns the job name, or the exception that failed it, for each item in
+        order. Creates BATCH_SUBMIT_CONCURRENCY jobs at a time by default.
+        """
+        return await gather_bounded(
+            (self.create_job(**job) for job in jobs),
+            limit=settings.BATCH_SUBMIT_CONCURRENCY,
+            return_exceptions=True
+        )
+
     @abstractmethod
     async def get_job_status(self, job_name: str) -> Dict:
         """Get status of a job"""
@@ -31,4 +59,12 @@ class BaseBatchExecutor(ABC):
     @abstractmethod
     async def cancel_job(self, job_name: str) -> bool:
         """Cancel a job"""
-        pass 
\ No newline at end of file
+        pass 
+
+    async def cancel_jobs(self, job_names: List[str]) -> Dict[str, bool]:
+        """Cancel many jobs; returns whether each was cancelled, by job name. Cancels one by one by default"""
+        return {job_name: await self.cancel_job(job_name) for job_name in job_names}
+
+    async def job_status_changed(self, job_name: str, status: str) -> None:
+        """Called after the runner reported a new status for the job; nothing to do by default"""
+        pass
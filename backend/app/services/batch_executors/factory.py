@@ -0,0 +1,18 @@
+from sqlalchemy.orm import Session
+from .base import BaseBatchExecutor
+from .k8s_executor import K8sExecutor
+from .warm_pool_executor import WarmPoolExecutor
+from app.core.config import get_settings
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def create_batch_executor(db: Session) -> BaseBatchExecutor:
+    """Create the batch executor selected by BATCH_EXECUTOR"""
+    if settings.BATCH_EXECUTOR == "warm-pool":
+        return WarmPoolExecutor(db)
+    if settings.BATCH_EXECUTOR != "k8s":
+        logger.warning(f"Unknown BATCH_EXECUTOR '{settings.BATCH_EXECUTOR}', using k8s")
+    return K8sExecutor()
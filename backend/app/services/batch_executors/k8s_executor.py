@@ -1,8 +1,10 @@
 from typing import Dict, Optional, List
 from kubernetes import client, config
+from kubernetes.client.exceptions import ApiException
 from .base import BaseBatchExecutor
 import logging
 import json
+import base64
 import asyncio
 from app.core.config import get_settings
 import os
@@ -10,6 +12,19 @@ import os
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Key of the inline notebook in the job's ConfigMap and where the runner finds it
+INLINE_NOTEBOOK_KEY = "notebook.ipynb"
+INLINE_NOTEBOOK_DIR = "/nbforge/notebook"
+
+# Where the node-local requirement environment cache is mounted in runner pods
+ENV_CACHE_DIR = "/nbforge/env-cache"
+
+JOB_NAME_PREFIX = "notebook-execution-"
+RUNNER_LABEL_SELECTOR = "app=nbforge,component=notebook-runner"
+
+# Executions selected by one label selector when cancelling many jobs
+CANCEL_BATCH_SIZE = 100
+
 class K8sExecutor(BaseBatchExecutor):
     def __init__(self):
         """Initialize Kubernetes client"""
@@ -33,9 +48,18 @@ class K8sExecutor(BaseBatchExecutor):
         memory_mib: int = None,
         output_bucket: Optional[str] = None,
         requirements: Optional[List[str]] = None,
-        callback_token: Optional[str] = None
+        callback_token: Optional[str] = None,
+        notebook_content: Optional[bytes] = None,
+        requirements_lock: Optional[List[str]] = None
     ) -> str:
-        """Create a Kubernetes job to execute a notebook"""
+        """
+        Create a Kubernetes job to execute a notebook
+        
+        Notebooks up to K8S_INLINE_NOTEBOOK_MAX_BYTES are embedded in the job's
+        ConfigMap and mounted into the pod, so the runner starts without an S3
+        round-trip and executes exactly the content that was hashed. Larger ones
+        are downloaded by the runner from notebook_path.
+        """
         try:
             # Set default resources if not provided
             cpu_milli = cpu_milli or settings.DEFAULT_CPU_MILLI
@@ -48,22 +72,32 @@ class K8sExecutor(BaseBatchExecutor):
             config_map_name = f"nbforge-job-{job_name}-config"
             secret_name = f"nbforge-job-{job_name}-secret"
             
-            # Create ConfigMap and Secret
-            await self._create_config_map(job_name, config_map_name, notebook_path, 
-                                         parameters, requirements, s3_bucket, python_version)
-            await self._create_secret(job_name, secret_name)
+            inline_notebook = self._should_inline(notebook_content)
+            
+            # Create ConfigMap and Secret concurrently; both must exist before the job
+            created = await asyncio.gather(
+                self._create_config_map(job_name, config_map_name, notebook_path, 
+                                        parameters, requirements, s3_bucket, python_version,
+                                        notebook_content if inline_notebook else None,
+                                        requirements_lock),
+                self._create_secret(job_name, secret_name),
+                return_exceptions=True
+            )
+            for result in created:
+                if isinstance(result, BaseException):
+                    raise result
             
             # Create job
             env = self._prepare_env_vars(notebook_path, parameters, python_version, 
                                         job_name, s3_bucket, requirements, callback_token)
             job_spec = self._create_job_spec(job_name, config_map_name, secret_name, 
-                                           env, cpu_milli, memory_mib)
+                                           env, cpu_milli, memory_mib, inline_notebook)
             
             # Create the job in Kubernetes - use job_spec directly
             job_response = await self._create_job_async(job_spec)
             
-            # Set the job as the owner of the ConfigMap for garbage collection
-            await self._set_owner_reference(job_response, config_map_name, config_map_name)
+            # Set the job as the owner of the ConfigMap and Secret for garbage collection
+            await self._set_owner_references(job_response, config_map_name, secret_name)
             
             return job_name
         except Exception as e:
@@ -72,11 +106,21 @@ class K8sExecutor(BaseBatchExecutor):
             logger.error(f"Failed to create job: {str(e)}")
             raise
 
+    def _should_inline(self, notebook_content: Optional[bytes]) -> bool:
+        """Whether a notebook is small enough to be passed in the job's ConfigMap"""
+        if notebook_content is None or settings.K8S_INLINE_NOTEBOOK_MAX_BYTES <= 0:
+            return False
+        if len(notebook_content) > settings.K8S_INLINE_NOTEBOOK_MAX_BYTES:
+            logger.info(f"Notebook of {len(notebook_content)} bytes is too large to inline, the runner will download it")
+            return False
+        return True
+
     async def _create_config_map(self, job_name: str, config_map_name: str, 
                                notebook_path: str, parameters: Dict, 
                                requirements: Optional[List[str]], s3_bucket: str,
-                               python_version: str) -> None:
-        """Create a ConfigMap for job configuration"""
+                               python_version: str, notebook_content: Optional[bytes] = None,
+                               requirements_lock: Optional[List[str]] = None) -> None:
+        """Create a ConfigMap for job configuration, with the notebook itself if given"""
         # Format parameters and requirements as JSON strings
         parameters_json = json.dumps(parameters)
         requirements_json = "[]"
@@ -93,12 +137,29 @@ class K8sExecutor(BaseBatchExecutor):
             "API_URL": settings.API_URL,
             "PYTHON_VERSION": python_version,
             "OUTPUT_PATH": f"outputs/{job_name}",
+            "OUTPUT_COMPRESSION": settings.OUTPUT_COMPRESSION,
+            "S3_MULTIPART_THRESHOLD_MB": str(settings.RUNNER_S3_MULTIPART_THRESHOLD_MB),
+            "S3_MULTIPART_CHUNKSIZE_MB": str(settings.RUNNER_S3_MULTIPART_CHUNKSIZE_MB),
+            "S3_MAX_CONCURRENCY": str(settings.RUNNER_S3_MAX_CONCURRENCY),
+            "ENV_CACHE_PREFIX": settings.RUNNER_ENV_CACHE_PREFIX,
             "EXTRACT_JSON_OUTPUTS": "true"
         }
         
         if settings.S3_ENDPOINT_URL:
             config_data["S3_ENDPOINT_URL"] = settings.S3_ENDPOINT_URL
         
+        if settings.K8S_ENV_CACHE_HOST_PATH:
+            config_data["ENV_CACHE_DIR"] = ENV_CACHE_DIR
+        
+        if requirements_lock:
+            config_data["REQUIREMENTS_LOCK"] = json.dumps(requirements_lock)
+        
+        # binaryData keys are mounted as files but not exported as environment variables
+        binary_data = None
+        if notebook_content is not None:
+            binary_data = {INLINE_NOTEBOOK_KEY: base64.b64encode(notebook_content).decode('ascii')}
+            config_data["NOTEBOOK_INLINE_PATH"] = f"{INLINE_NOTEBOOK_DIR}/{INLINE_NOTEBOOK_KEY}"
+        
         # Create a ConfigMap
         config_map = client.V1ConfigMap(
             metadata=client.V1ObjectMeta(
@@ -109,7 +170,8 @@ class K8sExecutor(BaseBatchExecutor):
                     "job-name": job_name
                 }
             ),
-            data=config_data
+            data=config_data,
+            binary_data=binary_data
         )
         
         # Create the ConfigMap
@@ -126,7 +188,11 @@ class K8sExecutor(BaseBatchExecutor):
         secret = client.V1Secret(
             metadata=client.V1ObjectMeta(
                 name=secret_name,
-                namespace=self.namespace
+                namespace=self.namespace,
+                labels={
+                    "app": "nbforge",
+                    "job-name": job_name
+                }
             ),
             string_data={
                 "AWS_ACCESS_KEY_ID": settings.AWS_ACCESS_KEY_ID,
@@ -174,7 +240,8 @@ class K8sExecutor(BaseBatchExecutor):
         return env
 
     def _create_job_spec(self, job_name: str, config_map_name: str, secret_name: str, 
-                        env: List[Dict], cpu_milli: int, memory_mib: int) -> Dict:
+                        env: List[Dict], cpu_milli: int, memory_mib: int,
+                        inline_notebook: bool = False) -> Dict:
         """
         Create the job specification with TTL settings for automatic cleanup
         
@@ -185,6 +252,7 @@ class K8sExecutor(BaseBatchExecutor):
             env: List of environment variables
             cpu_milli: CPU request in millicores
             memory_mib: Memory request in MiB
+            inline_notebook: Mount the notebook embedded in the ConfigMap
             
         Returns:
             Dict: The complete job specification
@@ -199,7 +267,7 @@ class K8sExecutor(BaseBatchExecutor):
         ttl_seconds_after_finished = 86400 * 3
         
         job_name_full = f"notebook-execution-{job_name}"
-        return {
+        job_spec = {
             "apiVersion": "batch/v1",
             "kind": "Job",
             "metadata": {
@@ -256,27 +324,59 @@ class K8sExecutor(BaseBatchExecutor):
                 }
             }
         }
+        
+        pod_spec = job_spec["spec"]["template"]["spec"]
+        volumes = []
+        volume_mounts = []
+        if inline_notebook:
+            volumes.append({
+                "name": "notebook",
+                "configMap": {
+                    "name": config_map_name,
+                    "items": [{"key": INLINE_NOTEBOOK_KEY, "path": INLINE_NOTEBOOK_KEY}]
+                }
+            })
+            volume_mounts.append({
+                "name": "notebook",
+                "mountPath": INLINE_NOTEBOOK_DIR,
+                "readOnly": True
+            })
+        
+        # Prebuilt requirement environments shared by the runner pods of a node
+        if settings.K8S_ENV_CACHE_HOST_PATH:
+            volumes.append({
+                "name": "env-cache",
+                "hostPath": {"path": settings.K8S_ENV_CACHE_HOST_PATH, "type": "DirectoryOrCreate"}
+            })
+            volume_mounts.append({
+                "name": "env-cache",
+                "mountPath": ENV_CACHE_DIR
+            })
+        
+        if volumes:
+            pod_spec["volumes"] = volumes
+            pod_spec["containers"][0]["volumeMounts"] = volume_mounts
+        
+        return job_spec
 
-    async def _set_owner_reference(self, job_response, config_map_name: str, config_map) -> None:
-        """Set the job as the owner of the ConfigMap for garbage collection"""
-        try:
-            owner_ref = client.V1OwnerReference(
-                api_version="batch/v1",
-                kind="Job",
-                name=job_response.metadata.name,
-                uid=job_response.metadata.uid,
-                block_owner_deletion=True
-            )
-            
-            config_map.metadata.owner_references = [owner_ref]
-            await asyncio.to_thread(
-                self.core_v1.replace_namespaced_config_map,
-                config_map_name,
-                self.namespace,
-                config_map
-            )
-        except Exception as e:
-            logger.warning(f"Failed to set owner reference for ConfigMap: {str(e)}")
+    async def _set_owner_references(self, job_response, config_map_name: str, secret_name: str) -> None:
+        """Set the job as the owner of its ConfigMap and Secret for garbage collection"""
+        owner_ref = {
+            "apiVersion": "batch/v1",
+            "kind": "Job",
+            "name": job_response.metadata.name,
+            "uid": job_response.metadata.uid,
+            "blockOwnerDeletion": True
+        }
+        patch = {"metadata": {"ownerReferences": [owner_ref]}}
+        results = await asyncio.gather(
+            asyncio.to_thread(self.core_v1.patch_namespaced_config_map, config_map_name, self.namespace, patch),
+            asyncio.to_thread(self.core_v1.patch_namespaced_secret, secret_name, self.namespace, patch),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning(f"Failed to set owner reference for job resources: {str(result)}")
 
     async def _cleanup_resources(self, job_name: str, config_map_name: str, secret_name: str) -> None:
         """Clean up resources if job creation fails"""
@@ -367,115 +467,99 @@ class K8sExecutor(BaseBatchExecutor):
         Returns:
             bool: True if cancellation was successful, False otherwise
         """
+        execution_id = self._execution_id(job_name)
+        job_name = f"{JOB_NAME_PREFIX}{execution_id}"
+        logger.info(f"Attempting to cancel job {job_name} (execution ID: {execution_id}) in namespace {self.namespace}")
+        
         try:
-            # Extract the execution ID from the job name (if it has the prefix, otherwise use as is)
-            execution_id = job_name
-            if job_name.startswith("notebook-execution-"):
-                execution_id = job_name.replace("notebook-execution-", "")
+            job = await asyncio.to_thread(self.batch_v1.read_namespaced_job, job_name, self.namespace)
+        except ApiException as e:
+            if e.status == 404:
+                logger.error(f"Job {job_name} not found in namespace {self.namespace}")
             else:
-                # If the job name doesn't have the prefix, add it
-                job_name = f"notebook-execution-{job_name}"
-            
-            logger.info(f"Attempting to cancel job {job_name} (execution ID: {execution_id}) in namespace {self.namespace}")
-            
-            # Check if the job exists and get its status
-            job_exists = False
-            job_already_completed = False
-            
+                logger.error(f"Failed to find job {job_name}: {str(e)}")
+            return False
+        
+        if job.status.succeeded or job.status.failed:
+            status = "succeeded" if job.status.succeeded else "failed"
+            logger.info(f"Job {job_name} already {status} - nothing to cancel")
+            # Even for completed jobs, clean up the resources
+            await self._delete_job_resources([execution_id])
+            return False
+        
+        try:
+            await self._delete_job_async(job_name)
+        except ApiException as e:
+            # A 404 means the job finished and was removed in the meantime
+            logger.error(f"Failed to delete job {job_name}: {str(e)}")
+            return False
+        logger.info(f"Successfully deleted job {job_name}")
+        
+        await self._delete_job_resources([execution_id])
+        return True
+
+    async def cancel_jobs(self, job_names: List[str]) -> Dict[str, bool]:
+        """
+        Cancel many Kubernetes jobs with a few collection requests
+        
+        Jobs are looked up and deleted by their execution-id label in batches of
+        CANCEL_BATCH_SIZE, together with their ConfigMaps and Secrets.
+        
+        Returns:
+            Dict[str, bool]: Whether each job was cancelled, by job name
+        """
+        names_by_id = {self._execution_id(job_name): job_name for job_name in job_names}
+        results = {job_name: False for job_name in job_names}
+        execution_ids = list(names_by_id)
+        
+        for start in range(0, len(execution_ids), CANCEL_BATCH_SIZE):
+            batch = execution_ids[start:start + CANCEL_BATCH_SIZE]
             try:
-                logger.info(f"Checking if job {job_name} exists in namespace {self.namespace}...")
-                # List all jobs in the namespace to verify what's actually there
-                all_jobs = await asyncio.to_thread(
+                jobs = await asyncio.to_thread(
                     self.batch_v1.list_namespaced_job,
-                    self.namespace
+                    self.namespace,
+                    label_selector=f"{RUNNER_LABEL_SELECTOR},execution-id in ({','.join(batch)})"
                 )
-                job_names = [job.metadata.name for job in all_jobs.items]
-                logger.info(f"Found {len(job_names)} jobs in namespace {self.namespace}.")
-                
-                # Check if our job is in the list
-                if job_name in job_names:
-                    job_exists = True
-                    logger.info(f"Job {job_name} found in the namespace.")
-                    
-                    # Try to get the specific job status
-                    job_status = await asyncio.to_thread(
-                        self.batch_v1.read_namespaced_job_status,
-                        job_name,
-                        self.namespace
-                    )
-                    
-                    # Check if job is already completed or failed
-                    if job_status.status.succeeded or job_status.status.failed:
-                        job_already_completed = True
-                        status = "succeeded" if job_status.status.succeeded else "failed"
-                        logger.info(f"Job {job_name} already {status} - nothing to cancel")
-                        
-                        # Even for completed jobs, we might want to clean up resources
-                        # Only return false to indicate that a cancellation wasn't necessary
-                        try:
-                            # Clean up ConfigMap and Secret
-                            await self._cleanup_resources(
-                                job_name, 
-                                f"nbforge-job-{execution_id}-config",
-                                f"nbforge-job-{execution_id}-secret"
-                            )
-                        except Exception as cleanup_err:
-                            logger.warning(f"Failed to clean up resources for completed job: {str(cleanup_err)}")
-                            
-                        return False
-                    
-                    # Log job status details
-                    logger.info(f"Job status: active={job_status.status.active}, succeeded={job_status.status.succeeded}, failed={job_status.status.failed}")
-                else:
-                    logger.error(f"Job {job_name} not found in the list of jobs in namespace {self.namespace}")
-                    return False
-                    
-            except Exception as e:
-                logger.error(f"Failed to find job {job_name}: {str(e)}")
-                return False
-                
-            # Only proceed with cancellation if the job exists and is not already completed
-            if job_exists and not job_already_completed:
-                # First delete the job
-                logger.info(f"Proceeding to delete job {job_name}")
-                await self._delete_job_async(job_name)
-                logger.info(f"Successfully deleted job {job_name}")
-                
-                # Then try to delete the ConfigMap
-                config_map_name = f"nbforge-job-{execution_id}-config"
-                try:
-                    logger.info(f"Deleting ConfigMap {config_map_name}")
-                    await asyncio.to_thread(
-                        self.core_v1.delete_namespaced_config_map,
-                        config_map_name,
-                        self.namespace
-                    )
-                    logger.info(f"Successfully deleted ConfigMap {config_map_name}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete ConfigMap {config_map_name}: {str(e)}")
-                
-                # Finally try to delete the Secret
-                secret_name = f"nbforge-job-{execution_id}-secret"
-                try:
-                    logger.info(f"Deleting Secret {secret_name}")
+                active = [
+                    job.metadata.labels["execution-id"] for job in jobs.items
+                    if not (job.status.succeeded or job.status.failed)
+                ]
+                if active:
                     await asyncio.to_thread(
-                        self.core_v1.delete_namespaced_secret,
-                        secret_name,
-                        self.namespace
+                        self.batch_v1.delete_collection_namespaced_job,
+                        self.namespace,
+                        label_selector=f"{RUNNER_LABEL_SELECTOR},execution-id in ({','.join(active)})",
+                        propagation_policy='Foreground'
                     )
-                    logger.info(f"Successfully deleted Secret {secret_name}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete Secret {secret_name}: {str(e)}")
-                    
-                return True
+            except Exception as e:
+                logger.error(f"Failed to cancel {len(batch)} jobs: {str(e)}")
+                continue
             
-            return False
-        except Exception as e:
-            logger.error(f"Failed to cancel job {job_name}: {str(e)}")
-            # Get stack trace for debugging
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return False
+            logger.info(f"Deleted {len(active)} of {len(batch)} jobs")
+            for execution_id in active:
+                results[names_by_id[execution_id]] = True
+            await self._delete_job_resources(batch)
+        
+        return results
+
+    @staticmethod
+    def _execution_id(job_name: str) -> str:
+        """Execution ID of a job name, with or without the 'notebook-execution-' prefix"""
+        if job_name.startswith(JOB_NAME_PREFIX):
+            return job_name[len(JOB_NAME_PREFIX):]
+        return job_name
+
+    async def _delete_job_resources(self, execution_ids: List[str]) -> None:
+        """Delete the ConfigMaps and Secrets of jobs by their job-name label"""
+        label_selector = f"app=nbforge,job-name in ({','.join(execution_ids)})"
+        for delete_collection in (
+            self.core_v1.delete_collection_namespaced_config_map,
+            self.core_v1.delete_collection_namespaced_secret
+        ):
+            try:
+                await asyncio.to_thread(delete_collection, self.namespace, label_selector=label_selector)
+            except Exception as e:
+                logger.warning(f"Failed to delete resources of {len(execution_ids)} jobs: {str(e)}")
 
     async def _delete_job_async(self, job_name: str) -> None:
         """Async wrapper for deleting job"""
@@ -492,7 +576,7 @@ class K8sExecutor(BaseBatchExecutor):
             job_list = await asyncio.to_thread(
                 self.batch_v1.list_namespaced_job,
                 self.namespace,
-                label_selector="app=nbforge,component=notebook-runner"
+                label_selector=RUNNER_LABEL_SELECTOR
             )
             
             result = []
@@ -0,0 +1,209 @@
+from typing import Dict, Optional, List, Union
+from kubernetes import client, config
+from sqlalchemy.orm import Session
+from .base import BaseBatchExecutor
+from app import crud
+from app.models.execution_queue import ExecutionQueueItem
+import logging
+import asyncio
+import math
+from app.core.config import get_settings
+import os
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+JOB_NAME_PREFIX = "notebook-execution-"
+
+
+def desired_workers(queued: int, claimed: int, current: int) -> int:
+    """
+    Number of warm-pool workers for the given queue depth
+    
+    The pool grows with the queued and running executions, within
+    WARM_POOL_MIN_WORKERS and WARM_POOL_MAX_WORKERS. It only shrinks when no
+    execution is running, because the Deployment may remove a busy worker.
+    """
+    per_worker = max(settings.WARM_POOL_EXECUTIONS_PER_WORKER, 1)
+    desired = math.ceil((queued + claimed) / per_worker)
+    desired = min(max(desired, settings.WARM_POOL_MIN_WORKERS), settings.WARM_POOL_MAX_WORKERS)
+    if desired < current and claimed > 0:
+        return current
+    return desired
+
+
+class WarmPoolExecutor(BaseBatchExecutor):
+    """
+    Run executions on long-lived runner workers instead of one Job per execution
+    
+    create_job queues the execution in the database; workers of the
+    WARM_POOL_DEPLOYMENT Deployment claim it through the runner-pool API, run the
+    notebook in a fresh kernel and report back like a Job would. The Deployment
+    is scaled with the queue depth, so a worker is usually already waiting and an
+    execution skips pod scheduling, image pull and interpreter start-up.
+    """
+
+    def __init__(self, db: Session):
+        """Initialize Kubernetes client"""
+        if os.getenv('KUBERNETES_SERVICE_HOST'):
+            # In-cluster config
+            config.load_incluster_config()
+        else:
+            # Local development
+            config.load_kube_config()
+        self.apps_v1 = client.AppsV1Api()
+        self.namespace = settings.K8S_NAMESPACE
+        self.db = db
+
+    async def create_job(
+        self,
+        notebook_path: str,
+        parameters: Dict,
+        python_version: str,
+        job_name: str,
+        cpu_milli: int = None,
+        memory_mib: int = None,
+        output_bucket: Optional[str] = None,
+        requirements: Optional[List[str]] = None,
+        callback_token: Optional[str] = None,
+        notebook_content: Optional[bytes] = None,
+        requirements_lock: Optional[List[str]] = None
+    ) -> str:
+        """
+        Queue the execution for the warm-pool workers
+        
+        Workers have fixed resources, so cpu_milli and memory_mib are not applied
+        per execution; size the Deployment for the notebooks it runs.
+        """
+        crud.execution_queue.enqueue(
+            self.db,
+            execution_id=job_name,
+            payload=self._payload(notebook_path, parameters, python_version, job_name, output_bucket,
+                                  requirements, callback_token, requirements_lock),
+            notebook_content=notebook_content
+        )
+        logger.info(f"Queued execution {job_name} for the warm pool")
+        await self._scale()
+        return job_name
+
+    async def create_jobs(self, jobs: List[Dict]) -> List[Union[str, BaseException]]:
+        """Queue many executions in one transaction and rescale once"""
+        for job in jobs:
+            crud.execution_queue.enqueue(
+                self.db,
+                execution_id=job["job_name"],
+                payload=self._payload(
+                    job["notebook_path"], job["parameters"], job["python_version"], job["job_name"],
+                    job.get("output_bucket"), job.get("requirements"), job.get("callback_token"),
+                    job.get("requirements_lock")
+                ),
+                notebook_content=job.get("notebook_content"),
+                commit=False
+            )
+        self.db.commit()
+        logger.info(f"Queued {len(jobs)} executions for the warm pool")
+        await self._scale()
+        return [job["job_name"] for job in jobs]
+
+    @staticmethod
+    def _payload(notebook_path: str, parameters: Dict, python_version: str, job_name: str,
+                 output_bucket: Optional[str], requirements, callback_token: Optional[str],
+                 requirements_lock: Optional[List[str]]) -> Dict:
+        """What a worker needs to run the execution, apart from the notebook content"""
+        return {
+            "notebook_path": notebook_path,
+            "parameters": parameters,
+            "python_version": python_version,
+            "requirements": requirements or {},
+            "requirements_lock": requirements_lock,
+            "callback_token": callback_token,
+            "s3_bucket": output_bucket or settings.S3_BUCKET,
+            "output_path": f"outputs/{job_name}"
+        }
+
+    async def job_status_changed(self, job_name: str, status: str) -> None:
+        """Track the queue item of the execution and rescale when it leaves the queue"""
+        if status == "running":
+            crud.execution_queue.mark_started(self.db, job_name)
+        elif status in ("completed", "failed", "cancelled"):
+            if crud.execution_queue.remove(self.db, job_name):
+                await self._scale()
+
+    async def _scale(self) -> None:
+        """Scale the worker Deployment with the queue depth; failures only delay the execution"""
+        try:
+            queued, claimed = crud.execution_queue.depth(self.db)
+            scale = await asyncio.to_thread(
+                self.apps_v1.read_namespaced_deployment_scale,
+                settings.WARM_POOL_DEPLOYMENT,
+                self.namespace
+            )
+            current = scale.spec.replicas or 0
+            desired = desired_workers(queued, claimed, current)
+            if desired != current:
+                logger.info(f"Scaling {settings.WARM_POOL_DEPLOYMENT} from {current} to {desired} workers "
+                            f"({queued} queued, {claimed} claimed)")
+                await asyncio.to_thread(
+                    self.apps_v1.patch_namespaced_deployment_scale,
+                    settings.WARM_POOL_DEPLOYMENT,
+                    self.namespace,
+                    {"spec": {"replicas": desired}}
+                )
+        except Exception as e:
+            logger.warning(f"Failed to scale {settings.WARM_POOL_DEPLOYMENT}: {str(e)}")
+
+    @staticmethod
+    def _item_status(item: ExecutionQueueItem) -> Dict:
+        status = "pending"
+        if item.started_at:
+            status = "running"
+        return {
+            "status": status,
+            "start_time": item.started_at,
+            "completion_time": None
+        }
+
+    async def get_job_status(self, job_name: str) -> Dict:
+        """Get status of a queued execution; finished executions are no longer queued"""
+        execution_id = job_name[len(JOB_NAME_PREFIX):] if job_name.startswith(JOB_NAME_PREFIX) else job_name
+        item = crud.execution_queue.get(self.db, execution_id)
+        if item is None:
+            raise ValueError(f"Execution {execution_id} is not queued")
+        return self._item_status(item)
+
+    async def list_jobs(self) -> List[Dict]:
+        """List queued and running executions"""
+        items = self.db.query(ExecutionQueueItem).order_by(ExecutionQueueItem.enqueued_at).all()
+        return [{"name": item.execution_id, **self._item_status(item)} for item in items]
+
+    async def cancel_job(self, job_name: str) -> bool:
+        """
+        Cancel a queued execution
+        
+        Removing the item stops any worker from claiming it. A worker already
+        running it finishes the notebook, but its status reports are ignored once
+        the execution is cancelled.
+        
+        Returns:
+            bool: False if the execution was not queued (e.g. already finished)
+        """
+        execution_id = job_name[len(JOB_NAME_PREFIX):] if job_name.startswith(JOB_NAME_PREFIX) else job_name
+        removed = crud.execution_queue.remove(self.db, execution_id)
+        if removed:
+            logger.info(f"Removed execution {execution_id} from the warm-pool queue")
+            await self._scale()
+        else:
+            logger.info(f"Execution {execution_id} is not queued - nothing to cancel")
+        return removed
+
+    async def cancel_jobs(self, job_names: List[str]) -> Dict[str, bool]:
+        """Cancel many queued executions with one delete and one rescale"""
+        names_by_id = {
+            (job_name[len(JOB_NAME_PREFIX):] if job_name.startswith(JOB_NAME_PREFIX) else job_name): job_name
+            for job_name in job_names
+        }
+        removed = set(crud.execution_queue.remove_many(self.db, list(names_by_id)))
+        if removed:
+            logger.info(f"Removed {len(removed)} executions from the warm-pool queue")
+            await self._scale()
+        return {job_name: execution_id in removed for execution_id, job_name in names_by_id.items()}
@@ -4,10 +4,14 @@ import uuid
 import json
 import logging
 from app.models.execution import Execution
-from app.services.batch_executors.k8s_executor import K8sExecutor
+from app import crud
+from app.services.batch_executors.factory import create_batch_executor
 from app.core.config import get_settings
 from sqlalchemy.orm import Session
 from app.services.notebook_metadata import NotebookMetadataExtractor
+from app.services.prepared_notebook import PreparedNotebook
+from app.services.notebook_hash_cache import get_notebook_hash_cache
+from app.services.requirements_resolver import get_requirements_resolver
 from app.services.storage.factory import create_storage_service
 from app.services.email.email import email_service
 from app.models.user import User
@@ -20,10 +24,8 @@ logger = logging.getLogger(__name__)
 class ExecutionService:
     def __init__(self, db: Session):
         self.db = db
-        self.batch_executor = K8sExecutor()
+        self.batch_executor = create_batch_executor(db)
         self.storage = create_storage_service()
-        # Initialize a cache for notebook metadata
-        self.notebook_metadata_cache = {}
 
     async def _convert_parameters_using_metadata(self, notebook_content: bytes, parameters: Dict) -> Dict:
         """
@@ -47,6 +49,22 @@ class ExecutionService:
         # Create a mapping of parameter names to their types
         param_types = {param['name']: param['type'] for param in param_definitions if 'name' in param and 'type' in param}
         
+        return self._convert_parameters(param_types, parameters)
+
+    def _convert_parameters(self, param_types: Dict[str, str], parameters: Dict) -> Dict:
+        """
+        Convert parameter values based on a mapping of parameter names to declared types.
+        
+        Args:
+            param_types: Declared type of each notebook parameter
+            parameters: Dictionary of parameter values to convert
+            
+        Returns:
+            Dictionary of parameters with values converted to appropriate types
+        """
+        if not parameters:
+            return {}
+        
         if not param_types:
             logger.warning("No parameter definitions found in notebook metadata")
             return parameters
@@ -136,7 +154,8 @@ class ExecutionService:
         self,
         notebook_path: str,
         parameters: Dict,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        notebook_hash: Optional[str] = None
     ) -> Tuple[bool, Optional[Execution]]:
         """
         Check if a notebook execution with the same notebook and parameters already exists.
@@ -145,13 +164,18 @@ class ExecutionService:
             notebook_path: Path to the notebook
             parameters: Execution parameters
             user_id: Optional user ID to restrict search to user's executions
+            notebook_hash: Hash of the notebook if the caller already computed it
             
         Returns:
             Tuple of (duplicate_exists, duplicate_execution)
         """
-        # Download and hash the notebook
-        notebook_content = await self.storage.download_notebook(notebook_path)
-        notebook_hash = get_notebook_hash(notebook_content)
+        # Download and hash the notebook unless the caller already did; the hash of
+        # a notebook version is memoised by its ETag
+        if notebook_hash is None:
+            notebook_content, etag = await self.storage.download_notebook_with_etag(notebook_path)
+            notebook_hash = get_notebook_hash_cache().get_or_compute(
+                notebook_path, etag, lambda: get_notebook_hash(notebook_content), db=self.db
+            )
         parameters_hash = get_parameters_hash(parameters)
         execution_hash = get_execution_hash(notebook_hash, parameters_hash)
         
@@ -188,6 +212,8 @@ class ExecutionService:
         
         Status workflow:
         - Initially set to 'pending' when execution is created in the database
+        - Rejected with RequirementsResolutionError before any record is created if
+          REQUIREMENTS_RESOLVE is set and the requirements cannot be resolved
         - Set to 'submitted' after the K8s job is successfully created
         - The notebook runner will update to 'running' when it starts
         - Finally updated to 'completed' or 'failed' by the notebook runner
@@ -206,19 +232,18 @@ class ExecutionService:
         Returns:
             Tuple of (execution, is_duplicate)
         """
-        # Fetch notebook content
-        notebook_content = await self.storage.download_notebook(notebook_path)
-        
-        # Extract notebook metadata to get the human-readable name
-        metadata_extractor = NotebookMetadataExtractor(notebook_content.decode('utf-8'))
-        metadata = metadata_extractor.extract_metadata()
-        
-        # Add notebook name to cache
-        notebook_name = metadata["identity"].get('name', '')
-        self.notebook_metadata_cache[notebook_path] = notebook_name
+        # Fetch and parse the notebook once; metadata and hash are derived from that parse
+        notebook = await PreparedNotebook.load(self.storage, notebook_path)
+        metadata = notebook.metadata
+        identity = notebook.identity
         
         # Convert parameters using notebook metadata
-        converted_parameters = await self._convert_parameters_using_metadata(notebook_content, parameters)
+        converted_parameters = self._convert_parameters(notebook.parameter_types, parameters)
+        
+        # Unchanged templates only pay for hashing the parameters
+        notebook_hash = get_notebook_hash_cache().get_or_compute(
+            notebook.path, notebook.etag, lambda: notebook.notebook_hash, db=self.db
+        )
         logger.info(f"Converted parameters: {converted_parameters}")
         
         # Log force_rerun status
@@ -229,60 +254,41 @@ class ExecutionService:
         if not force_rerun:
             logger.info("Checking for duplicate executions")
             is_duplicate, duplicate = await self.check_for_duplicate_execution(
-                notebook_path, converted_parameters, user_id=None  # Check for duplicates globally
+                notebook_path, converted_parameters, user_id=None,  # Check for duplicates globally
+                notebook_hash=notebook_hash
             )
             if is_duplicate:
                 logger.info(f"Found duplicate execution: {duplicate.id}")
-                # Add notebook_name to the duplicate execution object
-                duplicate.notebook_name = metadata["identity"].get('name', '')
                 return duplicate, True
         else:
             logger.info("Skipping duplicate check because force_rerun=True")
         
         # Compute hashes for the execution
-        notebook_hash = get_notebook_hash(notebook_content)
         parameters_hash = get_parameters_hash(converted_parameters)
         execution_hash = get_execution_hash(notebook_hash, parameters_hash)
         
         # Use metadata for resources if not explicitly provided
-        resources = metadata.get('resources', {})
-        if not python_version:
-            python_version = settings.DEFAULT_PYTHON_VERSION
-        
-        if not cpu_milli and resources.get('cpu_milli'):
-            cpu_milli = resources['cpu_milli']
-        elif not cpu_milli:
-            cpu_milli = settings.DEFAULT_CPU_MILLI
-        
-        if not memory_mib and resources.get('memory_mib'):
-            memory_mib = resources['memory_mib']
-        elif not memory_mib:
-            memory_mib = settings.DEFAULT_MEMORY_MIB
+        python_version, cpu_milli, memory_mib = self._resolve_resources(
+            metadata, python_version, cpu_milli, memory_mib
+        )
         
         # Extract requirements
         requirements = metadata.get('requirements', [])
         
+        # Lock the requirements now, so broken specs fail here instead of in the runner
+        requirements_lock = None
+        if settings.REQUIREMENTS_RESOLVE:
+            requirements_lock = await get_requirements_resolver().resolve(requirements, python_version)
+        
         # Generate a unique job ID and callback token
         job_id = str(uuid.uuid4())
         callback_token = create_callback_token()
         
         # Create execution record with converted parameters
-        execution = Execution(
-            id=job_id,
-            notebook_path=notebook_path,
-            parameters=converted_parameters,
-            status="pending",
-            created_at=datetime.utcnow(),
-            python_version=python_version,
-            cpu_milli=cpu_milli,
-            memory_mib=memory_mib,
-            requirements=requirements,
-            callback_token=callback_token,
-            user_id=user_id,
-            service_account_id=service_account_id,
-            notebook_hash=notebook_hash,
-            parameters_hash=parameters_hash,
-            execution_hash=execution_hash
+        execution = self._new_execution(
+            job_id, notebook_path, identity, converted_parameters, datetime.utcnow(),
+            python_version, cpu_milli, memory_mib, requirements, requirements_lock, callback_token,
+            user_id, service_account_id, notebook_hash, parameters_hash, execution_hash
         )
         
         self.db.add(execution)
@@ -298,7 +304,9 @@ class ExecutionService:
                 cpu_milli=cpu_milli,
                 memory_mib=memory_mib,
                 requirements=requirements,
-                callback_token=callback_token
+                callback_token=callback_token,
+                notebook_content=notebook.content,
+                requirements_lock=execution.requirements_lock
             )
             
             # Update status to submitted
@@ -312,82 +320,256 @@ class ExecutionService:
             self.db.commit()
             raise
         
-        # Add notebook_name to the execution object before returning
-        execution.notebook_name = notebook_name
-        
         return execution, False
 
+    async def create_executions(
+        self,
+        notebook_path: str,
+        parameter_sets: List[Dict],
+        python_version: Optional[str] = None,
+        cpu_milli: Optional[int] = None,
+        memory_mib: Optional[int] = None,
+        user_id: Optional[str] = None,
+        service_account_id: Optional[str] = None,
+        force_rerun: bool = False
+    ) -> List[dict]:
+        """
+        Create one execution of a notebook per parameter set, e.g. for a parameter sweep.
+        
+        The notebook is downloaded, parsed and hashed once, and its requirements are
+        locked once, for all executions. Duplicates are looked up in one query, the
+        new executions are inserted in one transaction, and their jobs are created
+        by the batch executor with bounded concurrency.
+        
+        Raises:
+            RequirementsResolutionError: if REQUIREMENTS_RESOLVE is set and the
+                requirements cannot be resolved; no execution is created
+        
+        Returns a list with a dictionary per parameter set, in order, with:
+        - execution: Execution - The new or duplicate execution, None if not created
+        - is_duplicate: bool - Whether execution is an earlier duplicate
+        - error: str - Why the execution was not created or its job failed, None otherwise
+        """
+        notebook = await PreparedNotebook.load(self.storage, notebook_path)
+        metadata = notebook.metadata
+        identity = notebook.identity
+        notebook_hash = get_notebook_hash_cache().get_or_compute(
+            notebook.path, notebook.etag, lambda: notebook.notebook_hash, db=self.db
+        )
+        python_version, cpu_milli, memory_mib = self._resolve_resources(
+            metadata, python_version, cpu_milli, memory_mib
+        )
+        requirements = metadata.get('requirements', [])
+        requirements_lock = None
+        if settings.REQUIREMENTS_RESOLVE:
+            requirements_lock = await get_requirements_resolver().resolve(requirements, python_version)
+        
+        results: List[Optional[dict]] = [None] * len(parameter_sets)
+        candidates = []
+        for index, parameters in enumerate(parameter_sets):
+            try:
+                converted_parameters = self._convert_parameters(notebook.parameter_types, parameters)
+            except Exception as e:
+                results[index] = {"execution": None, "is_duplicate": False, "error": str(e)}
+                continue
+            parameters_hash = get_parameters_hash(converted_parameters)
+            candidates.append((index, converted_parameters, parameters_hash, get_execution_hash(notebook_hash, parameters_hash)))
+        
+        duplicates = {}
+        if not force_rerun and candidates:
+            duplicates = self._find_completed_executions([candidate[3] for candidate in candidates])
+        
+        now = datetime.utcnow()
+        new_executions = []
+        jobs = []
+        for index, converted_parameters, parameters_hash, execution_hash in candidates:
+            if execution_hash in duplicates:
+                results[index] = {"execution": duplicates[execution_hash], "is_duplicate": True, "error": None}
+                continue
+            
+            job_id = str(uuid.uuid4())
+            callback_token = create_callback_token()
+            new_executions.append((index, self._new_execution(
+                job_id, notebook_path, identity, converted_parameters, now,
+                python_version, cpu_milli, memory_mib, requirements, requirements_lock, callback_token,
+                user_id, service_account_id, notebook_hash, parameters_hash, execution_hash
+            )))
+            jobs.append({
+                "notebook_path": notebook_path,
+                "parameters": converted_parameters,
+                "python_version": python_version,
+                "job_name": job_id,
+                "cpu_milli": cpu_milli,
+                "memory_mib": memory_mib,
+                "requirements": requirements,
+                "callback_token": callback_token,
+                "notebook_content": notebook.content,
+                "requirements_lock": list(requirements_lock.requirements) if requirements_lock else None
+            })
+        
+        if not new_executions:
+            return results
+        
+        self.db.add_all([execution for _, execution in new_executions])
+        self.db.commit()
+        logger.info(f"Created {len(new_executions)} executions of {notebook_path}")
+        
+        outcomes = await self.batch_executor.create_jobs(jobs)
+        
+        submitted_ids = []
+        for (index, execution), job, outcome in zip(new_executions, jobs, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Failed to create job for execution {job['job_name']}: {str(outcome)}")
+                self.db.query(Execution).filter(Execution.id == job["job_name"]).update(
+                    {"status": "failed", "error": str(outcome)}, synchronize_session=False
+                )
+                results[index] = {"execution": execution, "is_duplicate": False, "error": str(outcome)}
+            else:
+                submitted_ids.append(job["job_name"])
+                results[index] = {"execution": execution, "is_duplicate": False, "error": None}
+        
+        # Runners may already have reported a later status, which must not be overwritten
+        if submitted_ids:
+            self.db.query(Execution).filter(
+                Execution.id.in_(submitted_ids),
+                Execution.status == "pending"
+            ).update({"status": "submitted"}, synchronize_session=False)
+        self.db.commit()
+        
+        # Refresh the returned executions in one query instead of one lazy load each
+        self.db.query(Execution).filter(
+            Execution.id.in_([job["job_name"] for job in jobs])
+        ).populate_existing().all()
+        return results
+
+    @staticmethod
+    def _new_execution(
+        job_id: str,
+        notebook_path: str,
+        identity: Dict,
+        parameters: Dict,
+        created_at: datetime,
+        python_version: str,
+        cpu_milli: int,
+        memory_mib: int,
+        requirements,
+        requirements_lock,
+        callback_token: str,
+        user_id: Optional[str],
+        service_account_id: Optional[str],
+        notebook_hash: str,
+        parameters_hash: str,
+        execution_hash: str
+    ) -> Execution:
+        """Pending execution record of a notebook with converted parameters"""
+        return Execution(
+            id=job_id,
+            notebook_path=notebook_path,
+            notebook_name=identity.get('name', ''),
+            notebook_description=identity.get('description', ''),
+            notebook_tags=identity.get('tags', []),
+            parameters=parameters,
+            status="pending",
+            created_at=created_at,
+            python_version=python_version,
+            cpu_milli=cpu_milli,
+            memory_mib=memory_mib,
+            requirements=requirements,
+            requirements_lock=list(requirements_lock.requirements) if requirements_lock else None,
+            requirements_lock_hash=requirements_lock.hash if requirements_lock else None,
+            callback_token=callback_token,
+            user_id=user_id,
+            service_account_id=service_account_id,
+            notebook_hash=notebook_hash,
+            parameters_hash=parameters_hash,
+            execution_hash=execution_hash
+        )
+
+    def _find_completed_executions(self, execution_hashes: List[str]) -> Dict[str, Execution]:
+        """Most recent successful execution for each execution hash, like check_for_duplicate_execution"""
+        executions = (
+            self.db.query(Execution)
+            .filter(
+                Execution.execution_hash.in_(set(execution_hashes)),
+                Execution.status == "completed",
+                Execution.error.is_(None)
+            )
+            .order_by(Execution.created_at.desc())
+            .all()
+        )
+        duplicates = {}
+        for execution in executions:
+            duplicates.setdefault(execution.execution_hash, execution)
+        return duplicates
+
+    def _resolve_resources(
+        self,
+        metadata: Dict,
+        python_version: Optional[str],
+        cpu_milli: Optional[int],
+        memory_mib: Optional[int]
+    ) -> Tuple[str, int, int]:
+        """Python version and resources of an execution, from the request, the notebook metadata or the defaults"""
+        resources = metadata.get('resources', {})
+        if not python_version:
+            python_version = settings.DEFAULT_PYTHON_VERSION
+        
+        if not cpu_milli and resources.get('cpu_milli'):
+            cpu_milli = resources['cpu_milli']
+        elif not cpu_milli:
+            cpu_milli = settings.DEFAULT_CPU_MILLI
+        
+        if not memory_mib and resources.get('memory_mib'):
+            memory_mib = resources['memory_mib']
+        elif not memory_mib:
+            memory_mib = settings.DEFAULT_MEMORY_MIB
+        
+        return python_version, cpu_milli, memory_mib
+
     async def get_execution(self, execution_id: str) -> Execution:
-        """Get a specific execution by ID and enrich with notebook metadata"""
+        """Get a specific execution by ID"""
         execution = self.db.query(Execution).get(execution_id)
         if not execution:
             raise ValueError(f"Execution {execution_id} not found")
-            
-        # Add notebook name if available
-        if execution.notebook_path:
-            # Check cache first
-            if execution.notebook_path in self.notebook_metadata_cache:
-                execution.notebook_name = self.notebook_metadata_cache[execution.notebook_path]
-            else:
-                try:
-                    # If not in cache, fetch and cache it
-                    notebook_content = await self.storage.download_notebook(execution.notebook_path)
-                    metadata_extractor = NotebookMetadataExtractor(notebook_content.decode('utf-8'))
-                    metadata = metadata_extractor.extract_metadata()
-                    
-                    notebook_name = metadata["identity"].get('name', '')
-                    execution.notebook_name = notebook_name
-                    
-                    # Add to cache
-                    self.notebook_metadata_cache[execution.notebook_path] = notebook_name
-                except Exception as e:
-                    # Log error but don't fail the request
-                    logger.warning(f"Failed to get notebook metadata for path {execution.notebook_path}: {str(e)}")
-                    execution.notebook_name = ""
         
         return execution
     
-    async def list_executions(self, notebook_path: Optional[str] = None) -> list:
-        """List executions, optionally filtered by notebook path, and enrich with notebook metadata"""
-        query = self.db.query(Execution)
-        if notebook_path:
-            query = query.filter(Execution.notebook_path == notebook_path)
+    async def list_executions(
+        self,
+        notebook_path: Optional[str] = None,
+        *,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        status: Optional[str] = None,
+        user_id: Optional[str] = None,
+        service_account_id: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None
+    ) -> Tuple[List[Execution], Optional[str]]:
+        """
+        List one page of executions, newest first.
         
-        executions = query.order_by(Execution.created_at.desc()).all()
+        Filtering and pagination happen in the database; the notebook identity is
+        stored on each execution, so no notebook is downloaded.
         
-        # Fetch notebook metadata for all executions to get their names
-        # Group by notebook_path to avoid redundant fetches
-        notebook_names = {}
-        for execution in executions:
-            if execution.notebook_path:
-                # Check if we have this path in the cache
-                if execution.notebook_path in self.notebook_metadata_cache:
-                    notebook_names[execution.notebook_path] = self.notebook_metadata_cache[execution.notebook_path]
-                # Only fetch metadata if we haven't seen this notebook before
-                elif execution.notebook_path not in notebook_names:
-                    try:
-                        # Download notebook content
-                        notebook_content = await self.storage.download_notebook(execution.notebook_path)
-                        
-                        # Extract metadata to get the name
-                        metadata_extractor = NotebookMetadataExtractor(notebook_content.decode('utf-8'))
-                        metadata = metadata_extractor.extract_metadata()
-                        
-                        # Store the name for this path
-                        notebook_name = metadata["identity"].get('name', '')
-                        notebook_names[execution.notebook_path] = notebook_name
-                        
-                        # Add to the cache
-                        self.notebook_metadata_cache[execution.notebook_path] = notebook_name
-                    except Exception as e:
-                        # Log the error but don't fail the request
-                        logger.warning(f"Failed to get notebook metadata for path {execution.notebook_path}: {str(e)}")
-                        notebook_names[execution.notebook_path] = ""
-                
-                # Set the notebook name as a transient attribute
-                execution.notebook_name = notebook_names.get(execution.notebook_path, "")
+        Returns:
+            Tuple of (executions, next_cursor); next_cursor is None on the last page
+        """
+        executions, next_cursor = crud.execution.get_page(
+            self.db,
+            limit=limit,
+            cursor=cursor,
+            skip=skip,
+            notebook_path=notebook_path,
+            status=status,
+            user_id=user_id,
+            service_account_id=service_account_id,
+            created_after=created_after,
+            created_before=created_before
+        )
         
-        return executions
+        return executions, next_cursor
     
     async def update_execution_status(
         self,
@@ -404,6 +586,11 @@ class ExecutionService:
         execution = self.db.query(Execution).get(execution_id)
         if not execution:
             raise ValueError(f"Execution {execution_id} not found")
+        
+        # A runner may still be working on an execution that was cancelled
+        if execution.status == "cancelled":
+            logger.info(f"Ignoring status '{status}' reported for cancelled execution {execution_id}")
+            return execution
             
         execution.status = status
         if start_time:
@@ -435,6 +622,7 @@ class ExecutionService:
                 )
             
         self.db.commit()
+        await self.batch_executor.job_status_changed(execution_id, status)
         return execution
 
     async def cancel_execution(self, execution_id: str) -> dict:
@@ -468,8 +656,7 @@ class ExecutionService:
             
             if success:
                 logger.info(f"Successfully cancelled execution {execution_id}")
-                execution.status = "cancelled"
-                execution.completed_at = datetime.utcnow()
+                self._mark_cancelled([execution_id])
                 self.db.commit()
                 return {
                     "success": True,
@@ -509,6 +696,82 @@ class ExecutionService:
                 "status": execution.status
             }
 
+    async def cancel_executions(
+        self,
+        execution_ids: Optional[List[str]] = None,
+        notebook_path: Optional[str] = None,
+        status: Optional[str] = None,
+        user_id: Optional[str] = None,
+        created_before: Optional[datetime] = None,
+        limit: int = 1000
+    ) -> List[dict]:
+        """
+        Cancel many executions, selected by ID and/or filter
+        
+        The jobs of all selected executions are cancelled by the batch executor in
+        one call, and the executions are updated in one commit. When user_id is
+        given, only executions of that user are selected.
+        
+        Returns a list of dictionaries like cancel_execution, with execution_id;
+        requested IDs that are not found or cannot be cancelled are included.
+        """
+        executions = crud.execution.get_cancellable(
+            self.db,
+            execution_ids=execution_ids,
+            notebook_path=notebook_path,
+            status=status,
+            user_id=user_id,
+            created_before=created_before,
+            limit=limit
+        )
+        selected = {execution.id for execution in executions}
+        results = [
+            {
+                "execution_id": execution_id,
+                "success": False,
+                "reason": f"Execution {execution_id} not found or not in a cancellable state",
+                "status": None
+            }
+            for execution_id in dict.fromkeys(execution_ids or []) if execution_id not in selected
+        ]
+        if not executions:
+            return results
+        
+        job_results = await self.batch_executor.cancel_jobs(
+            [f"notebook-execution-{execution.id}" for execution in executions]
+        )
+        
+        cancelled_ids = []
+        for execution in executions:
+            if job_results.get(f"notebook-execution-{execution.id}"):
+                cancelled_ids.append(execution.id)
+                results.append({
+                    "execution_id": execution.id,
+                    "success": True,
+                    "reason": "Execution successfully cancelled",
+                    "status": "cancelled"
+                })
+            else:
+                results.append({
+                    "execution_id": execution.id,
+                    "success": False,
+                    "reason": f"Failed to cancel execution {execution.id} - its job may have already finished",
+                    "status": execution.status
+                })
+        if cancelled_ids:
+            self._mark_cancelled(cancelled_ids)
+        self.db.commit()
+        
+        cancelled = sum(1 for result in results if result["success"])
+        logger.info(f"Cancelled {cancelled} of {len(executions)} executions")
+        return results
+
+    def _mark_cancelled(self, execution_ids: List[str]) -> None:
+        """Mark executions cancelled, replacing a failure the job reconciler recorded for the deleted job"""
+        self.db.query(Execution).filter(Execution.id.in_(execution_ids)).update(
+            {"status": "cancelled", "error": None, "completed_at": datetime.utcnow()}
+        )
+
     async def update_execution_status_if_not_found(self, execution_id: str) -> None:
         """
         Update execution status when the job is not found in Kubernetes.
@@ -0,0 +1,326 @@
+"""
+Job Reconciler
+
+This module keeps execution statuses in line with their Kubernetes jobs when the
+runner cannot report back, e.g. because its pod was OOM-killed or evicted. One
+watch on the notebook runner jobs and one on their pods stream every change for
+the whole namespace, resuming from the last seen resourceVersion, so tracking
+costs nothing per execution. Only the backend process holding a Lease runs them.
+Terminal transitions are collected and applied to the execution rows in batches.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from kubernetes import client, config, watch
+from kubernetes.client.exceptions import ApiException
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.execution import Execution
+from app.services.batch_executors.k8s_executor import RUNNER_LABEL_SELECTOR
+from app.services.leader_election import LeaseElector, process_identity
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EXECUTION_ID_LABEL = "execution-id"
+
+# Executions in these states are still waiting for their job
+ACTIVE_STATUSES = ("pending", "submitted", "running")
+
+
+class ResourceVersionExpired(Exception):
+    """The watch can no longer resume from its resourceVersion and has to list again"""
+
+
+def job_failure(job: client.V1Job, event_type: str) -> Optional[str]:
+    """Error of an execution whose job ended without the runner reporting, or None if it has not ended"""
+    if event_type == "DELETED":
+        return "The Kubernetes job was deleted before the execution finished"
+
+    status = job.status
+    for condition in (status.conditions if status else None) or []:
+        if condition.status != "True":
+            continue
+        if condition.type == "Failed":
+            detail = ": ".join(filter(None, [condition.reason, condition.message]))
+            return f"Kubernetes job failed{': ' + detail if detail else ''}"
+        if condition.type == "Complete":
+            # The runner reports its result before it exits
+            return "The notebook runner exited without reporting a result"
+    return None
+
+
+def pod_failure(pod: client.V1Pod) -> Optional[str]:
+    """Error of an execution whose runner pod was killed, or None if the pod has not failed"""
+    status = pod.status
+    if status is None:
+        return None
+
+    for container in status.container_statuses or []:
+        terminated = container.state.terminated if container.state else None
+        if terminated is not None and terminated.reason == "OOMKilled":
+            return "The notebook runner was killed because it ran out of memory (OOMKilled)"
+
+    if status.phase == "Failed" and status.reason:
+        detail = f": {status.message}" if status.message else ""
+        return f"The notebook runner pod failed ({status.reason}){detail}"
+    return None
+
+
+class JobReconciler:
+    """
+    Mark executions failed when their job or pod fails behind the runner's back
+
+    Jobs and pods are each followed by a list followed by a watch from the
+    list's resourceVersion; when the watch ends it resumes from the last event,
+    and when the version has expired it lists again. The initial list also
+    reconciles jobs that ended while no reconciler was running.
+    """
+
+    def __init__(
+        self,
+        batch_v1: client.BatchV1Api,
+        core_v1: client.CoreV1Api,
+        namespace: str,
+        session_factory: Callable[[], Session] = SessionLocal,
+        watch_factory: Callable[[], watch.Watch] = watch.Watch,
+        flush_interval: float = 1.0,
+        watch_timeout_seconds: int = 60
+    ):
+        self.namespace = namespace
+        self.session_factory = session_factory
+        self.watch_factory = watch_factory
+        self.flush_interval = flush_interval
+        self.watch_timeout_seconds = watch_timeout_seconds
+        self.list_functions = {
+            "job": batch_v1.list_namespaced_job,
+            "pod": core_v1.list_namespaced_pod,
+        }
+        self.resource_versions: Dict[str, Optional[str]] = {kind: None for kind in self.list_functions}
+        self._pending: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watches: Dict[str, watch.Watch] = {}
+
+    def handle_event(self, kind: str, event_type: str, obj) -> None:
+        """Record the failure of an execution if the event shows one"""
+        labels = (obj.metadata.labels if obj.metadata else None) or {}
+        execution_id = labels.get(EXECUTION_ID_LABEL)
+        if not execution_id:
+            return
+
+        error = job_failure(obj, event_type) if kind == "job" else pod_failure(obj)
+        if error is not None:
+            with self._lock:
+                # The first failure seen is the most specific, e.g. OOMKilled before BackoffLimitExceeded
+                self._pending.setdefault(execution_id, ("failed", error))
+
+    def flush(self, db: Session) -> int:
+        """Apply the recorded failures to executions that are still active; returns the number updated"""
+        with self._lock:
+            updates, self._pending = self._pending, {}
+        if not updates:
+            return 0
+
+        executions = (
+            db.query(Execution)
+            .filter(Execution.id.in_(list(updates)), Execution.status.in_(ACTIVE_STATUSES))
+            .all()
+        )
+        now = datetime.utcnow()
+        for execution in executions:
+            execution.status, execution.error = updates[execution.id]
+            execution.completed_at = now
+            logger.info(f"Reconciled execution {execution.id}: {execution.error}")
+        db.commit()
+        return len(executions)
+
+    def list_and_watch(self, kind: str) -> None:
+        """
+        Follow one kind of object until the watch ends
+
+        Lists first if there is no resourceVersion to resume from.
+        """
+        list_function = self.list_functions[kind]
+        if self.resource_versions[kind] is None:
+            listing = list_function(self.namespace, label_selector=RUNNER_LABEL_SELECTOR)
+            for obj in listing.items:
+                self.handle_event(kind, "ADDED", obj)
+            self.resource_versions[kind] = listing.metadata.resource_version
+
+        stream_watch = self.watch_factory()
+        self._watches[kind] = stream_watch
+        try:
+            for event in stream_watch.stream(
+                list_function,
+                self.namespace,
+                label_selector=RUNNER_LABEL_SELECTOR,
+                resource_version=self.resource_versions[kind],
+                timeout_seconds=self.watch_timeout_seconds
+            ):
+                if event["type"] == "ERROR":
+                    raw = event.get("raw_object") or {}
+                    if raw.get("code") == 410:
+                        raise ResourceVersionExpired()
+                    logger.warning(f"Error event while watching {kind}s: {raw.get('message')}")
+                    continue
+                obj = event["object"]
+                self.handle_event(kind, event["type"], obj)
+                if obj.metadata and obj.metadata.resource_version:
+                    self.resource_versions[kind] = obj.metadata.resource_version
+        except ApiException as e:
+            if e.status != 410:
+                raise
+            raise ResourceVersionExpired() from e
+        finally:
+            self._watches.pop(kind, None)
+
+    def _follow(self, kind: str) -> None:
+        """Keep watching one kind of object until stopped"""
+        while not self._stopped.is_set():
+            try:
+                self.list_and_watch(kind)
+            except ResourceVersionExpired:
+                logger.info(f"Watch on {kind}s expired, listing again")
+                self.resource_versions[kind] = None
+            except Exception as e:
+                logger.warning(f"Watch on {kind}s failed: {str(e)}")
+                self._stopped.wait(5)
+
+    def _flush_once(self) -> None:
+        db = self.session_factory()
+        try:
+            self.flush(db)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to reconcile execution statuses: {str(e)}")
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        """
+        Watch jobs and pods in background threads and flush failures until stopped
+
+        The watch threads are daemons and are not waited for on shutdown: a watch
+        only notices stop() at its next event or server-side timeout.
+        """
+        for kind in self.list_functions:
+            threading.Thread(target=self._follow, args=(kind,), name=f"job-reconciler-{kind}", daemon=True).start()
+        try:
+            while not self._stopped.is_set():
+                await asyncio.sleep(self.flush_interval)
+                await asyncio.to_thread(self._flush_once)
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """Stop watching; open watches end at their next event or timeout"""
+        self._stopped.set()
+        for stream_watch in list(self._watches.values()):
+            stream_watch.stop()
+
+
+class JobReconcilerManager:
+    """
+    Manager for the job reconciler of the cluster
+
+    Every backend process runs a manager, but only the one holding the
+    K8S_RECONCILER_LEASE_NAME Lease runs the reconciler, so jobs and pods are
+    watched once however many workers and replicas there are. When the leader
+    stops or dies, another process takes over within K8S_RECONCILER_LEASE_SECONDS.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self.elector: Optional[LeaseElector] = None
+        self.reconciler: Optional[JobReconciler] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def get_instance(cls):
+        """Get singleton instance"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def start(self) -> None:
+        """Start competing for the reconciler lease if jobs run on Kubernetes"""
+        if not settings.K8S_RECONCILER_ENABLED or settings.BATCH_EXECUTOR != "k8s" or self.task is not None:
+            return
+        try:
+            if os.getenv('KUBERNETES_SERVICE_HOST'):
+                config.load_incluster_config()
+            else:
+                config.load_kube_config()
+        except Exception as e:
+            logger.warning(f"Not reconciling job statuses, Kubernetes is not configured: {str(e)}")
+            return
+        self.elector = LeaseElector(
+            client.CoordinationV1Api(),
+            settings.K8S_NAMESPACE,
+            settings.K8S_RECONCILER_LEASE_NAME,
+            process_identity(),
+            lease_seconds=settings.K8S_RECONCILER_LEASE_SECONDS
+        )
+        self.task = asyncio.create_task(self.lead())
+
+    def _create_reconciler(self) -> JobReconciler:
+        return JobReconciler(
+            client.BatchV1Api(),
+            client.CoreV1Api(),
+            settings.K8S_NAMESPACE,
+            flush_interval=settings.K8S_RECONCILER_FLUSH_SECONDS
+        )
+
+    async def lead(self) -> None:
+        """Run the reconciler while this process holds the lease"""
+        reconciler_task: Optional[asyncio.Task] = None
+        try:
+            while True:
+                try:
+                    leading = await asyncio.to_thread(self.elector.try_acquire_or_renew)
+                except Exception as e:
+                    logger.warning(f"Failed to renew the job reconciler lease: {str(e)}")
+                    leading = False
+
+                if leading and reconciler_task is None:
+                    logger.info(f"Reconciling job statuses in namespace {settings.K8S_NAMESPACE}")
+                    self.reconciler = self._create_reconciler()
+                    reconciler_task = asyncio.create_task(self.reconciler.run())
+                elif not leading and reconciler_task is not None:
+                    # Another process may already be reconciling; updates are idempotent
+                    logger.info("Lost the job reconciler lease, no longer reconciling")
+                    await self._stop_reconciler(reconciler_task)
+                    reconciler_task = None
+                await asyncio.sleep(self.elector.renew_seconds)
+        finally:
+            if reconciler_task is not None:
+                await self._stop_reconciler(reconciler_task)
+                await asyncio.to_thread(self.elector.release)
+
+    async def _stop_reconciler(self, task: asyncio.Task) -> None:
+        self.reconciler.stop()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self.reconciler = None
+
+    async def stop(self) -> None:
+        """Stop reconciling and hand the lease to another process"""
+        if self.task is None:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+
+
+def get_job_reconciler_manager() -> JobReconcilerManager:
+    """Get the process-wide job reconciler manager"""
+    return JobReconcilerManager.get_instance()
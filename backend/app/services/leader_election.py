@@ -0,0 +1,116 @@
+"""
+Leader Election
+
+This module elects one process among all backend workers and replicas through a
+Kubernetes coordination.k8s.io Lease, for background work that must run exactly
+once per cluster, such as the job reconciler.
+"""
+
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+
+from kubernetes import client
+from kubernetes.client.exceptions import ApiException
+
+logger = logging.getLogger(__name__)
+
+
+def process_identity() -> str:
+    """Identity of this process as a lease holder: pod name and process ID"""
+    return f"{os.getenv('HOSTNAME') or socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseElector:
+    """
+    Acquire and renew a Lease; the process holding it is the leader
+
+    The holder renews the lease every renew_seconds. Others take it over once it
+    has not been renewed for lease_seconds, e.g. because the holder's pod died.
+    Updates carry the lease's resourceVersion, so of two processes racing for an
+    expired lease only one succeeds.
+    """
+
+    def __init__(
+        self,
+        coordination_v1: client.CoordinationV1Api,
+        namespace: str,
+        name: str,
+        identity: str,
+        lease_seconds: int = 15
+    ):
+        self.api = coordination_v1
+        self.namespace = namespace
+        self.name = name
+        self.identity = identity
+        self.lease_seconds = lease_seconds
+        # Renew well before the lease runs out, so a slow renewal does not lose it
+        self.renew_seconds = max(lease_seconds / 3, 1)
+
+    def try_acquire_or_renew(self) -> bool:
+        """Take or renew the lease; returns whether this process is the leader"""
+        now = datetime.now(timezone.utc)
+        try:
+            lease = self.api.read_namespaced_lease(self.name, self.namespace)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            return self._create(now)
+
+        spec = lease.spec or client.V1LeaseSpec()
+        if spec.holder_identity != self.identity:
+            if spec.holder_identity and not self._expired(spec, now):
+                return False
+            spec.holder_identity = self.identity
+            spec.acquire_time = now
+            spec.lease_transitions = (spec.lease_transitions or 0) + 1
+        spec.renew_time = now
+        spec.lease_duration_seconds = self.lease_seconds
+        lease.spec = spec
+        try:
+            self.api.replace_namespaced_lease(self.name, self.namespace, lease)
+        except ApiException as e:
+            if e.status == 409:
+                # Another process updated the lease first
+                return False
+            raise
+        return True
+
+    def release(self) -> None:
+        """Give up the lease if this process holds it, so another one takes over at once"""
+        try:
+            lease = self.api.read_namespaced_lease(self.name, self.namespace)
+            if lease.spec is None or lease.spec.holder_identity != self.identity:
+                return
+            lease.spec.holder_identity = None
+            self.api.replace_namespaced_lease(self.name, self.namespace, lease)
+        except ApiException as e:
+            logger.warning(f"Failed to release lease {self.name}: {str(e)}")
+
+    def _create(self, now: datetime) -> bool:
+        lease = client.V1Lease(
+            metadata=client.V1ObjectMeta(name=self.name, namespace=self.namespace),
+            spec=client.V1LeaseSpec(
+                holder_identity=self.identity,
+                lease_duration_seconds=self.lease_seconds,
+                acquire_time=now,
+                renew_time=now,
+                lease_transitions=0
+            )
+        )
+        try:
+            self.api.create_namespaced_lease(self.namespace, lease)
+        except ApiException as e:
+            if e.status == 409:
+                return False
+            raise
+        return True
+
+    def _expired(self, spec: client.V1LeaseSpec, now: datetime) -> bool:
+        if spec.renew_time is None:
+            return True
+        renew_time = spec.renew_time
+        if renew_time.tzinfo is None:
+            renew_time = renew_time.replace(tzinfo=timezone.utc)
+        return renew_time + timedelta(seconds=spec.lease_duration_seconds or self.lease_seconds) < now
@@ -0,0 +1,130 @@
+"""
+Notebook Hash Cache
+
+This module memoises the output-stripped notebook hash used for duplicate detection,
+keyed by storage path and ETag. An ETag identifies one version of an object, so the
+hash of a template only has to be computed once per version. The in-process tier is
+backed by the notebook template index in the database, which survives restarts and
+is shared by all API workers.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class NotebookHashCache:
+    """
+    Map (path, ETag) to the canonical notebook hash.
+
+    Lookups check the in-process LRU first and then, when a database session is
+    given, the notebook template index. Notebooks without an ETag are never cached.
+    """
+
+    def __init__(self, maxsize: int = 4096, use_db: bool = True):
+        self.maxsize = maxsize
+        self.use_db = use_db
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, etag: Optional[str], db: Optional[Session] = None) -> Optional[str]:
+        """Get the hash of a notebook version, or None if it is not known"""
+        if not etag:
+            return None
+
+        key = (path, etag)
+        with self._lock:
+            notebook_hash = self._entries.get(key)
+            if notebook_hash is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return notebook_hash
+
+        if db is not None and self.use_db:
+            notebook_hash = crud.notebook_template.get_notebook_hash(db, path=path, etag=etag)
+            if notebook_hash is not None:
+                self._remember(key, notebook_hash)
+                with self._lock:
+                    self.hits += 1
+                return notebook_hash
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, path: str, etag: Optional[str], notebook_hash: str, db: Optional[Session] = None) -> None:
+        """Store the hash of a notebook version"""
+        if not etag:
+            return
+
+        self._remember((path, etag), notebook_hash)
+        if db is not None and self.use_db:
+            try:
+                crud.notebook_template.set_notebook_hash(db, path=path, etag=etag, notebook_hash=notebook_hash)
+            except Exception as e:
+                # The in-process tier still holds the hash
+                logger.warning(f"Failed to store notebook hash for {path}: {str(e)}")
+                db.rollback()
+
+    def get_or_compute(
+        self,
+        path: str,
+        etag: Optional[str],
+        compute: Callable[[], str],
+        db: Optional[Session] = None
+    ) -> str:
+        """
+        Get the hash of a notebook version, computing and storing it on a miss.
+
+        Args:
+            path: Storage path of the notebook
+            etag: ETag of the downloaded version, or None if unknown
+            compute: Function computing the hash from the notebook content
+            db: Optional session for the database tier
+        """
+        notebook_hash = self.get(path, etag, db)
+        if notebook_hash is None:
+            notebook_hash = compute()
+            self.set(path, etag, notebook_hash, db)
+        return notebook_hash
+
+    def _remember(self, key: Tuple[str, str], notebook_hash: str) -> None:
+        with self._lock:
+            self._entries[key] = notebook_hash
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class NotebookHashCacheManager:
+    """Manager for the process-wide notebook hash cache"""
+
+    _instance = None
+
+    def __init__(self):
+        self.cache = NotebookHashCache(
+            maxsize=settings.NOTEBOOK_HASH_CACHE_SIZE,
+            use_db=settings.NOTEBOOK_HASH_CACHE_DB
+        )
+
+    @classmethod
+    def get_instance(cls):
+        """Get singleton instance"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+
+def get_notebook_hash_cache() -> NotebookHashCache:
+    """Get the process-wide notebook hash cache"""
+    return NotebookHashCacheManager.get_instance().cache
@@ -0,0 +1,116 @@
+"""
+Notebook Metadata Index
+
+This module keeps the parsed metadata of notebook templates in the database, keyed
+by storage path and ETag. Listing templates then needs one storage LIST call and one
+index query; a notebook is only downloaded and parsed again when its ETag changes.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import get_settings
+from app.services.notebook_metadata import NotebookMetadataExtractor
+from app.services.storage.interface import BaseStorageService
+from app.utils.concurrency import gather_bounded
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class NotebookIndex:
+    """
+    Serve notebook template metadata from the database index.
+
+    Index entries are written when a template is uploaded through the API and
+    lazily whenever a listed template has no entry or its ETag has changed.
+    """
+
+    def __init__(self, db: Session, storage: BaseStorageService):
+        self.db = db
+        self.storage = storage
+
+    async def get_metadata(self, notebooks: List[Dict]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the parsed metadata of notebooks from a storage listing.
+
+        Args:
+            notebooks: Listing entries as returned by BaseStorageService.list_notebooks
+
+        Returns:
+            Dictionary mapping each notebook path to its metadata, in the format
+            produced by NotebookMetadataExtractor.extract_metadata()
+        """
+        indexed = crud.notebook_template.get_by_paths(self.db, [notebook['path'] for notebook in notebooks])
+
+        result = {}
+        stale = []
+        for notebook in notebooks:
+            template = indexed.get(notebook['path'])
+            if template is not None and notebook.get('etag') and template.etag == notebook['etag']:
+                result[notebook['path']] = template.to_metadata()
+            else:
+                stale.append(notebook)
+
+        if stale:
+            logger.info(f"Indexing metadata of {len(stale)} of {len(notebooks)} notebook templates")
+            downloads = await gather_bounded(
+                (self.storage.download_notebook_with_etag(notebook['path']) for notebook in stale),
+                limit=settings.STORAGE_MAX_CONCURRENCY
+            )
+            for notebook, (content, etag) in zip(stale, downloads):
+                result[notebook['path']] = self._extract(notebook, content, etag)
+            self._commit()
+
+        return result
+
+    async def get_notebook_metadata(self, notebook: Dict) -> Dict[str, Any]:
+        """Get the parsed metadata of a single notebook listing entry"""
+        return (await self.get_metadata([notebook]))[notebook['path']]
+
+    def record(self, notebook: Dict, metadata: Dict[str, Any]) -> None:
+        """
+        Store metadata that was already extracted, e.g. while uploading a template.
+
+        Args:
+            notebook: Listing entry of the stored notebook, including its ETag
+            metadata: Metadata as produced by NotebookMetadataExtractor.extract_metadata()
+        """
+        self._upsert(notebook, metadata)
+        self._commit()
+
+    def _extract(self, notebook: Dict, content: bytes, etag: Optional[str]) -> Dict[str, Any]:
+        """
+        Parse a downloaded notebook and stage its metadata in the index
+
+        The metadata is only indexed when the downloaded version is the listed one;
+        a cached copy that predates the listing must not be filed under its ETag.
+        """
+        metadata = NotebookMetadataExtractor(content).extract_metadata()
+        if etag and etag == notebook.get('etag'):
+            self._upsert(notebook, metadata)
+        else:
+            logger.info(f"Not indexing {notebook['path']}: downloaded version {etag} is not the listed {notebook.get('etag')}")
+        return metadata
+
+    def _upsert(self, notebook: Dict, metadata: Dict[str, Any]) -> None:
+        crud.notebook_template.upsert(
+            self.db,
+            path=notebook['path'],
+            etag=notebook.get('etag'),
+            metadata=metadata,
+            size=notebook.get('size'),
+            last_modified=notebook.get('last_modified'),
+            commit=False
+        )
+
+    def _commit(self) -> None:
+        """Commit staged index entries; losing a race with another request is harmless"""
+        try:
+            self.db.commit()
+        except IntegrityError as e:
+            logger.info(f"Notebook template index was updated concurrently: {str(e)}")
+            self.db.rollback()
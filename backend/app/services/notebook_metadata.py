@@ -38,19 +38,41 @@ class NotebookMetadataExtractor:
         Args:
             notebook_content: String containing the notebook JSON content
         """
-        # Load the notebook to determine its version
+        self.notebook = self.load_notebook(notebook_content)
+    
+    @classmethod
+    def from_notebook(cls, notebook: nbformat.NotebookNode) -> "NotebookMetadataExtractor":
+        """
+        Create an extractor for a notebook that was already parsed with load_notebook().
+        
+        Args:
+            notebook: The parsed notebook
+        """
+        extractor = cls.__new__(cls)
+        extractor.notebook = notebook
+        return extractor
+    
+    @staticmethod
+    def load_notebook(notebook_content: bytes) -> nbformat.NotebookNode:
+        """
+        Parse notebook content once, keeping its own format version.
+        
+        Args:
+            notebook_content: String or bytes containing the notebook JSON content
+            
+        Returns:
+            The parsed notebook
+            
+        Raises:
+            ValueError: If the notebook format version is not supported
+        """
         notebook = nbformat.reads(notebook_content, as_version=nbformat.NO_CONVERT)
         
-        # Extract the version
+        # Version 3 and 4 notebooks are read as they are
         version = notebook['nbformat']
-        
-        # Handle different versions
-        if version == 4:
-            self.notebook = nbformat.reads(notebook_content, as_version=4)
-        elif version == 3:
-            self.notebook = nbformat.reads(notebook_content, as_version=3)
-        else:
-            raise ValueError(f"Unsupported notebook version: {version}")            
+        if version not in (3, 4):
+            raise ValueError(f"Unsupported notebook version: {version}")
+        return notebook
     
     @staticmethod
     def parse_notebook(notebook_content: bytes) -> Dict[str, Any]:
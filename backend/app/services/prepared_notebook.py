@@ -0,0 +1,69 @@
+"""
+Prepared Notebook
+
+This module provides a notebook that is downloaded and parsed once per submission.
+Metadata, the parameter type map and the duplicate-detection hash are all derived
+from that single parse instead of re-reading the notebook JSON for each of them.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.services.notebook_metadata import NotebookMetadataExtractor
+from app.services.storage.interface import BaseStorageService
+from app.utils.hash_utils import get_notebook_node_hash
+
+logger = logging.getLogger(__name__)
+
+
+class PreparedNotebook:
+    """
+    A notebook template parsed once, with its derived data computed on first use.
+
+    Attributes:
+        path: Storage path of the notebook
+        content: Raw notebook content as downloaded
+        etag: ETag of the downloaded version, if the storage reports one
+        notebook: The parsed notebook, in its own format version
+    """
+
+    def __init__(self, path: str, content: bytes, etag: Optional[str] = None):
+        self.path = path
+        self.content = content
+        self.etag = etag
+        self.notebook = NotebookMetadataExtractor.load_notebook(content)
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._hash: Optional[str] = None
+
+    @classmethod
+    async def load(cls, storage: BaseStorageService, path: str) -> "PreparedNotebook":
+        """Download a notebook from storage and parse it"""
+        content, etag = await storage.download_notebook_with_etag(path)
+        return cls(path, content, etag)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Metadata in the format produced by NotebookMetadataExtractor.extract_metadata()"""
+        if self._metadata is None:
+            self._metadata = NotebookMetadataExtractor.from_notebook(self.notebook).extract_metadata()
+        return self._metadata
+
+    @property
+    def identity(self) -> Dict[str, Any]:
+        return self.metadata.get('identity', {})
+
+    @property
+    def parameters(self) -> List[Dict]:
+        return self.metadata.get('parameters', [])
+
+    @property
+    def parameter_types(self) -> Dict[str, str]:
+        """Mapping of parameter names to their declared types"""
+        return {param['name']: param['type'] for param in self.parameters if 'name' in param and 'type' in param}
+
+    @property
+    def notebook_hash(self) -> str:
+        """Output-stripped hash, identical to get_notebook_hash() on the raw content"""
+        if self._hash is None:
+            self._hash = get_notebook_node_hash(self.notebook)
+        return self._hash
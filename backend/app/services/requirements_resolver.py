@@ -0,0 +1,229 @@
+"""
+Requirements Resolver
+
+This module resolves the requirements of a notebook into a lock of exact versions
+when an execution is submitted. pip resolves them for the runner's Python version
+and platform without installing anything, so unresolvable or conflicting
+requirements are rejected before a pod is scheduled, and the runner installs the
+locked versions with --no-deps instead of resolving again. Locks are memoised per
+requirement set and Python version.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Last lines of pip's output kept in resolution errors
+ERROR_OUTPUT_LINES = 20
+
+
+class RequirementsResolutionError(Exception):
+    """The requirements of a notebook cannot be resolved"""
+
+
+@dataclass(frozen=True)
+class RequirementsLock:
+    """Exact versions of a notebook's requirements and all their dependencies"""
+    requirements: Tuple[str, ...]  # Sorted "name==version" lines
+    hash: str
+
+    @classmethod
+    def from_lines(cls, lines: List[str]) -> "RequirementsLock":
+        requirements = tuple(sorted(lines))
+        return cls(requirements, hashlib.sha256("\n".join(requirements).encode('utf-8')).hexdigest())
+
+
+def normalize_name(name: str) -> str:
+    """Normalised project name (PEP 503)"""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def requirement_lines(requirements: Dict[str, str]) -> List[str]:
+    """
+    pip requirement lines for the {package: version} mapping of a notebook
+
+    Versions are either '*' for any version, an exact version, or a specifier
+    such as '>=1.3.0'.
+    """
+    lines = []
+    for package, version in requirements.items():
+        name = normalize_name(package)
+        version = (version or '').strip()
+        if not version or version == '*':
+            lines.append(name)
+        elif version[0] in '<>=!~':
+            lines.append(f"{name}{version}")
+        else:
+            lines.append(f"{name}=={version}")
+    return sorted(lines)
+
+
+def platform_tags(platform: str) -> List[str]:
+    """
+    Wheel platform tags installable on a platform
+
+    pip only expands the legacy manylinux tags, so a glibc-versioned tag such as
+    manylinux_2_35_x86_64 is expanded here to every older manylinux_2_x tag.
+    """
+    match = re.fullmatch(r'manylinux_(\d+)_(\d+)_(\w+)', platform)
+    if not match:
+        return [platform]
+    major, minor, arch = int(match.group(1)), int(match.group(2)), match.group(3)
+    tags = [f"manylinux_{major}_{m}_{arch}" for m in range(minor, 16, -1)]
+    return tags + [f"manylinux2014_{arch}"]
+
+
+class RequirementsResolver:
+    """
+    Resolve notebook requirements into locks with pip's dry-run report
+
+    Requirements are resolved against REQUIREMENTS_INDEX_URL and/or a wheelhouse
+    in REQUIREMENTS_FIND_LINKS; with only a wheelhouse, resolution is offline.
+    Only wheels are considered, because sdists cannot be evaluated for another
+    Python version and platform.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: int = 3600):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[float, RequirementsLock]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def resolve(self, requirements: Dict[str, str], python_version: str) -> Optional[RequirementsLock]:
+        """
+        Get the lock of a notebook's requirements for a Python version
+
+        Returns:
+            The lock, or None if the notebook has no requirements
+
+        Raises:
+            RequirementsResolutionError: if pip cannot resolve the requirements
+        """
+        if not requirements:
+            return None
+
+        lines = requirement_lines(requirements)
+        key = (python_version, tuple(lines))
+        lock = self._get(key)
+        if lock is None:
+            lock = RequirementsLock.from_lines(await self._resolve(lines, python_version))
+            self._remember(key, lock)
+            logger.info(f"Resolved {len(lines)} requirements to {len(lock.requirements)} packages for Python {python_version}")
+        return lock
+
+    def _pip_command(self, requirements_path: str, target_dir: str, python_version: str) -> List[str]:
+        cmd = [
+            sys.executable, '-m', 'pip', 'install',
+            '--dry-run', '--ignore-installed', '--quiet', '--report', '-',
+            '--disable-pip-version-check',
+            '--target', target_dir,
+            '--python-version', python_version,
+            '--implementation', 'cp',
+            '--only-binary', ':all:',
+            '-r', requirements_path
+        ]
+        for tag in platform_tags(settings.REQUIREMENTS_PLATFORM):
+            cmd += ['--platform', tag]
+        if settings.REQUIREMENTS_INDEX_URL:
+            cmd += ['--index-url', settings.REQUIREMENTS_INDEX_URL]
+        elif settings.REQUIREMENTS_FIND_LINKS:
+            cmd.append('--no-index')
+        if settings.REQUIREMENTS_FIND_LINKS:
+            cmd += ['--find-links', settings.REQUIREMENTS_FIND_LINKS]
+        return cmd
+
+    async def _resolve(self, lines: List[str], python_version: str) -> List[str]:
+        with tempfile.TemporaryDirectory() as tmp:
+            requirements_path = f"{tmp}/requirements.txt"
+            with open(requirements_path, 'w') as f:
+                f.write("\n".join(lines) + "\n")
+
+            process = await asyncio.create_subprocess_exec(
+                *self._pip_command(requirements_path, f"{tmp}/target", python_version),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    process.communicate(), timeout=settings.REQUIREMENTS_RESOLVE_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise RequirementsResolutionError(
+                    f"Resolving requirements timed out after {settings.REQUIREMENTS_RESOLVE_TIMEOUT_SECONDS} seconds"
+                )
+
+        if process.returncode != 0:
+            output = stderr.decode('utf-8', 'replace').strip().splitlines()
+            raise RequirementsResolutionError(
+                "Cannot resolve requirements " + ", ".join(lines) + ":\n" + "\n".join(output[-ERROR_OUTPUT_LINES:])
+            )
+        return self.parse_report(stdout)
+
+    @staticmethod
+    def parse_report(report: bytes) -> List[str]:
+        """Pinned "name==version" lines of everything a pip installation report would install"""
+        try:
+            installs = json.loads(report)['install']
+            return [
+                f"{normalize_name(item['metadata']['name'])}=={item['metadata']['version']}"
+                for item in installs
+            ]
+        except (ValueError, KeyError, TypeError) as e:
+            raise RequirementsResolutionError(f"Unexpected pip report: {str(e)}")
+
+    def _get(self, key) -> Optional[RequirementsLock]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            resolved_at, lock = entry
+            if time.monotonic() - resolved_at > self.ttl_seconds:
+                # Unpinned requirements may resolve to newer releases by now
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return lock
+
+    def _remember(self, key, lock: RequirementsLock) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), lock)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class RequirementsResolverManager:
+    """Manager for the process-wide requirements resolver"""
+
+    _instance = None
+
+    def __init__(self):
+        self.resolver = RequirementsResolver(ttl_seconds=settings.REQUIREMENTS_LOCK_TTL_SECONDS)
+
+    @classmethod
+    def get_instance(cls):
+        """Get singleton instance"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+
+def get_requirements_resolver() -> RequirementsResolver:
+    """Get the process-wide requirements resolver"""
+    return RequirementsResolverManager.get_instance().resolver
@@ -1,8 +1,24 @@
 from abc import ABC, abstractmethod
 from typing import BinaryIO, List, Dict
-from .interface import BaseStorageService
+from .interface import BaseStorageService, ObjectStream, RangeNotSatisfiableError
 from .s3_storage import S3Storage
+from .async_s3_storage import AsyncS3Storage
+from .local_storage import LocalFSStorage
+from .memory_storage import InMemoryStorage
+from .disk_cache import DiskCachedStorage
+from .cache import get_notebook_cache
 from .factory import create_storage_service
 
 
-__all__ = ["BaseStorageService", "S3Storage", "create_storage_service"] 
\ No newline at end of file
+__all__ = [
+    "BaseStorageService",
+    "ObjectStream",
+    "RangeNotSatisfiableError",
+    "S3Storage",
+    "AsyncS3Storage",
+    "LocalFSStorage",
+    "InMemoryStorage",
+    "DiskCachedStorage",
+    "create_storage_service",
+    "get_notebook_cache"
+] 
\ No newline at end of file
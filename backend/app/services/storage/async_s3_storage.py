@@ -0,0 +1,251 @@
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+import asyncio
+import os
+import weakref
+import logging
+
+from botocore.exceptions import ClientError
+
+from .interface import (
+    ObjectStream,
+    RangeNotSatisfiableError,
+    STREAM_CHUNK_SIZE,
+    encode_continuation_token,
+    decode_continuation_token,
+    is_single_byte_range
+)
+from .s3_storage import S3Storage, _error_code, _is_not_found
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:  # The async backend is optional
+    AioConfig = None
+    get_session = None
+
+from app.core.config import get_settings
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+def is_available() -> bool:
+    """Whether the aiobotocore package needed by AsyncS3Storage is installed"""
+    return get_session is not None
+
+
+class AsyncS3ClientManager:
+    """
+    Manager for the aiobotocore S3 clients
+
+    An aiobotocore client owns an aiohttp connection pool that is bound to the event
+    loop it was created on, so one client is kept open per running loop and reused
+    by every request served on it.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple]" = weakref.WeakKeyDictionary()
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+    async def get_client(self):
+        """Get or create the S3 client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(loop)
+        if entry is not None:
+            return entry[1]
+
+        lock = self._locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            entry = self._clients.get(loop)
+            if entry is None:
+                context = get_session().create_client(
+                    's3',
+                    endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+                    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                    config=AioConfig(
+                        signature_version='s3v4',
+                        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                        connector_args={'keepalive_timeout': settings.S3_KEEPALIVE_SECONDS}
+                    ),
+                )
+                client = await context.__aenter__()
+                entry = (context, client)
+                self._clients[loop] = entry
+                logger.info(f"[S3] Created async S3 client with {settings.S3_MAX_POOL_CONNECTIONS} pooled connections")
+        return entry[1]
+
+    async def close(self) -> None:
+        """Close the S3 client of the running event loop, e.g. on application shutdown"""
+        entry = self._clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].__aexit__(None, None, None)
+
+    @classmethod
+    def get_instance(cls):
+        """Get singleton instance"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+
+# Access the singleton through a function to make mocking easier in tests
+async def get_async_s3_client():
+    """Get the async S3 client of the running event loop"""
+    return await AsyncS3ClientManager.get_instance().get_client()
+
+
+async def _iter_body(body, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Stream an aiobotocore response body without a worker thread"""
+    try:
+        while True:
+            chunk = await body.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        # Return the connection to the pool even if the client went away mid-stream
+        body.close()
+
+
+class AsyncS3Storage(S3Storage):
+    """
+    S3 storage on a natively async client
+
+    Requests don't occupy a worker thread while they wait for S3, so concurrency is
+    bounded by the connection pool (S3_MAX_POOL_CONNECTIONS) instead of the default
+    thread pool. Caching, single-flight downloads and the public interface are
+    inherited from S3Storage; only the S3 calls differ.
+    """
+
+    async def list_notebooks_page(
+        self,
+        prefix: str = "",
+        page_size: int = 1000,
+        continuation_token: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """List one page of notebooks with a single list_objects_v2 call"""
+        params = {
+            'Bucket': self.bucket,
+            'Prefix': prefix,
+            'MaxKeys': page_size
+        }
+        if continuation_token:
+            params['ContinuationToken'] = decode_continuation_token(continuation_token)
+
+        s3 = await get_async_s3_client()
+        response = await s3.list_objects_v2(**params)
+
+        notebooks = []
+        for obj in response.get('Contents', []):
+            if obj['Key'].endswith('.ipynb'):
+                notebooks.append({
+                    'path': obj['Key'],
+                    'last_modified': obj['LastModified'],
+                    'size': obj['Size'],
+                    'etag': obj.get('ETag')
+                })
+
+        next_token = None
+        if response.get('IsTruncated') and response.get('NextContinuationToken'):
+            next_token = encode_continuation_token(response['NextContinuationToken'])
+        return notebooks, next_token
+
+    async def stat_notebook(self, path: str) -> Optional[Dict]:
+        """Get the listing entry of a single notebook with a HEAD request"""
+        s3 = await get_async_s3_client()
+        try:
+            response = await s3.head_object(Bucket=self.bucket, Key=path)
+        except ClientError as e:
+            if _is_not_found(e):
+                return None
+            raise
+
+        return {
+            'path': path,
+            'last_modified': response['LastModified'],
+            'size': response['ContentLength'],
+            'etag': response.get('ETag')
+        }
+
+    async def _get_object(self, path: str) -> Tuple[bytes, Optional[str]]:
+        """Download an object and return its content and ETag"""
+        logger.info(f"[S3] Making async GetObject request: bucket={self.bucket}, key={path}")
+        s3 = await get_async_s3_client()
+        response = await s3.get_object(Bucket=self.bucket, Key=path)
+        async with response['Body'] as body:
+            content = await body.read()
+        return content, response.get('ETag')
+
+    async def _head_etag(self, path: str) -> Optional[str]:
+        """Return the current ETag of an object"""
+        s3 = await get_async_s3_client()
+        head_response = await s3.head_object(Bucket=self.bucket, Key=path)
+        return head_response.get('ETag')
+
+    async def open_object(
+        self,
+        path: str,
+        byte_range: Optional[str] = None,
+        if_none_match: Optional[str] = None
+    ) -> ObjectStream:
+        """Open an object for streaming; range and ETag checks are answered by S3"""
+        params = {'Bucket': self.bucket, 'Key': path}
+        if is_single_byte_range(byte_range):
+            params['Range'] = byte_range.strip()
+        if if_none_match:
+            params['IfNoneMatch'] = if_none_match
+
+        logger.info(f"[S3] Opening object for streaming: bucket={self.bucket}, key={path}")
+        s3 = await get_async_s3_client()
+        try:
+            response = await s3.get_object(**params)
+        except ClientError as e:
+            code = _error_code(e)
+            if code in ('304', 'NotModified'):
+                headers = e.response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+                return ObjectStream(body=None, etag=headers.get('etag', if_none_match), not_modified=True)
+            if _is_not_found(e):
+                raise FileNotFoundError(f"Object not found: {path}")
+            if code in ('416', 'InvalidRange'):
+                raise RangeNotSatisfiableError(f"Range {byte_range} not satisfiable for {path}")
+            raise
+
+        return ObjectStream(
+            body=_iter_body(response['Body']),
+            content_length=response.get('ContentLength'),
+            etag=response.get('ETag'),
+            content_range=response.get('ContentRange'),
+            content_type=response.get('ContentType'),
+            content_encoding=response.get('ContentEncoding'),
+            last_modified=response.get('LastModified')
+        )
+
+    async def write_notebook(self, path: str, content: BinaryIO) -> str:
+        """Write notebook to storage and invalidate cache"""
+        s3 = await get_async_s3_client()
+        await s3.put_object(Bucket=self.bucket, Key=path, Body=content.read())
+
+        # Invalidate cache by removing the entry
+        self.cache.invalidate(self._cache_key(path))
+
+        return f"s3://{self.bucket}/{path}"
+
+    async def get_presigned_url(self, path: str, expires_in: int = 3600) -> str:
+        """Generate a presigned URL for temporary access"""
+        s3 = await get_async_s3_client()
+        return await s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': path},
+            ExpiresIn=expires_in
+        )
+
+    async def delete_notebook(self, path: str) -> None:
+        """Delete a notebook from storage and invalidate cache"""
+        s3 = await get_async_s3_client()
+        await s3.delete_object(Bucket=self.bucket, Key=path)
+
+        # Invalidate cache by removing the entry
+        self.cache.invalidate(self._cache_key(path))
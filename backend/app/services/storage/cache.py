@@ -0,0 +1,221 @@
+"""
+Notebook content cache
+
+This module provides the in-memory cache that sits behind the storage services.
+The cache is shared by every storage instance in the process, so content fetched
+by one request is reused by the next one.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class CacheEntry(NamedTuple):
+    """A cached object with its ETag, the time it was stored and its size in bytes"""
+    value: bytes
+    etag: Optional[str]
+    stored_at: float
+    size: int
+
+
+class LRUCache:
+    """
+    LRU cache with TTL support, bounded by the total size of the cached values in bytes.
+
+    Recency is tracked by the order of an OrderedDict, so lookups, insertions and
+    evictions are all O(1). Values are stored as immutable bytes and can be handed
+    out without copying.
+    """
+
+    def __init__(self, maxbytes: int = 64 * 1024 * 1024, ttl: int = 60):
+        """Initialize cache with a byte budget and TTL in seconds."""
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.currsize = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by invalidate(), so fetches that started before it cannot store old content
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """Get item from cache and return (value, etag)."""
+        entry = self.get_entry(key)
+        if entry is None:
+            return None, None
+        return entry.value, entry.etag
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Get the cache entry for key, including the time it was stored or last revalidated."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            # Check if item has expired
+            if time.time() - entry.stored_at > self.ttl:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def touch(self, key: str, etag: Optional[str]) -> bool:
+        """
+        Mark an entry as revalidated now, if it still holds the given ETag.
+
+        Returns:
+            True if the entry was refreshed, False if it is gone or holds another version
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.etag != etag:
+                return False
+            self._entries[key] = entry._replace(stored_at=time.time())
+            return True
+
+    def generation(self, key: str) -> int:
+        """Return the invalidation generation of key; read it before fetching the value to set."""
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def set(self, key: str, value: bytes, etag: Optional[str] = None, generation: Optional[int] = None) -> None:
+        """
+        Add item to cache with current timestamp.
+
+        If generation is given and key was invalidated since, the value was fetched
+        before a write or delete and is not stored.
+        """
+        value = bytes(value)
+        size = len(value)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key, 0):
+                return
+            self._remove(key)
+
+            # Values larger than the whole budget are never cached
+            if size > self.maxbytes:
+                return
+
+            # Evict least recently used items until the new value fits
+            while self._entries and self.currsize + size > self.maxbytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.currsize -= evicted.size
+                self.evictions += 1
+
+            self._entries[key] = CacheEntry(value, etag, time.time(), size)
+            self.currsize += size
+
+    def invalidate(self, key: str) -> None:
+        """Drop an item from the cache, e.g. after it was overwritten or deleted."""
+        with self._lock:
+            self._remove(key)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache occupancy and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.currsize,
+                "max_bytes": self.maxbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: str) -> None:
+        """Remove an item from the cache; the caller must hold the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.currsize -= entry.size
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into a single in-flight call.
+
+    The first caller starts the call as a task and later callers await the same
+    task. The task is shielded, so a caller that gives up (e.g. a disconnected
+    client) does not cancel the call for everybody else.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() unless a call for key is already in flight, and return its result"""
+        return await asyncio.shield(self.start(key, fn))
+
+    def start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Start fn() in the background unless a call for key is already in flight"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return task
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        """Remove a finished call so the next caller starts a fresh one"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+class NotebookCacheManager:
+    """Manager for the notebook content cache shared by all storage instances in the process"""
+
+    _instance = None
+
+    def __init__(self):
+        self._cache = None
+        self._inflight = None
+
+    @property
+    def cache(self) -> LRUCache:
+        """Get or create the shared cache"""
+        if self._cache is None:
+            self._cache = LRUCache(
+                maxbytes=settings.S3_CACHE_MAX_BYTES,
+                ttl=settings.S3_CACHE_TTL_SECONDS
+            )
+        return self._cache
+
+    @property
+    def inflight(self) -> SingleFlight:
+        """Get or create the shared registry of in-flight downloads"""
+        if self._inflight is None:
+            self._inflight = SingleFlight()
+        return self._inflight
+
+    @classmethod
+    def get_instance(cls):
+        """Get singleton instance"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+
+def get_notebook_cache() -> LRUCache:
+    """Get the process-wide notebook content cache"""
+    return NotebookCacheManager.get_instance().cache
+
+
+def get_inflight_downloads() -> SingleFlight:
+    """Get the process-wide registry of in-flight notebook downloads"""
+    return NotebookCacheManager.get_instance().inflight
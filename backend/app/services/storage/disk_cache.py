@@ -0,0 +1,591 @@
+"""
+Disk cache
+
+This module provides a storage service decorator that keeps recently read notebooks
+and output artifacts in a local directory, so that warm reads are served from disk
+instead of a remote object store. The directory can be shared by all API workers on
+a host: entries are replaced atomically, and changes to the set of entries and their
+total size are serialised with a file lock. Each removal bumps an on-disk generation
+of the key, so a read that started fetching before a write or delete, in any worker,
+cannot install the old content afterwards.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.config import get_settings
+from .interface import BaseStorageService, ObjectStream, STREAM_CHUNK_SIZE, parse_byte_range
+
+try:
+    import fcntl
+except ImportError:  # Without file locks the cache directory must not be shared between processes
+    fcntl = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Eviction frees space down to this fraction of the budget, so it does not run on every write
+EVICTION_LOW_WATERMARK = 0.9
+
+# Temporary files older than this were left behind by a crashed worker
+STALE_TEMP_SECONDS = 3600
+
+_TEMP_PREFIX = ".tmp-"
+
+# Suffix of the files holding the invalidation generation of a key; they are never evicted
+_GENERATION_SUFFIX = ".gen"
+
+
+class DiskCacheEntry(NamedTuple):
+    """Metadata of a cached object; validated_at is when its ETag was last confirmed"""
+    etag: str
+    size: int
+    validated_at: float
+    offset: int
+    content_type: Optional[str] = None
+    content_encoding: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
+
+class DiskCache:
+    """
+    Size-bounded LRU cache of objects in a directory.
+
+    Each entry is one file holding a JSON header line followed by the content, and is
+    installed with an atomic rename, so readers never see a partial entry. The file's
+    access time records its last use for LRU eviction and its modification time the
+    last ETag validation. The total size is kept in a small usage file that is only
+    updated under an exclusive lock, which keeps the budget exact across processes.
+
+    remove() also bumps the generation of the key in a file next to the entry. A
+    caller that reads generation() before fetching an object and passes it to put()
+    or writer() has its entry dropped if the key was removed in the meantime.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024 * 1024 * 1024, max_object_bytes: Optional[int] = None):
+        self.directory = os.path.realpath(directory)
+        self.max_bytes = max_bytes
+        # A single large report should not flush the whole cache
+        self.max_object_bytes = max_bytes // 4 if max_object_bytes is None else max_object_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock_path = os.path.join(self.directory, ".lock")
+        self._usage_path = os.path.join(self.directory, ".usage")
+        self._thread_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the cache lock of this process and, where supported, of all processes"""
+        with self._thread_lock, open(self._lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def open(self, key: str) -> Optional[Tuple[DiskCacheEntry, BinaryIO]]:
+        """
+        Open a cached object
+
+        Returns:
+            The entry and its file, positioned at the start of the content, or None
+            on a miss. The caller must close the file.
+        """
+        file_path = self._file(key)
+        try:
+            f = open(file_path, 'rb')
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        try:
+            header = json.loads(f.readline())
+            stat = os.fstat(f.fileno())
+            entry = DiskCacheEntry(
+                etag=header['etag'],
+                size=header['size'],
+                validated_at=stat.st_mtime,
+                offset=f.tell(),
+                content_type=header.get('content_type'),
+                content_encoding=header.get('content_encoding'),
+                last_modified=datetime.fromisoformat(header['last_modified']) if header.get('last_modified') else None
+            )
+            # Hash collisions and entries truncated by a crash are misses
+            if header.get('key') != key or stat.st_size - entry.offset != entry.size:
+                raise ValueError(f"Corrupt disk cache entry {file_path}")
+        except (ValueError, KeyError, TypeError) as e:
+            f.close()
+            logger.warning(f"Ignoring disk cache entry: {str(e)}")
+            self.misses += 1
+            return None
+
+        # Record the use for eviction without changing the validation time
+        try:
+            os.utime(file_path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except FileNotFoundError:
+            # Evicted after we opened it; the open file is still readable
+            pass
+        self.hits += 1
+        return entry, f
+
+    def read(self, key: str) -> Optional[Tuple[DiskCacheEntry, bytes]]:
+        """Read a cached object, or return None on a miss"""
+        opened = self.open(key)
+        if opened is None:
+            return None
+        entry, f = opened
+        with f:
+            return entry, f.read()
+
+    def generation(self, key: str) -> int:
+        """Number of times key was removed; read it before fetching the object to cache"""
+        try:
+            with open(self._file(key) + _GENERATION_SUFFIX) as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def put(self, key: str, content: bytes, etag: str, generation: Optional[int] = None, **metadata) -> None:
+        """
+        Store an object; metadata are the optional fields of DiskCacheEntry
+
+        If generation is given and key was removed since, the object is not stored.
+        """
+        writer = self.writer(key, etag, len(content), generation=generation, **metadata)
+        if writer is not None:
+            writer.write(content)
+            writer.commit()
+
+    def writer(
+        self,
+        key: str,
+        etag: str,
+        size: int,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+        last_modified: Optional[datetime] = None,
+        generation: Optional[int] = None
+    ) -> Optional["DiskCacheWriter"]:
+        """
+        Start writing an entry of size bytes in chunks; it becomes visible on commit()
+        unless key was removed after generation was read
+
+        Returns:
+            The writer, or None if the object is too large to be cached
+        """
+        if size > self.max_object_bytes:
+            return None
+        return DiskCacheWriter(self, key, {
+            'key': key,
+            'etag': etag,
+            'size': size,
+            'content_type': content_type,
+            'content_encoding': content_encoding,
+            'last_modified': last_modified.isoformat() if last_modified else None
+        }, generation)
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as validated now"""
+        try:
+            os.utime(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def remove(self, key: str) -> None:
+        """
+        Drop an entry, e.g. after the object was overwritten or deleted
+
+        The generation is bumped even without an entry, since a fetch of the old
+        version may be about to install one.
+        """
+        file_path = self._file(key)
+        with self._locked():
+            self._write_atomically(file_path + _GENERATION_SUFFIX, str(self.generation(key) + 1))
+            used = self._read_usage()
+            try:
+                size = os.stat(file_path).st_size
+                os.unlink(file_path)
+            except FileNotFoundError:
+                return
+            self._write_usage(max(0, used - size))
+
+    def stats(self) -> Dict[str, int]:
+        """Return the size of the cache and this process's hit/miss/eviction counters"""
+        with self._locked():
+            used = self._read_usage()
+        return {
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _install(self, key: str, tmp_path: str, generation: Optional[int] = None) -> None:
+        """Move a completely written entry into place and enforce the size budget"""
+        file_path = self._file(key)
+        size = os.stat(tmp_path).st_size
+        with self._locked():
+            if generation is not None and generation != self.generation(key):
+                # Fetched before the object was overwritten or deleted
+                os.unlink(tmp_path)
+                return
+            used = self._read_usage()
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            try:
+                replaced = os.stat(file_path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, file_path)
+
+            used = used - replaced + size
+            if used > self.max_bytes:
+                used = self._evict(int(self.max_bytes * EVICTION_LOW_WATERMARK))
+            self._write_usage(used)
+
+    def _evict(self, target: int) -> int:
+        """Remove least recently used entries until at most target bytes remain; the caller must hold the lock"""
+        entries = []
+        now = time.time()
+        for directory in os.scandir(self.directory):
+            if directory.name.startswith(_TEMP_PREFIX):
+                # Left behind by a worker that died while filling an entry
+                if now - directory.stat().st_mtime > STALE_TEMP_SECONDS:
+                    os.unlink(directory.path)
+                continue
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith(_GENERATION_SUFFIX):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if used <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            used -= size
+            self.evictions += 1
+        return used
+
+    def _read_usage(self) -> int:
+        """Total size of the entries; the caller must hold the lock"""
+        try:
+            with open(self._usage_path) as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            # First use or an interrupted write: count the entries instead
+            return self._evict(self.max_bytes)
+
+    def _write_usage(self, used: int) -> None:
+        with open(self._usage_path, 'w') as f:
+            f.write(str(used))
+
+    def _write_atomically(self, path: str, text: str) -> None:
+        """Replace a small file so that readers outside the lock never see it half written"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=_TEMP_PREFIX)
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+class DiskCacheWriter:
+    """An entry being filled in a temporary file of the cache directory"""
+
+    def __init__(self, cache: DiskCache, key: str, header: Dict, generation: Optional[int] = None):
+        self.cache = cache
+        self.key = key
+        self.generation = generation
+        self.size = header['size']
+        self.written = 0
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.directory, prefix=_TEMP_PREFIX)
+        self._file = os.fdopen(fd, 'wb')
+        self._file.write(json.dumps(header).encode('utf-8') + b"\n")
+
+    def write(self, chunk: bytes) -> None:
+        """Append content"""
+        if self._file is not None:
+            self._file.write(chunk)
+            self.written += len(chunk)
+
+    def commit(self) -> None:
+        """Make the entry visible to all workers, unless its content is incomplete"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if self.written != self.size:
+            logger.warning(f"Discarding disk cache entry with {self.written} of {self.size} bytes")
+            self.abort()
+            return
+        self.cache._install(self.key, self.tmp_path, self.generation)
+
+    def abort(self) -> None:
+        """Discard the entry"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.unlink(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+async def _iter_file(f: BinaryIO, start: int, length: int, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Stream length bytes of an open cache file from offset start"""
+    try:
+        await asyncio.to_thread(f.seek, start)
+        while length > 0:
+            chunk = await asyncio.to_thread(f.read, min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+class DiskCachedStorage(BaseStorageService):
+    """
+    Storage decorator that serves reads from a DiskCache in front of another storage
+
+    Entries younger than fresh_seconds are served without asking the wrapped storage;
+    older ones are revalidated by ETag first. Writes and deletions made through this
+    storage drop the entry for every worker sharing the cache directory. Listings and
+    presigned URLs always come from the wrapped storage.
+    """
+
+    def __init__(self, storage: BaseStorageService, cache: Optional[DiskCache] = None, fresh_seconds: Optional[int] = None):
+        self.storage = storage
+        self.cache = cache if cache is not None else get_disk_cache()
+        self.fresh_seconds = settings.STORAGE_DISK_CACHE_FRESH_SECONDS if fresh_seconds is None else fresh_seconds
+
+    def _key(self, path: str) -> str:
+        """Cache key for a path; includes the bucket of S3 storages since the directory is shared"""
+        return f"{getattr(self.storage, 'bucket', '')}/{path}"
+
+    def _is_fresh(self, entry: DiskCacheEntry) -> bool:
+        return time.time() - entry.validated_at < self.fresh_seconds
+
+    def cache_stats(self) -> Optional[Dict[str, int]]:
+        """Return statistics of the disk cache and of the wrapped storage's cache"""
+        stats = dict(self.storage.cache_stats() or {})
+        stats["disk"] = self.cache.stats()
+        return stats
+
+    async def list_notebooks(self, prefix: str = "") -> List[Dict]:
+        return await self.storage.list_notebooks(prefix)
+
+    async def list_notebooks_page(
+        self,
+        prefix: str = "",
+        page_size: int = 1000,
+        continuation_token: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        return await self.storage.list_notebooks_page(prefix, page_size, continuation_token)
+
+    async def stat_notebook(self, path: str) -> Optional[Dict]:
+        return await self.storage.stat_notebook(path)
+
+    async def check_exists(self, path: str) -> bool:
+        return await self.storage.check_exists(path)
+
+    async def get_presigned_url(self, path: str, expires_in: int = 3600) -> str:
+        return await self.storage.get_presigned_url(path, expires_in)
+
+    async def read_notebook(self, path: str) -> BinaryIO:
+        """Read a notebook, from disk when the cached version is current"""
+        return io.BytesIO(await self.download_notebook(path))
+
+    async def download_notebook(self, path: str) -> bytes:
+        content, _ = await self.download_notebook_with_etag(path)
+        return content
+
+    async def download_notebook_with_etag(self, path: str) -> Tuple[bytes, Optional[str]]:
+        """Download notebook content and its ETag, from disk when the cached version is current"""
+        key = self._key(path)
+        generation = await asyncio.to_thread(self.cache.generation, key)
+        cached = await asyncio.to_thread(self.cache.read, key)
+        if cached is not None:
+            entry, content = cached
+            if self._is_fresh(entry):
+                return content, entry.etag
+            try:
+                current = await self.storage.stat_notebook(path)
+                if current is not None and current.get('etag') == entry.etag:
+                    await asyncio.to_thread(self.cache.touch, key)
+                    return content, entry.etag
+            except Exception as e:
+                logger.warning(f"Error revalidating disk cache entry for {path}: {str(e)}")
+
+        content, etag = await self.storage.download_notebook_with_etag(path)
+        if etag:
+            await asyncio.to_thread(self.cache.put, key, content, etag, generation)
+        return content, etag
+
+    async def open_object(
+        self,
+        path: str,
+        byte_range: Optional[str] = None,
+        if_none_match: Optional[str] = None
+    ) -> ObjectStream:
+        """
+        Open an object for streaming, from disk when the cached version is current
+
+        Complete reads of uncached objects are written to the cache while they are
+        streamed to the client; ranged reads of uncached objects are passed through.
+        """
+        key = self._key(path)
+        generation = await asyncio.to_thread(self.cache.generation, key)
+        opened = await asyncio.to_thread(self.cache.open, key)
+        if opened is not None:
+            entry, f = opened
+            if self._is_fresh(entry):
+                return self._serve_cached(entry, f, byte_range, if_none_match)
+
+            # A conditional GET revalidates the entry, and returns the new version if it has changed
+            try:
+                stream = await self.storage.open_object(path, if_none_match=entry.etag)
+            except FileNotFoundError:
+                f.close()
+                await asyncio.to_thread(self.cache.remove, key)
+                raise
+            except BaseException:
+                f.close()
+                raise
+            if stream.not_modified:
+                await asyncio.to_thread(self.cache.touch, key)
+                return self._serve_cached(entry, f, byte_range, if_none_match)
+
+            f.close()
+            await asyncio.to_thread(self.cache.remove, key)
+            if not byte_range and not (if_none_match and if_none_match == stream.etag):
+                # Past our own removal; any other write or delete since the GET bumps it further
+                return self._fill(key, stream, generation + 1)
+            await stream.body.aclose()
+
+        stream = await self.storage.open_object(path, byte_range=byte_range, if_none_match=if_none_match)
+        if stream.not_modified or stream.content_range:
+            return stream
+        return self._fill(key, stream, generation)
+
+    def _serve_cached(
+        self,
+        entry: DiskCacheEntry,
+        f: BinaryIO,
+        byte_range: Optional[str],
+        if_none_match: Optional[str]
+    ) -> ObjectStream:
+        """Stream a cached entry, honouring Range and If-None-Match like the wrapped storage"""
+        if if_none_match and if_none_match == entry.etag:
+            f.close()
+            return ObjectStream(body=None, etag=entry.etag, last_modified=entry.last_modified, not_modified=True)
+
+        start, end = 0, entry.size - 1
+        content_range = None
+        try:
+            bounds = parse_byte_range(byte_range, entry.size)
+        except BaseException:
+            f.close()
+            raise
+        if bounds is not None:
+            start, end = bounds
+            content_range = f"bytes {start}-{end}/{entry.size}"
+
+        return ObjectStream(
+            body=_iter_file(f, entry.offset + start, end - start + 1),
+            content_length=end - start + 1,
+            etag=entry.etag,
+            content_range=content_range,
+            content_type=entry.content_type,
+            content_encoding=entry.content_encoding,
+            last_modified=entry.last_modified
+        )
+
+    def _fill(self, key: str, stream: ObjectStream, generation: int) -> ObjectStream:
+        """Copy a complete object into the cache while it is streamed to the caller, unless key is removed meanwhile"""
+        if not stream.etag or stream.content_length is None or stream.content_length > self.cache.max_object_bytes:
+            return stream
+
+        async def body() -> AsyncIterator[bytes]:
+            writer = await asyncio.to_thread(
+                self.cache.writer,
+                key,
+                stream.etag,
+                stream.content_length,
+                content_type=stream.content_type,
+                content_encoding=stream.content_encoding,
+                last_modified=stream.last_modified,
+                generation=generation
+            )
+            complete = False
+            try:
+                async for chunk in stream.body:
+                    await asyncio.to_thread(writer.write, chunk)
+                    yield chunk
+                complete = True
+            finally:
+                if complete:
+                    await asyncio.to_thread(writer.commit)
+                else:
+                    # The client went away; don't keep a partial entry
+                    writer.abort()
+                    await stream.body.aclose()
+
+        return replace(stream, body=body())
+
+    async def write_notebook(self, path: str, content: BinaryIO) -> str:
+        """Write a notebook to the wrapped storage and drop its cache entry"""
+        location = await self.storage.write_notebook(path, content)
+        await asyncio.to_thread(self.cache.remove, self._key(path))
+        return location
+
+    async def delete_notebook(self, path: str) -> None:
+        """Delete a notebook from the wrapped storage and drop its cache entry"""
+        await self.storage.delete_notebook(path)
+        await asyncio.to_thread(self.cache.remove, self._key(path))
+
+
+class DiskCacheManager:
+    """Manager for the disk cache shared by all storage instances in the process"""
+
+    _instance = None
+
+    def __init__(self):
+        self.cache = DiskCache(
+            settings.STORAGE_DISK_CACHE_DIR,
+            max_bytes=settings.STORAGE_DISK_CACHE_MAX_BYTES
+        )
+
+    @classmethod
+    def get_instance(cls):
+        """Get singleton instance"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+
+def get_disk_cache() -> DiskCache:
+    """Get the process-wide disk cache"""
+    return DiskCacheManager.get_instance().cache
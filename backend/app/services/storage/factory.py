@@ -1,12 +1,44 @@
 from typing import Optional
+import logging
 from .s3_storage import S3Storage
+from .async_s3_storage import AsyncS3Storage, is_available as async_s3_available
+from .local_storage import LocalFSStorage
+from .memory_storage import InMemoryStorage
+from .disk_cache import DiskCachedStorage
 from .interface import BaseStorageService
 from app.core.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 def create_storage_service() -> BaseStorageService:
-    """Create S3 storage service with appropriate configuration"""
+    """
+    Create the storage service selected by STORAGE_BACKEND
+    
+    Storage instances are cheap and created per request; the notebook content
+    cache behind them is process-wide, see get_notebook_cache(). When
+    STORAGE_DISK_CACHE_DIR is set, the storage is wrapped in the disk cache.
+    """
+    storage = _create_backend()
+    if settings.STORAGE_DISK_CACHE_DIR:
+        return DiskCachedStorage(storage)
+    return storage
+
+def _create_backend() -> BaseStorageService:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalFSStorage(settings.LOCAL_STORAGE_ROOT)
+    
+    if settings.STORAGE_BACKEND == "memory":
+        return InMemoryStorage.shared()
+    
+    if settings.STORAGE_BACKEND == "s3-async":
+        if async_s3_available():
+            return AsyncS3Storage(
+                bucket=settings.S3_BUCKET,
+                endpoint_url=settings.S3_ENDPOINT_URL
+            )
+        logger.warning("STORAGE_BACKEND=s3-async requires the aiobotocore package, using s3")
+    
     return S3Storage(
         bucket=settings.S3_BUCKET,
         endpoint_url=settings.S3_ENDPOINT_URL
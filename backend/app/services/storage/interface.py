@@ -1,14 +1,111 @@
-from typing import BinaryIO, List, Dict, Optional
+from typing import AsyncIterator, BinaryIO, List, Dict, Optional, Tuple, Union
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+import base64
+import binascii
+import re
+from datetime import datetime
+from app.core.config import get_settings
+from app.utils.concurrency import gather_bounded
+
+settings = get_settings()
+
+# Size of the chunks in which object bodies are streamed to clients
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+_BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiableError(ValueError):
+    """The requested byte range lies outside the object"""
+
+
+class InvalidContinuationTokenError(ValueError):
+    """The continuation token was not issued by the storage backend"""
+
+
+@dataclass
+class ObjectStream:
+    """
+    An object opened for streaming, or a not-modified answer to a conditional request.
+
+    Attributes:
+        body: Async iterator over the content in chunks; None when not_modified is set
+        content_length: Number of bytes the body yields
+        etag: ETag of the object version
+        content_range: Content-Range of a partial response, e.g. "bytes 0-99/1000"
+        content_type: Content type stored with the object, if any
+        content_encoding: Content encoding stored with the object, if any
+        last_modified: Last modification time of the object
+        not_modified: The object still matches the ETag given as if_none_match
+    """
+    body: Optional[AsyncIterator[bytes]]
+    content_length: Optional[int] = None
+    etag: Optional[str] = None
+    content_range: Optional[str] = None
+    content_type: Optional[str] = None
+    content_encoding: Optional[str] = None
+    last_modified: Optional[datetime] = None
+    not_modified: bool = False
+
 
 class BaseStorageService(ABC):
     """Base interface for storage services"""
     
     @abstractmethod
     async def list_notebooks(self, prefix: str = "") -> List[Dict]:
-        """List all notebooks with the given prefix"""
+        """
+        List all notebooks with the given prefix
+        
+        Returns:
+            List of dictionaries with 'path', 'last_modified', 'size' and 'etag'
+        """
         pass
     
+    async def list_notebooks_page(
+        self,
+        prefix: str = "",
+        page_size: int = 1000,
+        continuation_token: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        List one page of notebooks with the given prefix
+        
+        Providers with native pagination should override this; the default pages
+        through the full listing.
+        
+        Args:
+            prefix: Only list notebooks whose path starts with this prefix
+            page_size: Maximum number of objects to examine for this page
+            continuation_token: Opaque token returned with the previous page
+            
+        Returns:
+            Tuple of (notebooks, continuation token of the next page or None)
+        """
+        offset = decode_offset_token(continuation_token) if continuation_token else 0
+        notebooks = await self.list_notebooks(prefix)
+        next_offset = offset + page_size
+        next_token = encode_continuation_token(str(next_offset)) if next_offset < len(notebooks) else None
+        return notebooks[offset:next_offset], next_token
+
+    async def iter_notebooks(self, prefix: str = "", page_size: int = 1000) -> AsyncIterator[List[Dict]]:
+        """
+        Stream all notebooks with the given prefix, one page at a time
+        
+        Args:
+            prefix: Only list notebooks whose path starts with this prefix
+            page_size: Maximum number of objects to examine per page
+            
+        Yields:
+            Lists of notebook listing entries
+        """
+        continuation_token = None
+        while True:
+            notebooks, continuation_token = await self.list_notebooks_page(prefix, page_size, continuation_token)
+            yield notebooks
+            if not continuation_token:
+                break
+
     @abstractmethod
     async def read_notebook(self, path: str) -> BinaryIO:
         """Read a notebook from storage"""
@@ -29,6 +126,85 @@ class BaseStorageService(ABC):
         """Generate a presigned URL for temporary access"""
         pass
 
+    async def download_notebook_with_etag(self, path: str) -> Tuple[bytes, Optional[str]]:
+        """
+        Download a notebook together with the ETag of the downloaded version
+        
+        Providers that know the version of the content they return should override
+        this; the default does not report an ETag.
+        
+        Returns:
+            Tuple of (content, etag or None)
+        """
+        return await self.download_notebook(path), None
+
+    async def open_object(
+        self,
+        path: str,
+        byte_range: Optional[str] = None,
+        if_none_match: Optional[str] = None
+    ) -> ObjectStream:
+        """
+        Open any stored object for streaming, e.g. an output report
+        
+        Providers should override this to stream from the backend in chunks; the
+        default reads the whole object into memory.
+        
+        Args:
+            path: Path of the object
+            byte_range: Single HTTP byte range, e.g. "bytes=0-99"; other values are ignored
+            if_none_match: ETag the client already holds
+            
+        Returns:
+            The opened object, or an ObjectStream with not_modified set
+            
+        Raises:
+            FileNotFoundError: If the object does not exist
+            RangeNotSatisfiableError: If the range lies outside the object
+        """
+        content, etag = await self.download_notebook_with_etag(path)
+        if if_none_match and etag and if_none_match == etag:
+            return ObjectStream(body=None, etag=etag, not_modified=True)
+        
+        content_range = None
+        bounds = parse_byte_range(byte_range, len(content))
+        if bounds is not None:
+            start, end = bounds
+            content_range = f"bytes {start}-{end}/{len(content)}"
+            content = content[start:end + 1]
+        
+        async def body() -> AsyncIterator[bytes]:
+            for offset in range(0, len(content), STREAM_CHUNK_SIZE):
+                yield content[offset:offset + STREAM_CHUNK_SIZE]
+        
+        return ObjectStream(body=body(), content_length=len(content), etag=etag, content_range=content_range)
+
+    def cache_stats(self) -> Optional[Dict[str, int]]:
+        """
+        Return statistics of the content cache used by this storage service
+        
+        Returns:
+            Dictionary with cache occupancy and hit/miss/eviction counters,
+            or None if the service does not cache content
+        """
+        return None
+
+    async def stat_notebook(self, path: str) -> Optional[Dict]:
+        """
+        Get the listing entry of a single notebook without downloading it
+        
+        Args:
+            path: Path to the notebook
+            
+        Returns:
+            Dictionary with 'path', 'last_modified', 'size' and 'etag', or None if
+            the notebook does not exist
+        """
+        for notebook in await self.list_notebooks(path):
+            if notebook['path'] == path:
+                return notebook
+        return None
+
     async def check_exists(self, path: str) -> bool:
         """
         Check if a notebook exists
@@ -54,4 +230,80 @@ class BaseStorageService(ABC):
             Notebook content as bytes
         """
         content = await self.read_notebook(path)
-        return content.getvalue() 
\ No newline at end of file
+        return content.getvalue()
+
+    async def download_notebooks(
+        self,
+        paths: List[str],
+        limit: Optional[int] = None,
+        return_exceptions: bool = False
+    ) -> List[Union[bytes, BaseException]]:
+        """
+        Download several notebooks concurrently with bounded parallelism
+        
+        Args:
+            paths: Paths to the notebooks
+            limit: Maximum downloads in flight, defaults to STORAGE_MAX_CONCURRENCY
+            return_exceptions: Return failed downloads as exceptions instead of raising
+            
+        Returns:
+            Notebook contents in the same order as paths
+        """
+        return await gather_bounded(
+            (self.download_notebook(path) for path in paths),
+            limit=limit or settings.STORAGE_MAX_CONCURRENCY,
+            return_exceptions=return_exceptions
+        )
+
+
+def is_single_byte_range(byte_range: Optional[str]) -> bool:
+    """Whether a Range header holds a single byte range that can be served as a 206"""
+    if not byte_range:
+        return False
+    match = _BYTE_RANGE.match(byte_range.strip())
+    return bool(match) and bool(match.group(1) or match.group(2))
+
+
+def parse_byte_range(byte_range: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Resolve a single HTTP byte range against an object size
+    
+    Returns:
+        Inclusive (start, end) offsets, or None to serve the whole object
+        
+    Raises:
+        RangeNotSatisfiableError: If the range lies outside the object
+    """
+    if not is_single_byte_range(byte_range):
+        return None
+    first, last = _BYTE_RANGE.match(byte_range.strip()).groups()
+    if not first:
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiableError(f"Range {byte_range} not satisfiable for {size} bytes")
+    return start, end
+
+
+def encode_continuation_token(token: str) -> str:
+    """Wrap a provider continuation token into an opaque, URL-safe string"""
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+
+
+def decode_continuation_token(token: str) -> str:
+    """Unwrap a token created by encode_continuation_token"""
+    try:
+        return base64.b64decode(token.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidContinuationTokenError("Invalid continuation token")
+
+
+def decode_offset_token(token: str) -> int:
+    """Unwrap a token of the default listing, which holds the offset of the next page"""
+    offset = decode_continuation_token(token)
+    if not (offset.isascii() and offset.isdigit()):
+        raise InvalidContinuationTokenError("Invalid continuation token")
+    return int(offset)
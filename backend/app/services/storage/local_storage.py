@@ -0,0 +1,207 @@
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+import asyncio
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import logging
+
+from .interface import BaseStorageService, ObjectStream, STREAM_CHUNK_SIZE, parse_byte_range
+
+logger = logging.getLogger(__name__)
+
+
+def _etag(stat: os.stat_result) -> str:
+    """Quoted ETag of a file version, derived from its modification time and size"""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _entry(path: str, stat: os.stat_result) -> Dict:
+    """Listing entry in the same format as S3Storage"""
+    return {
+        'path': path,
+        'last_modified': datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        'size': stat.st_size,
+        'etag': _etag(stat)
+    }
+
+
+def _read_file(full_path: str) -> Tuple[bytes, os.stat_result]:
+    """Read a whole file through a memory map, with the stat of the version read"""
+    with open(full_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return b"", stat
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[:], stat
+
+
+async def _iter_mapped(f: BinaryIO, mapped: mmap.mmap, start: int, end: int, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Stream bytes start..end (inclusive) of a memory-mapped file"""
+    try:
+        for offset in range(start, end + 1, chunk_size):
+            # Page faults may hit the disk, so copy chunks out in a worker thread
+            yield await asyncio.to_thread(mapped.__getitem__, slice(offset, min(offset + chunk_size, end + 1)))
+    finally:
+        mapped.close()
+        f.close()
+
+
+async def _no_content() -> AsyncIterator[bytes]:
+    return
+    yield
+
+
+class LocalFSStorage(BaseStorageService):
+    """
+    Storage in a directory of the local filesystem
+
+    Object paths are relative to the root directory. Writes go to a temporary file
+    that is renamed over the target, so readers never see a partially written
+    notebook. Reads are served through memory maps straight from the page cache,
+    which is why no content cache is kept in front of this backend.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.realpath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _full_path(self, path: str) -> str:
+        """Absolute filesystem path of an object path, confined to the root directory"""
+        if not path:
+            raise ValueError("Path cannot be empty")
+        full_path = os.path.realpath(os.path.join(self.root, path.lstrip('/')))
+        if not full_path.startswith(self.root + os.sep):
+            raise ValueError(f"Path is outside the storage root: {path}")
+        return full_path
+
+    def _list(self, prefix: str) -> List[Dict]:
+        # Only walk the directory the prefix points into
+        start = os.path.realpath(os.path.join(self.root, os.path.dirname(prefix)))
+        if start != self.root and not start.startswith(self.root + os.sep):
+            raise ValueError(f"Prefix is outside the storage root: {prefix}")
+        notebooks = []
+        for directory, _, files in os.walk(start):
+            for name in files:
+                full_path = os.path.join(directory, name)
+                path = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                if not name.endswith('.ipynb') or not path.startswith(prefix):
+                    continue
+                try:
+                    notebooks.append(_entry(path, os.stat(full_path)))
+                except FileNotFoundError:
+                    # Deleted while listing
+                    continue
+        # Same order as an S3 listing
+        notebooks.sort(key=lambda notebook: notebook['path'])
+        return notebooks
+
+    async def list_notebooks(self, prefix: str = "") -> List[Dict]:
+        """List all notebooks below the root whose path starts with prefix"""
+        return await asyncio.to_thread(self._list, prefix)
+
+    async def stat_notebook(self, path: str) -> Optional[Dict]:
+        """Get the listing entry of a single notebook"""
+        try:
+            stat = await asyncio.to_thread(os.stat, self._full_path(path))
+        except FileNotFoundError:
+            return None
+        return _entry(path, stat)
+
+    async def check_exists(self, path: str) -> bool:
+        """Check if a notebook exists"""
+        return await self.stat_notebook(path) is not None
+
+    async def read_notebook(self, path: str) -> BinaryIO:
+        """Read a notebook from storage"""
+        return io.BytesIO(await self.download_notebook(path))
+
+    async def download_notebook(self, path: str) -> bytes:
+        """Download notebook content as bytes"""
+        content, _ = await self.download_notebook_with_etag(path)
+        return content
+
+    async def download_notebook_with_etag(self, path: str) -> Tuple[bytes, Optional[str]]:
+        """Download notebook content and the ETag of the version read"""
+        content, stat = await asyncio.to_thread(_read_file, self._full_path(path))
+        return content, _etag(stat)
+
+    async def open_object(
+        self,
+        path: str,
+        byte_range: Optional[str] = None,
+        if_none_match: Optional[str] = None
+    ) -> ObjectStream:
+        """Open an object for streaming from a memory map of the file"""
+        f = await asyncio.to_thread(open, self._full_path(path), 'rb')
+        try:
+            stat = os.fstat(f.fileno())
+            etag = _etag(stat)
+            last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+            if if_none_match and if_none_match == etag:
+                f.close()
+                return ObjectStream(body=None, etag=etag, last_modified=last_modified, not_modified=True)
+
+            content_range = None
+            start, end = 0, stat.st_size - 1
+            bounds = parse_byte_range(byte_range, stat.st_size)
+            if bounds is not None:
+                start, end = bounds
+                content_range = f"bytes {start}-{end}/{stat.st_size}"
+
+            if stat.st_size == 0:
+                # Empty files cannot be mapped
+                f.close()
+                body = _no_content()
+            else:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                body = _iter_mapped(f, mapped, start, end)
+        except BaseException:
+            f.close()
+            raise
+
+        return ObjectStream(
+            body=body,
+            content_length=end - start + 1,
+            etag=etag,
+            content_range=content_range,
+            last_modified=last_modified
+        )
+
+    def _write(self, full_path: str, content: BinaryIO) -> None:
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # The temporary file lives next to the target so the rename stays on one filesystem
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(full_path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(content, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    async def write_notebook(self, path: str, content: BinaryIO) -> str:
+        """Write a notebook atomically"""
+        full_path = self._full_path(path)
+        await asyncio.to_thread(self._write, full_path, content)
+        logger.info(f"Wrote notebook to local storage: {full_path}")
+        return f"file://{full_path}"
+
+    async def delete_notebook(self, path: str) -> None:
+        """Delete a notebook from storage; deleting a missing notebook is not an error"""
+        try:
+            await asyncio.to_thread(os.remove, self._full_path(path))
+        except FileNotFoundError:
+            pass
+
+    async def get_presigned_url(self, path: str, expires_in: int = 3600) -> str:
+        """Local files have no URL of their own; callers stream them instead"""
+        raise NotImplementedError("Local storage does not support presigned URLs")
@@ -0,0 +1,140 @@
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import hashlib
+import io
+
+from .interface import BaseStorageService, ObjectStream, STREAM_CHUNK_SIZE, parse_byte_range
+
+
+@dataclass
+class StoredObject:
+    """An object held by InMemoryStorage"""
+    content: bytes
+    etag: str
+    last_modified: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    content_type: Optional[str] = None
+    content_encoding: Optional[str] = None
+
+
+# Objects of the storage returned by create_storage_service, shared by all requests
+_process_objects: Dict[str, StoredObject] = {}
+
+
+class InMemoryStorage(BaseStorageService):
+    """
+    Storage in a dictionary, for tests and throwaway development servers
+
+    Each instance has its own objects unless a dictionary is passed in; shared()
+    returns a storage over the objects of the whole process. ETags are the quoted
+    MD5 of the content, as S3 reports them for single-part uploads.
+    """
+
+    def __init__(self, objects: Optional[Dict[str, StoredObject]] = None):
+        self.objects = objects if objects is not None else {}
+
+    @classmethod
+    def shared(cls) -> "InMemoryStorage":
+        """Storage over the process-wide objects"""
+        return cls(_process_objects)
+
+    def put_object(
+        self,
+        path: str,
+        content: bytes,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None
+    ) -> str:
+        """Store an object synchronously, e.g. to seed a test, and return its ETag"""
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        self.objects[path] = StoredObject(content, etag, content_type=content_type, content_encoding=content_encoding)
+        return etag
+
+    def _get(self, path: str) -> StoredObject:
+        stored = self.objects.get(path)
+        if stored is None:
+            raise FileNotFoundError(f"Object not found: {path}")
+        return stored
+
+    @staticmethod
+    def _entry(path: str, stored: StoredObject) -> Dict:
+        return {
+            'path': path,
+            'last_modified': stored.last_modified,
+            'size': len(stored.content),
+            'etag': stored.etag
+        }
+
+    async def list_notebooks(self, prefix: str = "") -> List[Dict]:
+        """List all notebooks whose path starts with prefix, in path order"""
+        return [
+            self._entry(path, stored)
+            for path, stored in sorted(self.objects.items())
+            if path.startswith(prefix) and path.endswith('.ipynb')
+        ]
+
+    async def stat_notebook(self, path: str) -> Optional[Dict]:
+        """Get the listing entry of a single notebook"""
+        stored = self.objects.get(path)
+        return self._entry(path, stored) if stored is not None else None
+
+    async def check_exists(self, path: str) -> bool:
+        """Check if a notebook exists"""
+        return path in self.objects
+
+    async def read_notebook(self, path: str) -> BinaryIO:
+        """Read a notebook from storage"""
+        return io.BytesIO(self._get(path).content)
+
+    async def download_notebook_with_etag(self, path: str) -> Tuple[bytes, Optional[str]]:
+        """Download notebook content and its ETag"""
+        stored = self._get(path)
+        return stored.content, stored.etag
+
+    async def open_object(
+        self,
+        path: str,
+        byte_range: Optional[str] = None,
+        if_none_match: Optional[str] = None
+    ) -> ObjectStream:
+        """Open an object for streaming, with its stored content type and encoding"""
+        stored = self._get(path)
+        if if_none_match and if_none_match == stored.etag:
+            return ObjectStream(body=None, etag=stored.etag, last_modified=stored.last_modified, not_modified=True)
+
+        content = stored.content
+        content_range = None
+        bounds = parse_byte_range(byte_range, len(content))
+        if bounds is not None:
+            start, end = bounds
+            content_range = f"bytes {start}-{end}/{len(content)}"
+            content = content[start:end + 1]
+
+        async def body() -> AsyncIterator[bytes]:
+            for offset in range(0, len(content), STREAM_CHUNK_SIZE):
+                yield content[offset:offset + STREAM_CHUNK_SIZE]
+
+        return ObjectStream(
+            body=body(),
+            content_length=len(content),
+            etag=stored.etag,
+            content_range=content_range,
+            content_type=stored.content_type,
+            content_encoding=stored.content_encoding,
+            last_modified=stored.last_modified
+        )
+
+    async def write_notebook(self, path: str, content: BinaryIO) -> str:
+        """Write a notebook to storage"""
+        if not path:
+            raise ValueError("Path cannot be empty")
+        self.put_object(path, content.read())
+        return f"memory://{path}"
+
+    async def delete_notebook(self, path: str) -> None:
+        """Delete a notebook from storage; deleting a missing notebook is not an error"""
+        self.objects.pop(path, None)
+
+    async def get_presigned_url(self, path: str, expires_in: int = 3600) -> str:
+        """In-memory objects have no URL of their own; callers stream them instead"""
+        raise NotImplementedError("In-memory storage does not support presigned URLs")
@@ -1,4 +1,4 @@
-from typing import BinaryIO, List, Dict, Optional, Tuple, Any
+from typing import AsyncIterator, Awaitable, BinaryIO, List, Dict, Optional, Tuple, Any
 import boto3
 import io
 import os
@@ -6,7 +6,17 @@ import asyncio
 import time
 import functools
 from botocore.client import Config
-from .interface import BaseStorageService
+from botocore.exceptions import ClientError
+from .interface import (
+    BaseStorageService,
+    ObjectStream,
+    RangeNotSatisfiableError,
+    STREAM_CHUNK_SIZE,
+    encode_continuation_token,
+    decode_continuation_token,
+    is_single_byte_range
+)
+from .cache import LRUCache, SingleFlight, get_notebook_cache, get_inflight_downloads
 import logging
 
 from app.core.config import get_settings
@@ -38,7 +48,12 @@ class S3ClientManager:
                 endpoint_url=s3_endpoint_url,
                 aws_access_key_id=aws_access_key_id,
                 aws_secret_access_key=aws_secret_access_key,
-                config=Config(signature_version='s3v4'),
+                # Allow at least as many pooled connections as bulk operations keep in flight
+                config=Config(
+                    signature_version='s3v4',
+                    max_pool_connections=max(settings.S3_MAX_POOL_CONNECTIONS, settings.STORAGE_MAX_CONCURRENCY),
+                    tcp_keepalive=True
+                ),
             )
         return self._client
     
@@ -56,81 +71,92 @@ def get_s3_client():
     return S3ClientManager.get_instance().client
 
 
-class LRUCache:
-    """Simple LRU cache with TTL support."""
+def _error_code(error: Exception) -> Optional[str]:
+    """The S3 error code of an exception from the S3 client, if any"""
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code')
+    return None
 
-    def __init__(self, maxsize: int = 100, ttl: int = 60):
-        """Initialize cache with maximum size and TTL in seconds."""
-        self.maxsize = maxsize
-        self.ttl = ttl
-        self.cache = {}  # key -> (value, timestamp, etag)
-        self.access_order = []  # LRU tracking
 
-    def get(self, key: str) -> Tuple[Any, Optional[str]]:
-        """Get item from cache and return (value, etag)."""
-        if key in self.cache:
-            value, timestamp, etag = self.cache[key]
-            current_time = time.time()
-            
-            # Check if item has expired
-            if current_time - timestamp > self.ttl:
-                self._remove(key)
-                return None, None
-                
-            # Update access order
-            self._update_access(key)
-            return value, etag
-            
-        return None, None
+def _is_not_found(error: Exception) -> bool:
+    """Whether an exception from the S3 client means the object does not exist"""
+    return _error_code(error) in ('404', 'NoSuchKey', 'NotFound')
 
-    def set(self, key: str, value: Any, etag: Optional[str] = None) -> None:
-        """Add item to cache with current timestamp."""
-        # If cache is full, evict the least recently used item
-        if len(self.cache) >= self.maxsize and key not in self.cache:
-            self._evict()
-            
-        self.cache[key] = (value, time.time(), etag)
-        self._update_access(key)
-
-    def _update_access(self, key: str) -> None:
-        """Update the access order for the LRU algorithm."""
-        if key in self.access_order:
-            self.access_order.remove(key)
-        self.access_order.append(key)
-
-    def _evict(self) -> None:
-        """Evict the least recently used item from the cache."""
-        if self.access_order:
-            lru_key = self.access_order.pop(0)
-            if lru_key in self.cache:
-                del self.cache[lru_key]
-
-    def _remove(self, key: str) -> None:
-        """Remove an item from the cache."""
-        if key in self.cache:
-            del self.cache[key]
-        if key in self.access_order:
-            self.access_order.remove(key)
+
+async def _iter_body(body, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Stream a botocore response body, reading each chunk in a worker thread"""
+    try:
+        while True:
+            chunk = await asyncio.to_thread(body.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        # Release the pooled connection even if the client went away mid-stream
+        body.close()
 
 
 class S3Storage(BaseStorageService):
-    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, cache_size: int = 100, cache_ttl: int = 600):
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        cache: Optional[LRUCache] = None,
+        inflight: Optional[SingleFlight] = None,
+        fresh_seconds: Optional[int] = None,
+        stale_while_revalidate: Optional[bool] = None
+    ):
         """Initialize S3 client with optional endpoint for S3-compatible storage"""
         # Get the S3 client from the manager - this will initialize it if needed
         self.s3 = get_s3_client()
         self.bucket = bucket
         
-        # Initialize cache
-        self.cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        # Share the process-wide content cache and in-flight downloads unless
+        # dedicated ones are given, so that cached notebooks survive across requests
+        self.cache = cache if cache is not None else get_notebook_cache()
+        self.inflight = inflight if inflight is not None else get_inflight_downloads()
+        
+        # Entries younger than fresh_seconds are trusted without asking S3; older
+        # ones are either revalidated in the background or before being served
+        self.fresh_seconds = settings.S3_CACHE_FRESH_SECONDS if fresh_seconds is None else fresh_seconds
+        self.stale_while_revalidate = (
+            settings.S3_CACHE_STALE_WHILE_REVALIDATE if stale_while_revalidate is None else stale_while_revalidate
+        )
+
+    def _cache_key(self, path: str) -> str:
+        """Cache key for a path; includes the bucket since the cache is shared"""
+        return f"{self.bucket}/{path}"
+
+    def cache_stats(self) -> Optional[Dict[str, int]]:
+        """Return statistics of the notebook content cache"""
+        stats = self.cache.stats()
+        stats["coalesced"] = self.inflight.coalesced
+        return stats
 
     async def list_notebooks(self, prefix: str = "") -> List[Dict]:
-        """List notebooks in storage asynchronously"""
+        """List all notebooks in storage asynchronously, following S3 pagination"""
+        notebooks = []
+        async for page in self.iter_notebooks(prefix):
+            notebooks.extend(page)
+        return notebooks
+
+    async def list_notebooks_page(
+        self,
+        prefix: str = "",
+        page_size: int = 1000,
+        continuation_token: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """List one page of notebooks with a single list_objects_v2 call"""
+        params = {
+            'Bucket': self.bucket,
+            'Prefix': prefix,
+            'MaxKeys': page_size
+        }
+        if continuation_token:
+            params['ContinuationToken'] = decode_continuation_token(continuation_token)
+        
         # Run the blocking S3 operation in a thread pool
-        response = await asyncio.to_thread(
-            self.s3.list_objects_v2,
-            Bucket=self.bucket,
-            Prefix=prefix
-        )
+        response = await asyncio.to_thread(self.s3.list_objects_v2, **params)
         
         notebooks = []
         for obj in response.get('Contents', []):
@@ -138,39 +164,82 @@ class S3Storage(BaseStorageService):
                 notebooks.append({
                     'path': obj['Key'],
                     'last_modified': obj['LastModified'],
-                    'size': obj['Size']
+                    'size': obj['Size'],
+                    'etag': obj.get('ETag')
                 })
-        return notebooks
+        
+        next_token = None
+        if response.get('IsTruncated') and response.get('NextContinuationToken'):
+            next_token = encode_continuation_token(response['NextContinuationToken'])
+        return notebooks, next_token
+
+    async def stat_notebook(self, path: str) -> Optional[Dict]:
+        """Get the listing entry of a single notebook with a HEAD request"""
+        try:
+            response = await asyncio.to_thread(
+                self.s3.head_object,
+                Bucket=self.bucket,
+                Key=path
+            )
+        except ClientError as e:
+            if _is_not_found(e):
+                return None
+            raise
+        
+        return {
+            'path': path,
+            'last_modified': response['LastModified'],
+            'size': response['ContentLength'],
+            'etag': response.get('ETag')
+        }
 
     async def read_notebook(self, path: str) -> BinaryIO:
         """
         Read notebook from storage asynchronously with caching
         """
+        return io.BytesIO(await self.download_notebook(path))
+
+    async def download_notebook(self, path: str) -> bytes:
+        """Download notebook content as bytes, serving it from the shared cache when valid"""
+        content, _ = await self.download_notebook_with_etag(path)
+        return content
+
+    async def download_notebook_with_etag(self, path: str) -> Tuple[bytes, Optional[str]]:
+        """
+        Download notebook content and its ETag, serving it from the shared cache when valid
+        
+        Concurrent misses for the same notebook are coalesced into a single GET.
+        """
         if not path:
             raise ValueError("Path cannot be empty")
             
         logger.info(f"[S3] Reading notebook with path: {path}")
         
         # Check cache first
-        cached_content, cached_etag = self.cache.get(path)
+        cache_key = self._cache_key(path)
+        entry = self.cache.get_entry(cache_key)
         
-        if cached_content is not None:
+        if entry is not None:
+            age = time.time() - entry.stored_at
+            if age < self.fresh_seconds:
+                logger.info(f"[S3] Serving fresh cached version of {path}")
+                return entry.value, entry.etag
+            
+            if self.stale_while_revalidate:
+                logger.info(f"[S3] Serving stale cached version of {path}, revalidating in the background")
+                self.inflight.start(f"revalidate:{cache_key}", lambda: self._revalidate(path, entry.etag))
+                return entry.value, entry.etag
+            
             logger.info(f"[S3] Found cached version of {path}")
             try:
                 # If we have a cached version, check if it's still valid using head_object
-                head_response = await asyncio.to_thread(
-                    self.s3.head_object,
-                    Bucket=self.bucket,
-                    Key=path
-                )
-                
-                current_etag = head_response.get('ETag')
+                current_etag = await self._head_etag(path)
                 
                 # If ETag matches, use cached version
-                if current_etag == cached_etag:
+                if current_etag == entry.etag:
                     logger.info(f"[S3] Cache is valid for {path}, using cached version")
-                    # Return a new BytesIO to avoid modifying the cached version
-                    return io.BytesIO(cached_content.getvalue())
+                    self.cache.touch(cache_key, current_etag)
+                    return entry.value, entry.etag
                 
                 logger.info(f"[S3] Cache is outdated for {path}, fetching new version")
             except Exception as e:
@@ -179,35 +248,104 @@ class S3Storage(BaseStorageService):
                 pass
         
         # If not in cache or cache is invalid, fetch from S3
+        return await self._fetch_once(path)
+
+    def _fetch_once(self, path: str) -> Awaitable[Tuple[bytes, Optional[str]]]:
+        """
+        Fetch a notebook, joining a fetch of the same version already in flight
+        
+        Fetches are keyed by the cache generation, so a read after a write or
+        delete never joins, or gets cached content from, a fetch started before it.
+        """
+        cache_key = self._cache_key(path)
+        generation = self.cache.generation(cache_key)
+        return self.inflight.do(f"{cache_key}#{generation}", lambda: self._fetch(path, generation))
+
+    async def _fetch(self, path: str, generation: int) -> Tuple[bytes, Optional[str]]:
+        """Fetch a notebook from S3 and store it in the cache unless it was invalidated meanwhile"""
         try:
-            # Log the exact S3 parameters we're using
-            logger.info(f"[S3] Making GetObject request: bucket={self.bucket}, key={path}")
-            
-            response = await asyncio.to_thread(
-                self.s3.get_object,
-                Bucket=self.bucket,
-                Key=path
-            )
-            
-            # Read the content
-            content = io.BytesIO(response['Body'].read())
-            content_length = len(content.getvalue())
-            logger.info(f"[S3] Successfully read {content_length} bytes from S3 for {path}")
-            
-            # Get ETag for cache validation
-            etag = response.get('ETag')
-            
-            # Cache the response
-            cache_copy = io.BytesIO(content.getvalue())
-            self.cache.set(path, cache_copy, etag)
-            
-            # Reset the position for the content being returned
-            content.seek(0)
-            return content
+            content, etag = await self._get_object(path)
+            logger.info(f"[S3] Successfully read {len(content)} bytes from S3 for {path}")
         except Exception as e:
             error_msg = f"[S3] Error reading notebook: bucket={self.bucket}, key={path}, error={str(e)}"
             logger.error(error_msg)
             raise Exception(error_msg)
+        
+        self.cache.set(self._cache_key(path), content, etag, generation=generation)
+        return content, etag
+
+    async def _revalidate(self, path: str, cached_etag: Optional[str]) -> None:
+        """Check a cached notebook against S3 and refresh it if it has changed"""
+        cache_key = self._cache_key(path)
+        try:
+            current_etag = await self._head_etag(path)
+            if current_etag == cached_etag and self.cache.touch(cache_key, current_etag):
+                return
+            logger.info(f"[S3] Cache is outdated for {path}, refreshing in the background")
+            await self._fetch_once(path)
+        except Exception as e:
+            # The entry stays until it expires; a deleted object is dropped right away
+            logger.warning(f"[S3] Background revalidation failed for {path}: {str(e)}")
+            if _is_not_found(e):
+                self.cache.invalidate(cache_key)
+
+    async def _get_object(self, path: str) -> Tuple[bytes, Optional[str]]:
+        """Download an object and return its content and ETag"""
+        # Log the exact S3 parameters we're using
+        logger.info(f"[S3] Making GetObject request: bucket={self.bucket}, key={path}")
+        
+        def get_object() -> Tuple[bytes, Optional[str]]:
+            response = self.s3.get_object(Bucket=self.bucket, Key=path)
+            return response['Body'].read(), response.get('ETag')
+        
+        # Read the body in the worker thread too, so the event loop never blocks on it
+        return await asyncio.to_thread(get_object)
+
+    async def _head_etag(self, path: str) -> Optional[str]:
+        """Return the current ETag of an object"""
+        head_response = await asyncio.to_thread(
+            self.s3.head_object,
+            Bucket=self.bucket,
+            Key=path
+        )
+        return head_response.get('ETag')
+
+    async def open_object(
+        self,
+        path: str,
+        byte_range: Optional[str] = None,
+        if_none_match: Optional[str] = None
+    ) -> ObjectStream:
+        """Open an object for streaming; range and ETag checks are answered by S3"""
+        params = {'Bucket': self.bucket, 'Key': path}
+        if is_single_byte_range(byte_range):
+            params['Range'] = byte_range.strip()
+        if if_none_match:
+            params['IfNoneMatch'] = if_none_match
+        
+        logger.info(f"[S3] Opening object for streaming: bucket={self.bucket}, key={path}")
+        try:
+            response = await asyncio.to_thread(self.s3.get_object, **params)
+        except ClientError as e:
+            code = _error_code(e)
+            if code in ('304', 'NotModified'):
+                headers = e.response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+                return ObjectStream(body=None, etag=headers.get('etag', if_none_match), not_modified=True)
+            if _is_not_found(e):
+                raise FileNotFoundError(f"Object not found: {path}")
+            if code in ('416', 'InvalidRange'):
+                raise RangeNotSatisfiableError(f"Range {byte_range} not satisfiable for {path}")
+            raise
+        
+        return ObjectStream(
+            body=_iter_body(response['Body']),
+            content_length=response.get('ContentLength'),
+            etag=response.get('ETag'),
+            content_range=response.get('ContentRange'),
+            content_type=response.get('ContentType'),
+            content_encoding=response.get('ContentEncoding'),
+            last_modified=response.get('LastModified')
+        )
 
     async def write_notebook(self, path: str, content: BinaryIO) -> str:
         """Write notebook to storage asynchronously and invalidate cache"""
@@ -219,7 +357,7 @@ class S3Storage(BaseStorageService):
         )
         
         # Invalidate cache by removing the entry
-        self.cache._remove(path)
+        self.cache.invalidate(self._cache_key(path))
         
         return f"s3://{self.bucket}/{path}"
 
@@ -242,4 +380,4 @@ class S3Storage(BaseStorageService):
         )
         
         # Invalidate cache by removing the entry
-        self.cache._remove(path) 
\ No newline at end of file
+        self.cache.invalidate(self._cache_key(path)) 
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+Utilities for serving content-encoded objects to clients.
+"""
+import asyncio
+import zlib
+from typing import AsyncIterator, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd-encoded outputs are optional
+    zstandard = None
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    Parse an Accept-Encoding header into a mapping of coding to quality.
+    
+    Args:
+        header: The Accept-Encoding header value, e.g. "gzip, br;q=0.8"
+        
+    Returns:
+        Dictionary mapping lower-case content codings (or "*") to their q-value
+    """
+    accepted = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def accepts_encoding(header: Optional[str], encoding: Optional[str]) -> bool:
+    """Whether a client sending this Accept-Encoding header accepts a content coding"""
+    if not encoding or encoding.lower() == "identity":
+        return True
+    accepted = parse_accept_encoding(header)
+    quality = accepted.get(encoding.lower(), accepted.get("*", 0.0))
+    return quality > 0
+
+
+def can_decompress(encoding: Optional[str]) -> bool:
+    """Whether decompress_stream supports a content coding"""
+    if not encoding or encoding.lower() == "identity":
+        return True
+    if encoding.lower() in ("gzip", "x-gzip", "deflate"):
+        return True
+    return encoding.lower() == "zstd" and zstandard is not None
+
+
+async def decompress_stream(chunks: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+    """
+    Decode a content-encoded stream chunk by chunk.
+    
+    Decompression runs in a worker thread so large outputs don't block the event loop.
+    
+    Args:
+        chunks: Async iterator over the encoded content
+        encoding: Content coding of the stream: gzip, deflate or zstd
+        
+    Yields:
+        Decoded content
+    """
+    encoding = encoding.lower()
+    if encoding in ("gzip", "x-gzip"):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+        decompressor = zlib.decompressobj()
+    elif encoding == "zstd" and zstandard is not None:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    else:
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+    
+    async for chunk in chunks:
+        data = await asyncio.to_thread(decompressor.decompress, chunk)
+        if data:
+            yield data
+    
+    if hasattr(decompressor, "flush"):
+        tail = decompressor.flush()
+        if tail:
+            yield tail
@@ -0,0 +1,26 @@
+"""
+Utilities for running many awaitables concurrently with bounded parallelism.
+"""
+import asyncio
+from typing import Any, Awaitable, Iterable, List
+
+
+async def gather_bounded(aws: Iterable[Awaitable[Any]], limit: int, return_exceptions: bool = False) -> List[Any]:
+    """
+    Await all awaitables with at most `limit` of them running at the same time.
+    
+    Args:
+        aws: The awaitables to run, e.g. coroutines that each make one network call
+        limit: Maximum number of awaitables in flight
+        return_exceptions: Return exceptions as results instead of raising the first one
+        
+    Returns:
+        The results in the same order as the awaitables
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+    
+    async def run(aw: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await aw
+    
+    return await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=return_exceptions)
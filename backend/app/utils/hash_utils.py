@@ -1,6 +1,7 @@
 """
 Utilities for hashing notebooks and parameters to detect duplicate executions.
 """
+import copy
 import hashlib
 import json
 import re
@@ -24,21 +25,41 @@ def get_notebook_hash(notebook_content: Union[str, bytes], strip_outputs: bool =
     
     # Parse the notebook
     if strip_outputs:
-        notebook = nbformat.reads(notebook_content, as_version=4)
-        
-        # Remove outputs and execution counts from cells
-        for cell in notebook.cells:
-            if cell.cell_type == 'code':
-                cell.outputs = []
-                cell.execution_count = None
-        
-        # Convert back to string
-        notebook_content = nbformat.writes(notebook)
+        return get_notebook_node_hash(nbformat.reads(notebook_content, as_version=4))
     
     # Compute hash
     return hashlib.sha256(notebook_content.encode('utf-8')).hexdigest()
 
 
+def get_notebook_node_hash(notebook: nbformat.NotebookNode) -> str:
+    """
+    Compute the output-stripped hash of an already parsed notebook.
+    
+    The result is identical to get_notebook_hash() on the notebook's content, but the
+    notebook is not parsed again and the given node is left unchanged.
+    
+    Args:
+        notebook: The parsed notebook, in any nbformat version
+        
+    Returns:
+        A hex string hash of the notebook content
+    """
+    if notebook.get('nbformat') != 4:
+        # Upgrading modifies the notebook in place
+        notebook = nbformat.convert(copy.deepcopy(notebook), 4)
+    
+    # Remove outputs and execution counts from a shallow copy of the cells
+    stripped = nbformat.NotebookNode(notebook)
+    stripped.cells = [
+        nbformat.NotebookNode(cell, outputs=[], execution_count=None) if cell.cell_type == 'code' else cell
+        for cell in notebook.cells
+    ]
+    
+    # Convert back to string; writes() deep-copies before serialising
+    notebook_content = nbformat.writes(stripped)
+    return hashlib.sha256(notebook_content.encode('utf-8')).hexdigest()
+
+
 def get_parameters_hash(parameters: Dict[str, Any]) -> str:
     """
     Compute a hash of execution parameters.
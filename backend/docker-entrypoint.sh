@@ -5,6 +5,11 @@ set -e
 echo "Running database migrations..."
 alembic upgrade head
 
+# Fill the notebook identity of executions the migrations could not backfill;
+# this only touches executions without one, so it is quick once they are filled
+echo "Backfilling notebook identity of executions..."
+python scripts/backfill_execution_notebook_identity.py || echo "Notebook identity backfill failed, retrying on the next start"
+
 # Start application based on environment
 if [ "$1" = "dev" ]; then
     echo "Starting development server..."
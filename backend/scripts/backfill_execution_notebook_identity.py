@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Script to fill the notebook identity of executions created before it was stored.
+Usage: python scripts/backfill_execution_notebook_identity.py
+
+The 03execution_notebook_identity migration copies the identity from the notebook
+template index; this script handles the remaining executions by reading each
+distinct notebook once from storage. Notebooks that no longer exist get an empty
+name so they are not retried.
+
+Only executions without a notebook name are touched, so the script is safe to run
+on every start; docker-entrypoint.sh runs it after the migrations. If no
+notebook can be read at all, storage is most likely unreachable, so nothing is
+written and the next run tries again.
+"""
+
+import sys
+import asyncio
+import logging
+from pathlib import Path
+
+# Add the parent directory to PYTHONPATH
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.db.session import SessionLocal
+from app.models.execution import Execution
+from app.services.notebook_metadata import NotebookMetadataExtractor
+from app.services.storage.factory import create_storage_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def backfill() -> None:
+    db = SessionLocal()
+    storage = create_storage_service()
+    try:
+        paths = [
+            path for (path,) in db.query(Execution.notebook_path)
+            .filter(Execution.notebook_name.is_(None), Execution.notebook_path.isnot(None))
+            .distinct()
+        ]
+        logger.info(f"Backfilling notebook identity for {len(paths)} notebooks")
+
+        contents = await storage.download_notebooks(paths, return_exceptions=True)
+        if paths and all(isinstance(content, BaseException) for content in contents):
+            # Most likely storage is unreachable; do not blank every notebook name
+            logger.error(f"Could not read any notebook from storage, leaving executions for the next run: "
+                         f"{str(contents[0])}")
+            return
+        for path, content in zip(paths, contents):
+            identity = {}
+            try:
+                if isinstance(content, BaseException):
+                    raise content
+                identity = NotebookMetadataExtractor(content.decode('utf-8')).extract_metadata()["identity"]
+            except Exception as e:
+                logger.warning(f"Failed to get notebook metadata for path {path}: {str(e)}")
+
+            updated = (
+                db.query(Execution)
+                .filter(Execution.notebook_path == path, Execution.notebook_name.is_(None))
+                .update({
+                    Execution.notebook_name: identity.get('name', ''),
+                    Execution.notebook_description: identity.get('description', ''),
+                    Execution.notebook_tags: identity.get('tags', []),
+                }, synchronize_session=False)
+            )
+            db.commit()
+            logger.info(f"Updated {updated} executions of {path}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
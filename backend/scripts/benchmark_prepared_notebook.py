@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of the per-submission notebook processing in create_execution.
+Usage: python scripts/benchmark_prepared_notebook.py [--cells 200] [--runs 50]
+
+Compares the previous pipeline, which parsed the notebook JSON separately for the
+metadata, the parameter types and the hash, with PreparedNotebook, which parses
+it once. Storage is not involved; only CPU time is measured.
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+import nbformat
+
+# Add the parent directory to PYTHONPATH
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.notebook_metadata import NotebookMetadataExtractor
+from app.services.prepared_notebook import PreparedNotebook
+from app.utils.hash_utils import get_notebook_hash
+
+
+def make_notebook(cells: int) -> bytes:
+    """Build a notebook with a parameters cell and `cells` code cells with outputs"""
+    notebook_cells = [{
+        "cell_type": "code",
+        "id": "parameters",
+        "metadata": {"tags": ["parameters"]},
+        "source": "start_date: str = '2025-01-01'\ndays: int = 7\nratio: float = 0.5",
+        "outputs": [],
+        "execution_count": None
+    }]
+    for i in range(cells):
+        notebook_cells.append({
+            "cell_type": "code",
+            "id": f"cell-{i}",
+            "metadata": {},
+            "source": f"result_{i} = compute(days, ratio)\nprint(result_{i})",
+            "outputs": [{"output_type": "stream", "name": "stdout", "text": "x" * 2000 + "\n"}],
+            "execution_count": i + 1
+        })
+    return json.dumps({
+        "nbformat": 4,
+        "nbformat_minor": 5,
+        "metadata": {"notebook_spec": {"name": "Benchmark", "tags": ["bench"]}},
+        "cells": notebook_cells
+    }).encode("utf-8")
+
+
+def previous_extract_metadata(content: str) -> dict:
+    """The extractor used to read the notebook twice: to detect its version, then to load it"""
+    nbformat.reads(content, as_version=nbformat.NO_CONVERT)
+    notebook = nbformat.reads(content, as_version=4)
+    return NotebookMetadataExtractor.from_notebook(notebook).extract_metadata()
+
+
+def previous_pipeline(content: bytes) -> None:
+    """Parse steps of create_execution before the notebook was prepared once"""
+    previous_extract_metadata(content.decode('utf-8'))  # name
+    previous_extract_metadata(content.decode('utf-8'))  # parameter types
+    get_notebook_hash(content)  # duplicate check
+    get_notebook_hash(content)  # execution hash
+
+
+def prepared_pipeline(content: bytes) -> None:
+    notebook = PreparedNotebook("benchmark.ipynb", content)
+    notebook.metadata, notebook.parameter_types, notebook.notebook_hash
+
+
+def measure(fn, content: bytes, runs: int) -> float:
+    """Best-of-three mean time per call in milliseconds"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(runs):
+            fn(content)
+        best = min(best, (time.perf_counter() - start) / runs)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cells", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    content = make_notebook(args.cells)
+    previous = measure(previous_pipeline, content, args.runs)
+    prepared = measure(prepared_pipeline, content, args.runs)
+
+    print(f"Notebook size: {len(content) / 1024:.0f} KiB, {args.cells + 1} cells")
+    print(f"Previous pipeline: {previous:.2f} ms per submission")
+    print(f"PreparedNotebook:  {prepared:.2f} ms per submission")
+    print(f"Speed-up: {previous / prepared:.1f}x")
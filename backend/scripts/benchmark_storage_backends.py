@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Benchmark of the storage backends on the same notebook workload.
+Usage: python scripts/benchmark_storage_backends.py [--notebooks 200] [--size 65536] [--concurrency 16]
+
+Writes, lists, stats and reads the same set of notebooks through InMemoryStorage,
+LocalFSStorage (in a temporary directory) and S3Storage. S3Storage runs against
+S3_ENDPOINT_URL (e.g. a local MinIO), or an in-process moto server if it is not
+set and moto is installed; it is skipped when neither is available. Reads use
+open_object() so that the notebook cache of S3Storage does not hide the backend.
+"""
+
+import os
+import sys
+import io
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add the parent directory to PYTHONPATH
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.storage.local_storage import LocalFSStorage
+from app.services.storage.memory_storage import InMemoryStorage
+from app.utils.concurrency import gather_bounded
+
+
+def start_moto_server() -> str:
+    """Start an in-process moto server and return its endpoint URL"""
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}"
+
+
+def create_s3_storage():
+    """S3Storage on S3_ENDPOINT_URL or a moto server, or None if neither is available"""
+    if not os.getenv("S3_ENDPOINT_URL"):
+        try:
+            os.environ["S3_ENDPOINT_URL"] = start_moto_server()
+        except ImportError:
+            return None
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    import boto3
+    from app.services.storage.s3_storage import S3Storage
+
+    bucket = os.getenv("S3_BUCKET_NAME", "nbforge-benchmark")
+    s3 = boto3.client('s3', endpoint_url=os.environ["S3_ENDPOINT_URL"])
+    try:
+        s3.create_bucket(Bucket=bucket)
+    except (s3.exceptions.BucketAlreadyOwnedByYou, s3.exceptions.BucketAlreadyExists):
+        pass
+    return S3Storage(bucket)
+
+
+async def timed(operations, concurrency: int) -> float:
+    """Run the operations with bounded concurrency and return the mean milliseconds per operation"""
+    operations = list(operations)
+    start = time.perf_counter()
+    await gather_bounded(operations, limit=concurrency)
+    return (time.perf_counter() - start) / len(operations) * 1000
+
+
+async def read(storage, path: str) -> None:
+    stream = await storage.open_object(path)
+    async for _ in stream.body:
+        pass
+
+
+async def run_workload(storage, paths, payload: bytes, concurrency: int) -> dict:
+    results = {
+        "write": await timed((storage.write_notebook(path, io.BytesIO(payload)) for path in paths), concurrency),
+        "list": await timed([storage.list_notebooks("benchmark/")], 1),
+        "stat": await timed((storage.stat_notebook(path) for path in paths), concurrency),
+        "read": await timed((read(storage, path) for path in paths), concurrency),
+    }
+    await gather_bounded((storage.delete_notebook(path) for path in paths), limit=concurrency)
+    return results
+
+
+async def main(args) -> None:
+    payload = os.urandom(args.size)
+    paths = [f"benchmark/notebook-{i}.ipynb" for i in range(args.notebooks)]
+
+    with tempfile.TemporaryDirectory() as root:
+        backends = [("InMemoryStorage", InMemoryStorage()), ("LocalFSStorage", LocalFSStorage(root))]
+        s3_storage = create_s3_storage()
+        if s3_storage is not None:
+            backends.append(("S3Storage", s3_storage))
+
+        print(f"{args.notebooks} notebooks of {args.size / 1024:.0f} KiB, {args.concurrency} concurrent")
+        print(f"{'Backend':<16}{'write':>10}{'list':>10}{'stat':>10}{'read':>10}   (ms per operation)")
+        for name, storage in backends:
+            results = await run_workload(storage, paths, payload, args.concurrency)
+            print(f"{name:<16}" + "".join(f"{results[op]:>10.3f}" for op in ("write", "list", "stat", "read")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notebooks", type=int, default=200)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="Notebook size in bytes")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
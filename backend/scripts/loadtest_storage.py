@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Load test comparing S3Storage and AsyncS3Storage under concurrent reads.
+Usage: python scripts/loadtest_storage.py [--concurrency 200] [--requests 2000] [--size 65536]
+
+Runs against the S3-compatible server at S3_ENDPOINT_URL (e.g. a local MinIO). When
+S3_ENDPOINT_URL is not set and moto is installed, an in-process moto server is used.
+Objects are read with open_object() so that every request goes to the server instead
+of the notebook cache.
+
+The moto fallback only checks that the script works: the moto server runs in the
+same Python process and is the bottleneck, so both backends measure the same. Compare them against MinIO or S3.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+# Add the parent directory to PYTHONPATH
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+def start_moto_server() -> str:
+    """Start an in-process moto server and return its endpoint URL"""
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}"
+
+
+async def read_all(storage, keys, concurrency: int) -> float:
+    """Read every key with at most `concurrency` reads in flight and return the elapsed time"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def read(key: str) -> None:
+        async with semaphore:
+            stream = await storage.open_object(key)
+            async for _ in stream.body:
+                pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*(read(key) for key in keys))
+    return time.perf_counter() - start
+
+
+async def main(args) -> None:
+    import boto3
+    from app.services.storage.s3_storage import S3Storage
+    from app.services.storage.async_s3_storage import AsyncS3Storage, AsyncS3ClientManager
+
+    bucket = os.environ["S3_BUCKET_NAME"]
+    s3 = boto3.client('s3', endpoint_url=os.environ["S3_ENDPOINT_URL"])
+    try:
+        s3.create_bucket(Bucket=bucket)
+    except (s3.exceptions.BucketAlreadyOwnedByYou, s3.exceptions.BucketAlreadyExists):
+        pass
+
+    objects = max(1, min(args.requests, 100))
+    payload = os.urandom(args.size)
+    for i in range(objects):
+        s3.put_object(Bucket=bucket, Key=f"loadtest/object-{i}.ipynb", Body=payload)
+    keys = [f"loadtest/object-{i % objects}.ipynb" for i in range(args.requests)]
+
+    print(f"Endpoint: {os.environ['S3_ENDPOINT_URL']}")
+    print(f"{args.requests} reads of {args.size / 1024:.0f} KiB, {args.concurrency} concurrent")
+    for name, storage in (("S3Storage", S3Storage(bucket)), ("AsyncS3Storage", AsyncS3Storage(bucket))):
+        await read_all(storage, keys[:args.concurrency], args.concurrency)  # warm up the pools
+        elapsed = await read_all(storage, keys, args.concurrency)
+        print(f"{name:<15} {elapsed:6.2f} s  {args.requests / elapsed:8.0f} reads/s")
+
+    await AsyncS3ClientManager.get_instance().close()
+    for i in range(objects):
+        s3.delete_object(Bucket=bucket, Key=f"loadtest/object-{i}.ipynb")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="Object size in bytes")
+    args = parser.parse_args()
+
+    if not os.getenv("S3_ENDPOINT_URL"):
+        os.environ["S3_ENDPOINT_URL"] = start_moto_server()
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("S3_BUCKET_NAME", "nbforge-loadtest")
+
+    asyncio.run(main(args))
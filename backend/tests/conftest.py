@@ -0,0 +1,24 @@
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import Base
+from app.services.execution_service import ExecutionService
+
+@pytest.fixture
+def db():
+    """Session on an empty in-memory SQLite database with all tables; modules seed it by overriding db(db)"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def execution_service(db):
+    """ExecutionService on the test database with a mocked batch executor"""
+    service = ExecutionService.__new__(ExecutionService)
+    service.db = db
+    service.batch_executor = MagicMock()
+    return service
@@ -0,0 +1,70 @@
+import io
+import pytest
+import pytest_asyncio
+import boto3
+
+pytest.importorskip("aiobotocore")
+moto_server = pytest.importorskip("moto.server")
+
+from app.services.storage.async_s3_storage import AsyncS3ClientManager, AsyncS3Storage
+from app.services.storage.cache import LRUCache, SingleFlight
+
+BUCKET = "nbforge-test"
+
+@pytest.fixture(scope="module")
+def endpoint():
+    server = moto_server.ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+@pytest_asyncio.fixture
+async def storage(endpoint, monkeypatch):
+    monkeypatch.setenv("S3_ENDPOINT_URL", endpoint)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    boto3.client("s3", endpoint_url=endpoint, region_name="us-east-1").create_bucket(Bucket=BUCKET)
+
+    manager = AsyncS3ClientManager()
+    monkeypatch.setattr(AsyncS3ClientManager, "_instance", manager)
+    yield AsyncS3Storage(bucket=BUCKET, cache=LRUCache(maxbytes=1024 * 1024), inflight=SingleFlight())
+    await manager.close()
+
+class TestAsyncS3Storage:
+    @pytest.mark.asyncio
+    async def test_write_read_list_and_delete(self, storage):
+        await storage.write_notebook("notebooks/a.ipynb", io.BytesIO(b'{"cells": []}'))
+        await storage.write_notebook("notebooks/readme.md", io.BytesIO(b"# readme"))
+
+        content, etag = await storage.download_notebook_with_etag("notebooks/a.ipynb")
+        assert content == b'{"cells": []}'
+        assert etag
+
+        notebooks = await storage.list_notebooks("notebooks/")
+        assert [notebook["path"] for notebook in notebooks] == ["notebooks/a.ipynb"]
+        assert (await storage.stat_notebook("notebooks/a.ipynb"))["etag"] == etag
+        assert await storage.stat_notebook("notebooks/missing.ipynb") is None
+
+        await storage.delete_notebook("notebooks/a.ipynb")
+        assert await storage.stat_notebook("notebooks/a.ipynb") is None
+
+    @pytest.mark.asyncio
+    async def test_open_object_streams_ranges(self, storage):
+        await storage.write_notebook("outputs/1/report.html", io.BytesIO(b"0123456789"))
+
+        stream = await storage.open_object("outputs/1/report.html", byte_range="bytes=2-4")
+        body = b"".join([chunk async for chunk in stream.body])
+
+        assert body == b"234"
+        assert stream.content_range == "bytes 2-4/10"
+
+        with pytest.raises(FileNotFoundError):
+            await storage.open_object("outputs/1/missing.html")
+
+    @pytest.mark.asyncio
+    async def test_one_client_is_shared_per_event_loop(self, storage):
+        manager = AsyncS3ClientManager.get_instance()
+
+        assert await manager.get_client() is await manager.get_client()
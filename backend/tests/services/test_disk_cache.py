@@ -0,0 +1,183 @@
+import asyncio
+import io
+import os
+import time
+import pytest
+from unittest.mock import AsyncMock
+from app.services.storage.disk_cache import DiskCache, DiskCachedStorage
+from app.services.storage.memory_storage import InMemoryStorage
+
+async def collect(stream):
+    return b"".join([chunk async for chunk in stream.body])
+
+def age(cache, key, seconds):
+    """Pretend the entry was last validated `seconds` ago"""
+    path = cache._file(key)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime - seconds))
+
+@pytest.fixture
+def origin():
+    storage = InMemoryStorage()
+    storage.download_notebook_with_etag = AsyncMock(wraps=storage.download_notebook_with_etag)
+    storage.open_object = AsyncMock(wraps=storage.open_object)
+    return storage
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(str(tmp_path / "cache"), max_bytes=1000)
+
+class TestDiskCache:
+    def test_put_and_read(self, cache):
+        cache.put("nb.ipynb", b"content", '"v1"', content_type="text/html")
+
+        entry, content = cache.read("nb.ipynb")
+        assert content == b"content"
+        assert entry.etag == '"v1"'
+        assert entry.content_type == "text/html"
+        assert cache.read("other.ipynb") is None
+        assert cache.stats()["bytes"] > len(b"content")
+
+    def test_least_recently_used_entries_are_evicted(self, cache):
+        for name in ["a", "b", "c"]:
+            cache.put(name, b"x" * 200, '"v1"')
+            time.sleep(0.01)
+        cache.read("a")
+        cache.put("d", b"x" * 240, '"v1"')
+
+        assert cache.read("b") is None
+        assert cache.read("a") is not None
+        assert cache.read("d") is not None
+        assert cache.stats()["bytes"] <= 1000
+
+    def test_objects_larger_than_the_object_limit_are_not_cached(self, cache):
+        cache.put("big", b"x" * 300, '"v1"')
+        assert cache.read("big") is None
+
+    def test_processes_sharing_a_directory_see_each_other(self, cache):
+        other = DiskCache(cache.directory, max_bytes=1000)
+        cache.put("nb.ipynb", b"content", '"v1"')
+        assert other.read("nb.ipynb")[1] == b"content"
+
+        other.remove("nb.ipynb")
+        assert cache.read("nb.ipynb") is None
+        assert cache.stats()["bytes"] == 0
+
+    def test_incomplete_entries_are_discarded(self, cache):
+        writer = cache.writer("nb.ipynb", '"v1"', 10)
+        writer.write(b"12345")
+        writer.commit()
+
+        assert cache.read("nb.ipynb") is None
+        assert [name for name in os.listdir(cache.directory) if name.startswith(".tmp-")] == []
+
+class TestDiskCachedStorage:
+    @pytest.mark.asyncio
+    async def test_fresh_entries_are_served_from_disk(self, origin, cache):
+        origin.put_object("nb.ipynb", b"v1")
+        storage = DiskCachedStorage(origin, cache, fresh_seconds=30)
+
+        assert await storage.download_notebook("nb.ipynb") == b"v1"
+        assert await storage.download_notebook("nb.ipynb") == b"v1"
+        assert origin.download_notebook_with_etag.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_entries_are_revalidated_by_etag(self, origin, cache):
+        origin.put_object("nb.ipynb", b"v1")
+        storage = DiskCachedStorage(origin, cache, fresh_seconds=30)
+        await storage.download_notebook("nb.ipynb")
+
+        age(cache, "/nb.ipynb", 60)
+        assert await storage.download_notebook("nb.ipynb") == b"v1"
+        assert origin.download_notebook_with_etag.await_count == 1
+
+        # Changed behind the cache's back
+        origin.put_object("nb.ipynb", b"v2")
+        age(cache, "/nb.ipynb", 60)
+        assert await storage.download_notebook("nb.ipynb") == b"v2"
+        assert origin.download_notebook_with_etag.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_writes_and_deletes_invalidate_for_all_workers(self, origin, cache):
+        origin.put_object("nb.ipynb", b"v1")
+        worker_a = DiskCachedStorage(origin, cache, fresh_seconds=30)
+        worker_b = DiskCachedStorage(origin, DiskCache(cache.directory, max_bytes=1000), fresh_seconds=30)
+        await worker_b.download_notebook("nb.ipynb")
+
+        await worker_a.write_notebook("nb.ipynb", io.BytesIO(b"v2"))
+        assert await worker_b.download_notebook("nb.ipynb") == b"v2"
+
+        await worker_a.delete_notebook("nb.ipynb")
+        with pytest.raises(FileNotFoundError):
+            await worker_b.download_notebook("nb.ipynb")
+
+    @pytest.mark.asyncio
+    async def test_write_during_a_download_is_not_undone(self, origin, cache):
+        origin.put_object("nb.ipynb", b"old")
+        worker_a = DiskCachedStorage(origin, cache, fresh_seconds=30)
+        worker_b = DiskCachedStorage(origin, DiskCache(cache.directory, max_bytes=1000), fresh_seconds=30)
+        download = origin.download_notebook_with_etag
+
+        async def slow_download(path):
+            result = await download(path)
+            await asyncio.sleep(0.1)
+            return result
+        origin.download_notebook_with_etag = AsyncMock(side_effect=slow_download)
+
+        read = asyncio.ensure_future(worker_b.download_notebook("nb.ipynb"))
+        await asyncio.sleep(0.05)
+        await worker_a.write_notebook("nb.ipynb", io.BytesIO(b"new"))
+
+        assert await read == b"old"
+        assert await worker_b.download_notebook("nb.ipynb") == b"new"
+
+    @pytest.mark.asyncio
+    async def test_delete_during_a_streamed_read_is_not_undone(self, origin, cache):
+        origin.put_object("out/report.html", b"0123456789")
+        storage = DiskCachedStorage(origin, cache, fresh_seconds=30)
+
+        stream = await storage.open_object("out/report.html")
+        await storage.delete_notebook("out/report.html")
+        assert await collect(stream) == b"0123456789"
+
+        assert cache.read("/out/report.html") is None
+        assert cache.stats()["bytes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_streamed_objects_are_cached_with_their_metadata(self, origin, cache):
+        origin.put_object("out/report.html", b"0123456789", content_type="text/html", content_encoding="gzip")
+        storage = DiskCachedStorage(origin, cache, fresh_seconds=30)
+
+        assert await collect(await storage.open_object("out/report.html")) == b"0123456789"
+
+        partial = await storage.open_object("out/report.html", byte_range="bytes=2-4")
+        assert await collect(partial) == b"234"
+        assert partial.content_range == "bytes 2-4/10"
+        assert partial.content_encoding == "gzip"
+        assert origin.open_object.await_count == 1
+
+        not_modified = await storage.open_object("out/report.html", if_none_match=partial.etag)
+        assert not_modified.not_modified
+
+    @pytest.mark.asyncio
+    async def test_stale_streamed_objects_are_revalidated(self, origin, cache):
+        origin.put_object("out/report.html", b"v1")
+        storage = DiskCachedStorage(origin, cache, fresh_seconds=30)
+        await collect(await storage.open_object("out/report.html"))
+
+        origin.put_object("out/report.html", b"v2")
+        age(cache, "/out/report.html", 60)
+        assert await collect(await storage.open_object("out/report.html")) == b"v2"
+        assert await collect(await storage.open_object("out/report.html")) == b"v2"
+        assert origin.open_object.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_ranged_and_abandoned_reads_are_not_cached(self, origin, cache):
+        origin.put_object("out/report.html", b"0123456789")
+        storage = DiskCachedStorage(origin, cache, fresh_seconds=30)
+
+        await collect(await storage.open_object("out/report.html", byte_range="bytes=0-1"))
+        stream = await storage.open_object("out/report.html")
+        await stream.body.aclose()
+
+        assert cache.read("/out/report.html") is None
@@ -0,0 +1,88 @@
+import json
+import pytest
+from unittest.mock import AsyncMock
+from sqlalchemy import inspect
+from app.models import Execution
+from app.services.storage.memory_storage import InMemoryStorage
+from app.utils.hash_utils import get_execution_hash, get_notebook_hash, get_parameters_hash
+
+NOTEBOOK = json.dumps({
+    "nbformat": 4,
+    "nbformat_minor": 5,
+    "metadata": {"notebook_spec": {"name": "Sweep"}},
+    "cells": [
+        {
+            "cell_type": "code",
+            "id": "params",
+            "metadata": {"tags": ["parameters"]},
+            "source": "days: int = 7",
+            "outputs": [],
+            "execution_count": None
+        }
+    ]
+}).encode("utf-8")
+
+@pytest.fixture
+def service(execution_service):
+    storage = InMemoryStorage()
+    storage.put_object("notebooks/sweep.ipynb", NOTEBOOK)
+    storage.download_notebook_with_etag = AsyncMock(wraps=storage.download_notebook_with_etag)
+
+    execution_service.storage = storage
+    execution_service.batch_executor.create_jobs = AsyncMock(
+        side_effect=lambda jobs: [
+            RuntimeError("quota exceeded") if job["parameters"]["days"] == 3 else job["job_name"] for job in jobs
+        ]
+    )
+    return execution_service
+
+class TestCreateExecutions:
+    @pytest.mark.asyncio
+    async def test_notebook_is_loaded_once_and_jobs_created_in_one_call(self, db, service):
+        results = await service.create_executions(
+            "notebooks/sweep.ipynb", [{"days": "1"}, {"days": "2"}, {"days": "3"}], user_id="user-1"
+        )
+
+        assert service.storage.download_notebook_with_etag.await_count == 1
+        service.batch_executor.create_jobs.assert_awaited_once()
+        jobs = service.batch_executor.create_jobs.call_args[0][0]
+        assert [job["parameters"] for job in jobs] == [{"days": 1}, {"days": 2}, {"days": 3}]
+        assert all(job["notebook_content"] == NOTEBOOK for job in jobs)
+
+        assert [result["execution"].status for result in results] == ["submitted", "submitted", "failed"]
+        assert results[2]["error"] == "quota exceeded"
+        assert db.query(Execution).count() == 3
+        assert {execution.user_id for execution in db.query(Execution)} == {"user-1"}
+
+    @pytest.mark.asyncio
+    async def test_completed_duplicates_are_returned_instead_of_rerun(self, db, service):
+        notebook_hash = get_notebook_hash(NOTEBOOK)
+        db.add(Execution(
+            id="earlier",
+            notebook_path="notebooks/sweep.ipynb",
+            status="completed",
+            execution_hash=get_execution_hash(notebook_hash, get_parameters_hash({"days": 1}))
+        ))
+        db.commit()
+
+        results = await service.create_executions("notebooks/sweep.ipynb", [{"days": "1"}, {"days": "2"}])
+
+        assert results[0]["is_duplicate"] and results[0]["execution"].id == "earlier"
+        assert [job["parameters"] for job in service.batch_executor.create_jobs.call_args[0][0]] == [{"days": 2}]
+
+        await service.create_executions("notebooks/sweep.ipynb", [{"days": "1"}], force_rerun=True)
+        assert db.query(Execution).count() == 3
+
+    @pytest.mark.asyncio
+    async def test_later_status_reported_by_runner_is_kept(self, db, service):
+        async def create_jobs(jobs):
+            # The runner of the first job reports before the batch is done
+            db.query(Execution).filter(Execution.id == jobs[0]["job_name"]).update({"status": "running"})
+            return [job["job_name"] for job in jobs]
+        service.batch_executor.create_jobs = AsyncMock(side_effect=create_jobs)
+
+        results = await service.create_executions("notebooks/sweep.ipynb", [{"days": "1"}, {"days": "2"}])
+
+        # Returned executions are refreshed together, not lazily one by one
+        assert not any(inspect(result["execution"]).expired_attributes for result in results)
+        assert [result["execution"].status for result in results] == ["running", "submitted"]
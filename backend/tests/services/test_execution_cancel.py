@@ -0,0 +1,70 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+from app.models import Execution
+
+@pytest.fixture
+def db(db):
+    start = datetime(2025, 1, 1)
+    for i, status in enumerate(["running", "submitted", "pending", "completed", "running"]):
+        db.add(Execution(
+            id=f"exec-{i}",
+            notebook_path="notebooks/report.ipynb",
+            status=status,
+            user_id="user-1" if i < 4 else "user-2",
+            created_at=start + timedelta(minutes=i)
+        ))
+    db.commit()
+    return db
+
+@pytest.fixture
+def service(db, execution_service):
+    # The job of exec-2 has not been created yet
+    execution_service.batch_executor.cancel_jobs = AsyncMock(
+        side_effect=lambda job_names: {job_name: not job_name.endswith("exec-2") for job_name in job_names}
+    )
+    return execution_service
+
+class TestCancelExecutions:
+    @pytest.mark.asyncio
+    async def test_jobs_are_cancelled_in_one_call(self, db, service):
+        results = await service.cancel_executions(execution_ids=["exec-0", "exec-1", "exec-2", "exec-3", "missing"])
+
+        service.batch_executor.cancel_jobs.assert_awaited_once_with(
+            ["notebook-execution-exec-0", "notebook-execution-exec-1", "notebook-execution-exec-2"]
+        )
+        outcomes = {result["execution_id"]: result["success"] for result in results}
+        assert outcomes == {"exec-0": True, "exec-1": True, "exec-2": False, "exec-3": False, "missing": False}
+        assert [db.get(Execution, f"exec-{i}").status for i in range(4)] == ["cancelled", "cancelled", "pending", "completed"]
+        assert db.get(Execution, "exec-0").completed_at is not None
+
+    @pytest.mark.asyncio
+    async def test_filter_selects_only_the_users_active_executions(self, db, service):
+        results = await service.cancel_executions(notebook_path="notebooks/report.ipynb", user_id="user-2")
+
+        assert [result["execution_id"] for result in results] == ["exec-4"]
+        assert db.get(Execution, "exec-0").status == "running"
+
+    @pytest.mark.asyncio
+    async def test_limit_cancels_oldest_first(self, db, service):
+        await service.cancel_executions(status="running", limit=1)
+
+        assert db.get(Execution, "exec-0").status == "cancelled"
+        assert db.get(Execution, "exec-4").status == "running"
+
+    @pytest.mark.asyncio
+    async def test_deletion_reconciled_as_failure_is_overwritten(self, db, service):
+        async def cancel_jobs(job_names):
+            # The job reconciler sees the deleted job before the cancellation commits
+            db.query(Execution).filter(Execution.id == "exec-0").update(
+                {"status": "failed", "error": "The Kubernetes job was deleted before the execution finished"},
+                synchronize_session=False
+            )
+            return {job_name: True for job_name in job_names}
+        service.batch_executor.cancel_jobs = AsyncMock(side_effect=cancel_jobs)
+
+        await service.cancel_executions(execution_ids=["exec-0"])
+
+        db.expire_all()
+        execution = db.get(Execution, "exec-0")
+        assert (execution.status, execution.error) == ("cancelled", None)
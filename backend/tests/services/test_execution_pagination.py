@@ -0,0 +1,65 @@
+import pytest
+from datetime import datetime, timedelta
+from app.models import Execution
+from app.crud.execution import execution as crud_execution, decode_cursor
+
+class TestExecutionPagination:
+    @pytest.fixture
+    def db(self, db):
+        start = datetime(2025, 1, 1)
+        for i in range(25):
+            db.add(Execution(
+                id=f"exec-{i:02d}",
+                notebook_path="notebooks/report.ipynb" if i % 2 else "notebooks/other.ipynb",
+                status="completed" if i % 3 else "failed",
+                user_id="user-1" if i < 20 else "user-2",
+                # Pairs of executions share a timestamp to exercise the id tie-breaker
+                created_at=start + timedelta(minutes=i // 2)
+            ))
+        db.commit()
+        return db
+
+    def test_cursor_walks_whole_history_newest_first(self, db):
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = crud_execution.get_page(db, limit=7, cursor=cursor)
+            seen.extend(execution.id for execution in page)
+            if cursor is None:
+                break
+
+        assert len(seen) == 25
+        assert seen == sorted(seen, key=lambda id: (db.get(Execution, id).created_at, id), reverse=True)
+
+    def test_last_full_page_has_no_cursor(self, db):
+        page, cursor = crud_execution.get_page(db, limit=25)
+
+        assert len(page) == 25
+        assert cursor is None
+
+    def test_filters_are_applied_in_query(self, db):
+        page, cursor = crud_execution.get_page(
+            db,
+            limit=100,
+            status="failed",
+            user_id="user-1",
+            created_after=datetime(2025, 1, 1, 0, 3),
+            created_before=datetime(2025, 1, 1, 0, 9)
+        )
+
+        assert cursor is None
+        assert page
+        for execution in page:
+            assert execution.status == "failed"
+            assert execution.user_id == "user-1"
+            assert datetime(2025, 1, 1, 0, 3) <= execution.created_at < datetime(2025, 1, 1, 0, 9)
+
+    def test_skip_is_still_supported(self, db):
+        first, _ = crud_execution.get_page(db, limit=5)
+        skipped, _ = crud_execution.get_page(db, limit=5, skip=3)
+
+        assert [e.id for e in skipped[:2]] == [e.id for e in first[3:]]
+
+    def test_invalid_cursor_is_rejected(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
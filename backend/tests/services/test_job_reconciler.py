@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import MagicMock
+from kubernetes import client
+from kubernetes.client.exceptions import ApiException
+from app.models import Execution
+from app.services.job_reconciler import JobReconciler, JobReconcilerManager, ResourceVersionExpired, RUNNER_LABEL_SELECTOR
+from app.services.leader_election import LeaseElector
+from tests.services.test_leader_election import FakeCoordinationApi
+
+@pytest.fixture
+def db(db):
+    for i, status in enumerate(["running", "running", "completed"]):
+        db.add(Execution(id=f"exec-{i}", notebook_path="notebooks/report.ipynb", status=status))
+    db.commit()
+    return db
+
+def metadata(execution_id, resource_version):
+    return client.V1ObjectMeta(
+        name=f"notebook-execution-{execution_id}",
+        labels={"app": "nbforge", "component": "notebook-runner", "execution-id": execution_id},
+        resource_version=resource_version
+    )
+
+def job(execution_id, resource_version, condition=None, reason=None):
+    conditions = [client.V1JobCondition(type=condition, status="True", reason=reason)] if condition else None
+    return client.V1Job(metadata=metadata(execution_id, resource_version), status=client.V1JobStatus(conditions=conditions))
+
+def oom_killed_pod(execution_id, resource_version):
+    terminated = client.V1ContainerStateTerminated(exit_code=137, reason="OOMKilled")
+    container = client.V1ContainerStatus(
+        name="notebook-runner", image="runner", image_id="", ready=False, restart_count=0,
+        state=client.V1ContainerState(terminated=terminated)
+    )
+    return client.V1Pod(
+        metadata=metadata(execution_id, resource_version),
+        status=client.V1PodStatus(phase="Failed", container_statuses=[container])
+    )
+
+def listing(items, resource_version):
+    return MagicMock(items=items, metadata=MagicMock(resource_version=resource_version))
+
+class FakeWatch:
+    """Plays back one batch of events per stream() call"""
+
+    def __init__(self, batches):
+        self.batches = batches
+        self.calls = []
+
+    def __call__(self):
+        return self
+
+    def stream(self, func, namespace, **kwargs):
+        self.calls.append(kwargs)
+        batch = self.batches.pop(0)
+        if isinstance(batch, Exception):
+            raise batch
+        yield from batch
+
+    def stop(self):
+        pass
+
+@pytest.fixture
+def apis():
+    batch_v1, core_v1 = MagicMock(), MagicMock()
+    batch_v1.list_namespaced_job.return_value = listing([job("exec-0", "10")], "100")
+    core_v1.list_namespaced_pod.return_value = listing([], "200")
+    return batch_v1, core_v1
+
+def reconciler_for(apis, fake_watch):
+    return JobReconciler(*apis, "default", watch_factory=fake_watch)
+
+class TestJobReconciler:
+    def test_watch_resumes_from_the_last_resource_version(self, apis):
+        fake_watch = FakeWatch([
+            [{"type": "MODIFIED", "object": job("exec-0", "101")}, {"type": "MODIFIED", "object": job("exec-1", "102")}],
+            []
+        ])
+        reconciler = reconciler_for(apis, fake_watch)
+
+        reconciler.list_and_watch("job")
+        reconciler.list_and_watch("job")
+
+        assert [call["resource_version"] for call in fake_watch.calls] == ["100", "102"]
+        assert fake_watch.calls[0]["label_selector"] == RUNNER_LABEL_SELECTOR
+        apis[0].list_namespaced_job.assert_called_once()
+
+    def test_expired_resource_version_lists_again(self, apis):
+        fake_watch = FakeWatch([
+            [{"type": "ERROR", "object": None, "raw_object": {"code": 410, "message": "too old resource version"}}],
+            ApiException(status=410),
+            []
+        ])
+        reconciler = reconciler_for(apis, fake_watch)
+
+        with pytest.raises(ResourceVersionExpired):
+            reconciler.list_and_watch("job")
+        reconciler.resource_versions["job"] = "150"
+        with pytest.raises(ResourceVersionExpired):
+            reconciler.list_and_watch("job")
+
+        reconciler.resource_versions["job"] = None
+        reconciler.list_and_watch("job")
+        assert apis[0].list_namespaced_job.call_count == 2
+        assert fake_watch.calls[-1]["resource_version"] == "100"
+
+    def test_terminal_transitions_fail_active_executions_in_one_batch(self, db, apis):
+        fake_watch = FakeWatch([
+            [
+                {"type": "MODIFIED", "object": job("exec-0", "101", condition="Failed", reason="DeadlineExceeded")},
+                {"type": "MODIFIED", "object": job("exec-2", "102", condition="Failed", reason="BackoffLimitExceeded")},
+            ],
+            [
+                {"type": "MODIFIED", "object": oom_killed_pod("exec-1", "201")},
+                {"type": "DELETED", "object": oom_killed_pod("exec-1", "202")},
+            ],
+        ])
+        reconciler = reconciler_for(apis, fake_watch)
+        reconciler.list_and_watch("job")
+        reconciler.list_and_watch("pod")
+
+        assert reconciler.flush(db) == 2
+        executions = {e.id: e for e in db.query(Execution).all()}
+        assert executions["exec-0"].status == "failed"
+        assert "DeadlineExceeded" in executions["exec-0"].error
+        assert executions["exec-1"].status == "failed"
+        assert "OOMKilled" in executions["exec-1"].error
+        assert executions["exec-1"].completed_at is not None
+        # Executions that already finished are left alone
+        assert executions["exec-2"].status == "completed"
+        assert reconciler.flush(db) == 0
+
+    def test_running_jobs_and_completed_reports_are_not_failures(self, db, apis):
+        apis[0].list_namespaced_job.return_value = listing([], "100")
+        fake_watch = FakeWatch([[
+            {"type": "ADDED", "object": job("exec-0", "101")},
+            {"type": "MODIFIED", "object": job("exec-2", "102", condition="Complete")},
+        ]])
+        reconciler = reconciler_for(apis, fake_watch)
+        reconciler.list_and_watch("job")
+
+        assert reconciler.flush(db) == 0
+        assert db.get(Execution, "exec-0").status == "running"
+
+    @pytest.mark.asyncio
+    async def test_stop_does_not_wait_for_open_watches(self, apis):
+        unblock = threading.Event()
+
+        class BlockingWatch(FakeWatch):
+            def stream(self, func, namespace, **kwargs):
+                # A watch that only ends at its server-side timeout
+                unblock.wait(10)
+                return iter([])
+
+        reconciler = JobReconciler(*apis, "default", session_factory=MagicMock(),
+                                   watch_factory=BlockingWatch([]), flush_interval=0.01)
+        task = asyncio.create_task(reconciler.run())
+        await asyncio.sleep(0.05)
+
+        reconciler.stop()
+        await asyncio.wait_for(task, timeout=1)
+        unblock.set()
+
+class TestJobReconcilerManager:
+    @pytest.mark.asyncio
+    async def test_only_the_lease_holder_reconciles(self):
+        api = FakeCoordinationApi()
+        managers = []
+        for identity in ["pod-a-1", "pod-a-2"]:
+            manager = JobReconcilerManager()
+            manager.elector = LeaseElector(api, "default", "nbforge-job-reconciler", identity)
+            manager.elector.renew_seconds = 0.01
+            reconciler = MagicMock()
+            reconciler.run = lambda: asyncio.sleep(10)
+            manager._create_reconciler = MagicMock(return_value=reconciler)
+            manager.task = asyncio.create_task(manager.lead())
+            managers.append(manager)
+        await asyncio.sleep(0.05)
+
+        assert [manager.reconciler is not None for manager in managers] == [True, False]
+
+        # Stopping the leader hands the lease over
+        await managers[0].stop()
+        await asyncio.sleep(0.05)
+        assert managers[1].reconciler is not None
+        await managers[1].stop()
+        assert api.lease.spec.holder_identity is None
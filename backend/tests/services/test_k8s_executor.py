@@ -1,18 +1,28 @@
-from unittest import TestCase
-from unittest.mock import MagicMock, AsyncMock
+import json
+import base64
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock, patch
+from kubernetes.client.exceptions import ApiException
+from app.services.batch_executors.k8s_executor import K8sExecutor
 
-class TestK8sExecutor(TestCase):
-    def setUp(self):
-        self.executor = K8sExecutor()
+@pytest.fixture
+def executor():
+    executor = K8sExecutor.__new__(K8sExecutor)
+    executor.namespace = "default"
+    executor.core_v1 = MagicMock()
+    executor.batch_v1 = MagicMock()
+    return executor
 
-    async def test_create_job(self):
+class TestK8sExecutor:
+    @pytest.mark.asyncio
+    async def test_create_job(self, executor):
         """Test creating a Kubernetes job"""
         # Mock the Kubernetes client
-        self.executor.batch_v1 = MagicMock()
-        self.executor._create_job_async = AsyncMock()
+        executor._create_job_async = AsyncMock()
         
         # Call the method
-        job_name = await self.executor.create_job(
+        job_name = await executor.create_job(
             notebook_path="test.ipynb",
             parameters={"param1": "value1"},
             python_version="3.12",
@@ -22,12 +32,145 @@ class TestK8sExecutor(TestCase):
         )
         
         # Verify the job was created
-        self.assertEqual(job_name, "test-job")
-        self.executor._create_job_async.assert_called_once()
+        assert job_name == "test-job"
+        executor._create_job_async.assert_called_once()
         
         # Verify the job spec contains the notebook runner image
-        job_spec = self.executor._create_job_async.call_args[0][0]
-        self.assertEqual(
-            job_spec['spec']['template']['spec']['containers'][0]['image'],
-            "nbforge/notebook-runner:latest"
-        ) 
\ No newline at end of file
+        job_spec = executor._create_job_async.call_args[0][0]
+        assert job_spec['spec']['template']['spec']['containers'][0]['image'] == "nbforge/notebook-runner:latest"
+
+class TestInlineNotebook:
+    async def create(self, executor, content):
+        await executor.create_job(
+            notebook_path="notebooks/test.ipynb",
+            parameters={},
+            python_version="3.12",
+            job_name="test-job",
+            notebook_content=content
+        )
+        config_map = executor.core_v1.create_namespaced_config_map.call_args[0][1]
+        job_spec = executor.batch_v1.create_namespaced_job.call_args[0][1]
+        return config_map, job_spec["spec"]["template"]["spec"]
+
+    @pytest.mark.asyncio
+    async def test_small_notebook_is_mounted_from_the_config_map(self, executor):
+        config_map, pod_spec = await self.create(executor, b'{"cells": []}')
+
+        assert base64.b64decode(config_map.binary_data["notebook.ipynb"]) == b'{"cells": []}'
+        assert config_map.data["NOTEBOOK_INLINE_PATH"] == "/nbforge/notebook/notebook.ipynb"
+        assert pod_spec["volumes"][0]["configMap"]["name"] == "nbforge-job-test-job-config"
+        assert pod_spec["containers"][0]["volumeMounts"][0]["mountPath"] == "/nbforge/notebook"
+
+    @pytest.mark.asyncio
+    async def test_large_notebook_is_downloaded_by_the_runner(self, executor):
+        with patch("app.services.batch_executors.k8s_executor.settings.K8S_INLINE_NOTEBOOK_MAX_BYTES", 10):
+            config_map, pod_spec = await self.create(executor, b'{"cells": []}')
+
+        assert config_map.binary_data is None
+        assert "NOTEBOOK_INLINE_PATH" not in config_map.data
+        assert "volumes" not in pod_spec
+        assert config_map.data["NOTEBOOK_PATH"] == "notebooks/test.ipynb"
+
+    @pytest.mark.asyncio
+    async def test_env_cache_host_path_is_mounted_next_to_the_notebook(self, executor):
+        with patch("app.services.batch_executors.k8s_executor.settings.K8S_ENV_CACHE_HOST_PATH", "/var/cache/nbforge/envs"):
+            config_map, pod_spec = await self.create(executor, b'{"cells": []}')
+
+        assert config_map.data["ENV_CACHE_DIR"] == "/nbforge/env-cache"
+        assert [volume["name"] for volume in pod_spec["volumes"]] == ["notebook", "env-cache"]
+        assert pod_spec["volumes"][1]["hostPath"]["path"] == "/var/cache/nbforge/envs"
+        assert pod_spec["containers"][0]["volumeMounts"][1]["mountPath"] == "/nbforge/env-cache"
+
+    @pytest.mark.asyncio
+    async def test_requirements_lock_is_passed_to_the_runner(self, executor):
+        await executor.create_job(
+            notebook_path="notebooks/test.ipynb",
+            parameters={},
+            python_version="3.12",
+            job_name="test-job",
+            requirements={"six": "*"},
+            requirements_lock=["six==1.17.0"]
+        )
+        config_map = executor.core_v1.create_namespaced_config_map.call_args[0][1]
+
+        assert json.loads(config_map.data["REQUIREMENTS_LOCK"]) == ["six==1.17.0"]
+
+    @pytest.mark.asyncio
+    async def test_job_owns_its_config_map_and_secret(self, executor):
+        executor.batch_v1.create_namespaced_job.return_value = SimpleNamespace(
+            metadata=SimpleNamespace(name="notebook-execution-test-job", uid="uid-1")
+        )
+        await self.create(executor, None)
+
+        for patch_call in (executor.core_v1.patch_namespaced_config_map, executor.core_v1.patch_namespaced_secret):
+            owner = patch_call.call_args[0][2]["metadata"]["ownerReferences"][0]
+            assert (owner["kind"], owner["uid"]) == ("Job", "uid-1")
+        assert executor.core_v1.patch_namespaced_secret.call_args[0][0] == "nbforge-job-test-job-secret"
+
+    @pytest.mark.asyncio
+    async def test_failed_secret_removes_the_config_map(self, executor):
+        executor.core_v1.create_namespaced_secret.side_effect = Exception("forbidden")
+
+        with pytest.raises(Exception, match="forbidden"):
+            await self.create(executor, None)
+        executor.batch_v1.create_namespaced_job.assert_not_called()
+        executor.core_v1.delete_namespaced_config_map.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_each_job(self, executor):
+        def create_namespaced_job(namespace, body):
+            # Jobs are created concurrently, so fail one by name rather than by call order
+            if body["metadata"]["name"].endswith("job-1"):
+                raise Exception("quota exceeded")
+            return MagicMock()
+        executor.batch_v1.create_namespaced_job.side_effect = create_namespaced_job
+
+        results = await executor.create_jobs([
+            {"notebook_path": "notebooks/test.ipynb", "parameters": {"i": i}, "python_version": "3.12", "job_name": f"job-{i}"}
+            for i in range(3)
+        ])
+
+        assert results[0] == "job-0" and results[2] == "job-2"
+        assert str(results[1]) == "quota exceeded"
+
+def runner_job(execution_id, succeeded=None):
+    return SimpleNamespace(
+        metadata=SimpleNamespace(labels={"execution-id": execution_id}),
+        status=SimpleNamespace(succeeded=succeeded, failed=None)
+    )
+
+class TestCancelJob:
+    @pytest.mark.asyncio
+    async def test_running_job_is_read_and_deleted_by_name(self, executor):
+        executor.batch_v1.read_namespaced_job.return_value = runner_job("exec-1")
+
+        assert await executor.cancel_job("notebook-execution-exec-1") is True
+        executor.batch_v1.list_namespaced_job.assert_not_called()
+        assert executor.batch_v1.delete_namespaced_job.call_args[0][0] == "notebook-execution-exec-1"
+        selector = executor.core_v1.delete_collection_namespaced_secret.call_args[1]["label_selector"]
+        assert selector == "app=nbforge,job-name in (exec-1)"
+
+    @pytest.mark.asyncio
+    async def test_missing_job_is_not_cancelled(self, executor):
+        executor.batch_v1.read_namespaced_job.side_effect = ApiException(status=404)
+
+        assert await executor.cancel_job("exec-1") is False
+        executor.batch_v1.delete_namespaced_job.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_bulk_cancel_deletes_active_jobs_by_label(self, executor):
+        executor.batch_v1.list_namespaced_job.return_value = SimpleNamespace(
+            items=[runner_job("exec-1"), runner_job("exec-2", succeeded=1)]
+        )
+
+        results = await executor.cancel_jobs(["notebook-execution-exec-1", "notebook-execution-exec-2", "notebook-execution-exec-3"])
+
+        assert results == {
+            "notebook-execution-exec-1": True,
+            "notebook-execution-exec-2": False,
+            "notebook-execution-exec-3": False,
+        }
+        assert executor.batch_v1.list_namespaced_job.call_args[1]["label_selector"].endswith("execution-id in (exec-1,exec-2,exec-3)")
+        assert executor.batch_v1.delete_collection_namespaced_job.call_args[1]["label_selector"].endswith("execution-id in (exec-1)")
+        executor.batch_v1.delete_namespaced_job.assert_not_called()
+        executor.core_v1.delete_collection_namespaced_config_map.assert_called_once()
@@ -0,0 +1,82 @@
+import copy
+from datetime import datetime, timedelta, timezone
+from kubernetes.client.exceptions import ApiException
+from app.services.leader_election import LeaseElector
+
+class FakeCoordinationApi:
+    """Stores one lease and rejects updates from a stale resourceVersion like the API server"""
+
+    def __init__(self):
+        self.lease = None
+        self.version = 0
+
+    def read_namespaced_lease(self, name, namespace):
+        if self.lease is None:
+            raise ApiException(status=404)
+        return copy.deepcopy(self.lease)
+
+    def create_namespaced_lease(self, namespace, body):
+        if self.lease is not None:
+            raise ApiException(status=409)
+        self._store(body)
+
+    def replace_namespaced_lease(self, name, namespace, body):
+        if body.metadata.resource_version != self.lease.metadata.resource_version:
+            raise ApiException(status=409)
+        self._store(body)
+
+    def _store(self, body):
+        self.version += 1
+        body.metadata.resource_version = str(self.version)
+        self.lease = copy.deepcopy(body)
+
+def elector(api, identity):
+    return LeaseElector(api, "default", "nbforge-job-reconciler", identity, lease_seconds=15)
+
+class TestLeaseElector:
+    def test_only_one_process_leads(self):
+        api = FakeCoordinationApi()
+        first, second = elector(api, "pod-a-1"), elector(api, "pod-b-1")
+
+        assert first.try_acquire_or_renew()
+        assert not second.try_acquire_or_renew()
+        assert first.try_acquire_or_renew()
+        assert api.lease.spec.holder_identity == "pod-a-1"
+
+    def test_expired_lease_is_taken_over(self):
+        api = FakeCoordinationApi()
+        first, second = elector(api, "pod-a-1"), elector(api, "pod-b-1")
+        first.try_acquire_or_renew()
+        # The leader died and stopped renewing
+        api.lease.spec.renew_time = datetime.now(timezone.utc) - timedelta(seconds=30)
+
+        assert second.try_acquire_or_renew()
+        assert not first.try_acquire_or_renew()
+        assert api.lease.spec.lease_transitions == 1
+
+    def test_concurrent_takeover_has_one_winner(self):
+        api = FakeCoordinationApi()
+        elector(api, "pod-a-1").try_acquire_or_renew()
+        api.lease.spec.renew_time = datetime.now(timezone.utc) - timedelta(seconds=30)
+        racing = elector(api, "pod-b-1")
+        stale_read = api.read_namespaced_lease
+
+        def read_then_lose_race(name, namespace):
+            lease = stale_read(name, namespace)
+            api.read_namespaced_lease = stale_read
+            assert elector(api, "pod-c-1").try_acquire_or_renew()
+            return lease
+        api.read_namespaced_lease = read_then_lose_race
+
+        assert not racing.try_acquire_or_renew()
+        assert api.lease.spec.holder_identity == "pod-c-1"
+
+    def test_released_lease_is_taken_at_once(self):
+        api = FakeCoordinationApi()
+        first, second = elector(api, "pod-a-1"), elector(api, "pod-b-1")
+        first.try_acquire_or_renew()
+
+        second.release()
+        assert api.lease.spec.holder_identity == "pod-a-1"
+        first.release()
+        assert second.try_acquire_or_renew()
@@ -0,0 +1,132 @@
+import io
+import os
+import pytest
+from unittest.mock import patch
+from app.services.storage.interface import STREAM_CHUNK_SIZE, RangeNotSatisfiableError
+from app.services.storage.local_storage import LocalFSStorage
+from app.services.storage.memory_storage import InMemoryStorage
+
+async def collect(stream):
+    return b"".join([chunk async for chunk in stream.body])
+
+@pytest.fixture(params=["local", "memory"])
+def storage(request, tmp_path):
+    if request.param == "local":
+        return LocalFSStorage(str(tmp_path / "storage"))
+    return InMemoryStorage()
+
+class TestStorageBackends:
+    @pytest.mark.asyncio
+    async def test_write_read_and_delete(self, storage):
+        await storage.write_notebook("notebooks/a.ipynb", io.BytesIO(b'{"cells": []}'))
+
+        content, etag = await storage.download_notebook_with_etag("notebooks/a.ipynb")
+        assert content == b'{"cells": []}'
+        assert etag and etag.startswith('"')
+        assert (await storage.read_notebook("notebooks/a.ipynb")).read() == content
+        assert await storage.check_exists("notebooks/a.ipynb")
+
+        await storage.delete_notebook("notebooks/a.ipynb")
+        await storage.delete_notebook("notebooks/a.ipynb")
+        assert not await storage.check_exists("notebooks/a.ipynb")
+        with pytest.raises(FileNotFoundError):
+            await storage.download_notebook("notebooks/a.ipynb")
+
+    @pytest.mark.asyncio
+    async def test_listing_is_sorted_and_filtered(self, storage):
+        for path in ["notebooks/b.ipynb", "notebooks/sub/c.ipynb", "notebooks/a.ipynb", "notebooks/readme.md", "other/d.ipynb"]:
+            await storage.write_notebook(path, io.BytesIO(b"{}"))
+
+        notebooks = await storage.list_notebooks("notebooks/")
+        assert [n["path"] for n in notebooks] == ["notebooks/a.ipynb", "notebooks/b.ipynb", "notebooks/sub/c.ipynb"]
+        assert notebooks[0]["size"] == 2
+        assert notebooks[0]["etag"] == (await storage.stat_notebook("notebooks/a.ipynb"))["etag"]
+        assert await storage.stat_notebook("notebooks/missing.ipynb") is None
+
+        page, token = await storage.list_notebooks_page("notebooks/", page_size=2)
+        assert len(page) == 2 and token
+
+    @pytest.mark.asyncio
+    async def test_etag_changes_with_content(self, storage):
+        await storage.write_notebook("nb.ipynb", io.BytesIO(b"one"))
+        _, first = await storage.download_notebook_with_etag("nb.ipynb")
+        await storage.write_notebook("nb.ipynb", io.BytesIO(b"three"))
+        _, second = await storage.download_notebook_with_etag("nb.ipynb")
+        assert first != second
+
+    @pytest.mark.asyncio
+    async def test_open_object_streams_ranges_and_answers_conditional_requests(self, storage):
+        content = bytes(range(256)) * (STREAM_CHUNK_SIZE // 128)
+        await storage.write_notebook("out/report.html", io.BytesIO(content))
+
+        stream = await storage.open_object("out/report.html")
+        assert await collect(stream) == content
+        assert stream.content_length == len(content)
+        assert stream.last_modified is not None
+
+        partial = await storage.open_object("out/report.html", byte_range="bytes=10-19")
+        assert await collect(partial) == content[10:20]
+        assert partial.content_range == f"bytes 10-19/{len(content)}"
+
+        not_modified = await storage.open_object("out/report.html", if_none_match=stream.etag)
+        assert not_modified.not_modified and not_modified.body is None
+
+        with pytest.raises(RangeNotSatisfiableError):
+            await storage.open_object("out/report.html", byte_range=f"bytes={len(content)}-")
+        with pytest.raises(FileNotFoundError):
+            await storage.open_object("out/missing.html")
+
+    @pytest.mark.asyncio
+    async def test_presigned_urls_are_not_supported(self, storage):
+        with pytest.raises(NotImplementedError):
+            await storage.get_presigned_url("nb.ipynb")
+
+class TestLocalFSStorage:
+    @pytest.mark.asyncio
+    async def test_paths_cannot_escape_the_root(self, tmp_path):
+        storage = LocalFSStorage(str(tmp_path / "storage"))
+        (tmp_path / "secret.ipynb").write_bytes(b"{}")
+
+        with pytest.raises(ValueError):
+            await storage.download_notebook("../secret.ipynb")
+        with pytest.raises(ValueError):
+            await storage.list_notebooks("../")
+
+    @pytest.mark.asyncio
+    async def test_failed_write_keeps_previous_version(self, tmp_path):
+        storage = LocalFSStorage(str(tmp_path))
+        await storage.write_notebook("nb.ipynb", io.BytesIO(b"old"))
+
+        with patch("app.services.storage.local_storage.os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                await storage.write_notebook("nb.ipynb", io.BytesIO(b"new"))
+
+        assert await storage.download_notebook("nb.ipynb") == b"old"
+        assert os.listdir(tmp_path) == ["nb.ipynb"]
+
+    @pytest.mark.asyncio
+    async def test_empty_file(self, tmp_path):
+        storage = LocalFSStorage(str(tmp_path))
+        await storage.write_notebook("empty.ipynb", io.BytesIO(b""))
+
+        assert await storage.download_notebook("empty.ipynb") == b""
+        stream = await storage.open_object("empty.ipynb")
+        assert await collect(stream) == b"" and stream.content_length == 0
+
+class TestInMemoryStorage:
+    @pytest.mark.asyncio
+    async def test_put_object_keeps_content_metadata(self):
+        storage = InMemoryStorage()
+        storage.put_object("out/report.html", b"\x1f\x8b", content_type="text/html", content_encoding="gzip")
+
+        stream = await storage.open_object("out/report.html")
+        assert stream.content_type == "text/html"
+        assert stream.content_encoding == "gzip"
+
+    def test_shared_storages_see_the_same_objects(self):
+        InMemoryStorage.shared().put_object("shared.ipynb", b"{}")
+        try:
+            assert "shared.ipynb" in InMemoryStorage.shared().objects
+            assert "shared.ipynb" not in InMemoryStorage().objects
+        finally:
+            InMemoryStorage.shared().objects.pop("shared.ipynb")
@@ -0,0 +1,54 @@
+from unittest.mock import MagicMock
+from app import crud
+from app.services.notebook_hash_cache import NotebookHashCache
+
+METADATA = {"identity": {"name": "Report"}, "parameters": [], "requirements": {}, "resources": {}}
+
+class TestNotebookHashCache:
+    def test_hash_is_computed_once_per_etag(self):
+        cache = NotebookHashCache()
+        compute = MagicMock(return_value="hash-1")
+
+        assert cache.get_or_compute("n/a.ipynb", '"v1"', compute) == "hash-1"
+        assert cache.get_or_compute("n/a.ipynb", '"v1"', compute) == "hash-1"
+        assert compute.call_count == 1
+
+        compute.return_value = "hash-2"
+        assert cache.get_or_compute("n/a.ipynb", '"v2"', compute) == "hash-2"
+        assert compute.call_count == 2
+
+    def test_notebooks_without_etag_are_not_cached(self):
+        cache = NotebookHashCache()
+        compute = MagicMock(return_value="hash")
+
+        cache.get_or_compute("n/a.ipynb", None, compute)
+        cache.get_or_compute("n/a.ipynb", None, compute)
+
+        assert compute.call_count == 2
+
+    def test_least_recently_used_hash_is_evicted(self):
+        cache = NotebookHashCache(maxsize=2)
+        cache.set("a", "e", "hash-a")
+        cache.set("b", "e", "hash-b")
+        cache.get("a", "e")
+        cache.set("c", "e", "hash-c")
+
+        assert cache.get("a", "e") == "hash-a"
+        assert cache.get("b", "e") is None
+
+    def test_database_tier_is_shared_between_processes(self, db):
+        crud.notebook_template.upsert(db, path="n/a.ipynb", etag='"v1"', metadata=METADATA)
+        NotebookHashCache().set("n/a.ipynb", '"v1"', "hash-1", db=db)
+
+        # A fresh in-process tier, as in another worker, finds the stored hash
+        compute = MagicMock()
+        assert NotebookHashCache().get_or_compute("n/a.ipynb", '"v1"', compute, db=db) == "hash-1"
+        compute.assert_not_called()
+
+    def test_database_hash_is_dropped_when_template_changes(self, db):
+        crud.notebook_template.upsert(db, path="n/a.ipynb", etag='"v1"', metadata=METADATA)
+        crud.notebook_template.set_notebook_hash(db, path="n/a.ipynb", etag='"v1"', notebook_hash="hash-1")
+        crud.notebook_template.upsert(db, path="n/a.ipynb", etag='"v2"', metadata=METADATA)
+
+        assert crud.notebook_template.get_notebook_hash(db, path="n/a.ipynb", etag='"v2"') is None
+        assert NotebookHashCache().get("n/a.ipynb", '"v1"', db=db) is None
@@ -0,0 +1,109 @@
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock
+from app.models.notebook_template import NotebookTemplate
+from app.services.notebook_index import NotebookIndex
+from app.services.storage.interface import BaseStorageService
+from app.services.storage.disk_cache import DiskCache, DiskCachedStorage
+from app.services.storage.memory_storage import InMemoryStorage
+
+def make_notebook(name):
+    return json.dumps({
+        "nbformat": 4,
+        "nbformat_minor": 5,
+        "metadata": {"notebook_spec": {"name": name, "tags": ["demo"]}},
+        "cells": [{
+            "cell_type": "code",
+            "id": "params",
+            "metadata": {"tags": ["parameters"]},
+            "source": "days: int = 7",
+            "outputs": [],
+            "execution_count": None
+        }]
+    }).encode("utf-8")
+
+def listing(path, etag):
+    return {"path": path, "etag": etag, "size": 100, "last_modified": datetime(2025, 1, 1)}
+
+class FakeStorage(BaseStorageService):
+    def __init__(self):
+        self.etags = {}
+        self.download_notebook = AsyncMock(side_effect=lambda path: make_notebook(path.split("/")[-1]))
+
+    async def download_notebook_with_etag(self, path):
+        return await self.download_notebook(path), self.etags.get(path)
+
+    async def list_notebooks(self, prefix=""):
+        return []
+
+    async def read_notebook(self, path):
+        raise NotImplementedError
+
+    async def write_notebook(self, path, content):
+        raise NotImplementedError
+
+    async def delete_notebook(self, path):
+        raise NotImplementedError
+
+    async def get_presigned_url(self, path, expires_in=3600):
+        raise NotImplementedError
+
+class TestNotebookIndex:
+    @pytest.fixture
+    def storage(self):
+        return FakeStorage()
+
+    @pytest.mark.asyncio
+    async def test_indexes_unknown_notebooks_once(self, db, storage):
+        notebooks = [listing("notebooks/a.ipynb", '"a1"'), listing("notebooks/b.ipynb", '"b1"')]
+        storage.etags = {"notebooks/a.ipynb": '"a1"', "notebooks/b.ipynb": '"b1"'}
+
+        first = await NotebookIndex(db, storage).get_metadata(notebooks)
+        second = await NotebookIndex(db, storage).get_metadata(notebooks)
+
+        assert storage.download_notebook.await_count == 2
+        assert first == second
+        assert second["notebooks/a.ipynb"]["identity"]["name"] == "a.ipynb"
+        assert second["notebooks/a.ipynb"]["parameters"][0]["name"] == "days"
+
+    @pytest.mark.asyncio
+    async def test_reindexes_when_etag_changes(self, db, storage):
+        index = NotebookIndex(db, storage)
+        storage.etags["notebooks/a.ipynb"] = '"a1"'
+        await index.get_metadata([listing("notebooks/a.ipynb", '"a1"')])
+        storage.etags["notebooks/a.ipynb"] = '"a2"'
+        await index.get_metadata([listing("notebooks/a.ipynb", '"a2"')])
+
+        assert storage.download_notebook.await_count == 2
+        assert db.query(NotebookTemplate).get("notebooks/a.ipynb").etag == '"a2"'
+
+    @pytest.mark.asyncio
+    async def test_recorded_metadata_is_served_without_download(self, db, storage):
+        index = NotebookIndex(db, storage)
+        index.record(listing("notebooks/a.ipynb", '"a1"'), {"identity": {"name": "Uploaded"}})
+
+        metadata = await index.get_notebook_metadata(listing("notebooks/a.ipynb", '"a1"'))
+
+        storage.download_notebook.assert_not_awaited()
+        assert metadata["identity"]["name"] == "Uploaded"
+
+    @pytest.mark.asyncio
+    async def test_cached_copy_of_an_overwritten_template_is_not_indexed(self, db, tmp_path):
+        origin = InMemoryStorage()
+        origin.put_object("notebooks/a.ipynb", make_notebook("Old"))
+        storage = DiskCachedStorage(origin, DiskCache(str(tmp_path)), fresh_seconds=30)
+        index = NotebookIndex(db, storage)
+        await index.get_metadata(await storage.list_notebooks())
+
+        # Overwritten behind the cache, which still serves the old version
+        new_etag = origin.put_object("notebooks/a.ipynb", make_notebook("New"))
+        await index.get_metadata(await storage.list_notebooks())
+        assert db.get(NotebookTemplate, "notebooks/a.ipynb").etag != new_etag
+
+        storage.cache.remove("/notebooks/a.ipynb")
+        metadata = await index.get_metadata(await storage.list_notebooks())
+        assert metadata["notebooks/a.ipynb"]["identity"]["name"] == "New"
+        template = db.get(NotebookTemplate, "notebooks/a.ipynb")
+        assert template.etag == new_etag
+        assert template.to_metadata()["identity"]["name"] == "New"
@@ -0,0 +1,135 @@
+import gzip
+import pytest
+from unittest.mock import AsyncMock
+from fastapi.responses import RedirectResponse, StreamingResponse
+from app.api.v1.static import deliver_object, parse_storage_path
+from app.services.storage.interface import ObjectStream
+from app.utils.compression import accepts_encoding
+from app.core.config import get_settings
+from tests.services.test_notebook_index import FakeStorage
+
+settings = get_settings()
+
+BROWSER = "gzip, deflate, br, zstd"
+
+@pytest.fixture
+def storage():
+    storage = FakeStorage()
+    storage.download_notebook_with_etag = AsyncMock(return_value=(b"<html></html>", '"e1"'))
+    storage.get_presigned_url = AsyncMock(return_value="https://storage.example.com/out/report.html?X-Amz-Signature=abc")
+    return storage
+
+class TestOutputDelivery:
+    @pytest.mark.asyncio
+    async def test_redirect_mode_sends_client_to_presigned_url(self, storage):
+        response = await deliver_object(storage, "out/report.html", accept_encoding=BROWSER, mode="redirect")
+
+        assert isinstance(response, RedirectResponse)
+        assert response.status_code == 307
+        assert response.headers["location"].startswith("https://storage.example.com/")
+        assert "no-store" in response.headers["cache-control"]
+        storage.get_presigned_url.assert_awaited_once_with(
+            "out/report.html", expires_in=settings.OUTPUT_PRESIGNED_URL_EXPIRES_SECONDS
+        )
+        storage.download_notebook_with_etag.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_redirect_mode_falls_back_to_streaming(self, storage):
+        storage.get_presigned_url.side_effect = Exception("no credentials")
+
+        response = await deliver_object(storage, "out/report.html", accept_encoding=BROWSER, mode="redirect")
+
+        assert isinstance(response, StreamingResponse)
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_clients_without_gzip_are_not_redirected(self, storage):
+        response = await deliver_object(storage, "out/report.html", accept_encoding="identity", mode="redirect")
+
+        assert isinstance(response, StreamingResponse)
+        storage.get_presigned_url.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_proxy_mode_streams_object(self, storage):
+        response = await deliver_object(storage, "out/report.html", mode="proxy")
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        assert body == b"<html></html>"
+        assert response.headers["content-length"] == "13"
+        assert response.headers["etag"] == '"e1"'
+        storage.get_presigned_url.assert_not_called()
+
+    def test_parse_storage_path(self):
+        assert parse_storage_path(f"s3://{settings.S3_BUCKET}/outputs/1/report.html") == "outputs/1/report.html"
+        assert parse_storage_path("outputs/1/report.html") == "outputs/1/report.html"
+        with pytest.raises(ValueError):
+            parse_storage_path("s3://other-bucket/outputs/1/report.html")
+
+class TestCompressedOutputs:
+    HTML = b"<html>" + b"<p>report</p>" * 2000 + b"</html>"
+
+    @pytest.fixture
+    def storage(self):
+        compressed = gzip.compress(self.HTML)
+        storage = FakeStorage()
+
+        async def open_object(path, byte_range=None, if_none_match=None):
+            content = compressed[:100] if byte_range else compressed
+
+            async def body():
+                for offset in range(0, len(content), 1000):
+                    yield content[offset:offset + 1000]
+
+            return ObjectStream(
+                body=body(),
+                content_length=len(content),
+                etag='"e1"',
+                content_range=f"bytes 0-99/{len(compressed)}" if byte_range else None,
+                content_encoding="gzip"
+            )
+
+        storage.open_object = AsyncMock(side_effect=open_object)
+        storage.compressed = compressed
+        return storage
+
+    @pytest.mark.asyncio
+    async def test_compressed_bytes_pass_through(self, storage):
+        response = await deliver_object(storage, "out/report.html", accept_encoding="gzip, deflate", mode="proxy")
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        assert body == storage.compressed
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-length"] == str(len(storage.compressed))
+        assert response.headers["etag"] == '"e1"'
+        assert response.headers["vary"] == "Accept-Encoding"
+
+    @pytest.mark.asyncio
+    async def test_decompressed_for_clients_without_gzip(self, storage):
+        response = await deliver_object(storage, "out/report.html", accept_encoding="gzip;q=0", mode="proxy")
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        assert body == self.HTML
+        assert "content-encoding" not in response.headers
+        assert "content-length" not in response.headers
+        assert response.headers["etag"] == 'W/"e1"'
+
+    @pytest.mark.asyncio
+    async def test_range_is_dropped_when_decompressing(self, storage):
+        response = await deliver_object(storage, "out/report.html", range_header="bytes=0-99", mode="proxy")
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        assert response.status_code == 200
+        assert body == self.HTML
+        assert storage.open_object.call_count == 2
+
+    @pytest.mark.parametrize("header,encoding,expected", [
+        ("gzip, deflate, br", "gzip", True),
+        ("GZIP;q=0.5", "gzip", True),
+        ("gzip;q=0", "gzip", False),
+        ("*", "zstd", True),
+        ("br", "gzip", False),
+        (None, "gzip", False),
+        (None, None, True),
+    ])
+    def test_accepts_encoding(self, header, encoding, expected):
+        assert accepts_encoding(header, encoding) is expected
@@ -0,0 +1,75 @@
+import json
+import pytest
+from unittest.mock import patch
+import nbformat
+from nbformat.v3 import new_notebook as new_notebook_v3, new_worksheet, new_code_cell as new_code_cell_v3
+from app.services.notebook_metadata import NotebookMetadataExtractor
+from app.services.prepared_notebook import PreparedNotebook
+from app.utils.hash_utils import get_notebook_hash
+
+def make_notebook():
+    return json.dumps({
+        "nbformat": 4,
+        "nbformat_minor": 5,
+        "metadata": {"notebook_spec": {"name": "Sales report", "tags": ["sales"]}},
+        "cells": [
+            {
+                "cell_type": "code",
+                "id": "params",
+                "metadata": {"tags": ["parameters"]},
+                "source": "days: int = 7\nratio: float = 0.5",
+                "outputs": [],
+                "execution_count": None
+            },
+            {
+                "cell_type": "code",
+                "id": "body",
+                "metadata": {},
+                "source": "print(days)",
+                "outputs": [{"output_type": "stream", "name": "stdout", "text": "7\n"}],
+                "execution_count": 3
+            }
+        ]
+    }).encode("utf-8")
+
+class TestPreparedNotebook:
+    def test_hash_matches_get_notebook_hash(self):
+        content = make_notebook()
+        notebook = PreparedNotebook("n/report.ipynb", content)
+
+        assert notebook.notebook_hash == get_notebook_hash(content)
+
+    def test_hash_of_v3_notebook_does_not_upgrade_it(self):
+        v3 = new_notebook_v3(worksheets=[new_worksheet(cells=[new_code_cell_v3(input="x = 1", prompt_number=1)])])
+        content = nbformat.writes(v3, version=3).encode("utf-8")
+        notebook = PreparedNotebook("n/legacy.ipynb", content)
+
+        assert len(notebook.notebook_hash) == 64
+        assert notebook.notebook["nbformat"] == 3
+
+    def test_hash_leaves_outputs_in_place(self):
+        notebook = PreparedNotebook("n/report.ipynb", make_notebook())
+        notebook.notebook_hash
+
+        assert notebook.notebook.cells[1].outputs
+        assert notebook.notebook.cells[1].execution_count == 3
+
+    def test_metadata_matches_extractor(self):
+        content = make_notebook()
+        notebook = PreparedNotebook("n/report.ipynb", content)
+
+        assert notebook.metadata == NotebookMetadataExtractor(content).extract_metadata()
+        assert notebook.identity["name"] == "Sales report"
+        assert notebook.parameter_types == {"days": "int", "ratio": "float"}
+
+    def test_notebook_is_parsed_once(self):
+        content = make_notebook()
+        with patch("app.services.notebook_metadata.nbformat.reads", wraps=nbformat.reads) as reads:
+            notebook = PreparedNotebook("n/report.ipynb", content)
+            notebook.metadata, notebook.parameter_types, notebook.notebook_hash
+
+        assert reads.call_count == 1
+
+    def test_unsupported_version_is_rejected(self):
+        with pytest.raises(ValueError):
+            PreparedNotebook("n/old.ipynb", json.dumps({"nbformat": 2, "metadata": {}, "worksheets": []}).encode("utf-8"))
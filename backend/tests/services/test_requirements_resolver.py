@@ -0,0 +1,80 @@
+import json
+import sys
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.requirements_resolver import (
+    RequirementsResolver,
+    RequirementsResolutionError,
+    platform_tags,
+    requirement_lines,
+)
+
+def pip_report(*packages):
+    return json.dumps({
+        "version": "1",
+        "install": [{"metadata": {"name": name, "version": version}, "requested": True} for name, version in packages]
+    }).encode()
+
+def fake_pip(script):
+    """Run a Python script instead of pip, so resolution needs no package index"""
+    return lambda self, requirements_path, target_dir, python_version: [sys.executable, "-c", script]
+
+class TestRequirementLines:
+    def test_versions_specifiers_and_wildcards(self):
+        lines = requirement_lines({"Pandas": ">=1.3.0", "scikit_learn": "1.0", "six": "*"})
+        assert lines == ["pandas>=1.3.0", "scikit-learn==1.0", "six"]
+
+    def test_manylinux_platform_is_expanded_to_older_glibc_tags(self):
+        tags = platform_tags("manylinux_2_35_x86_64")
+        assert tags[0] == "manylinux_2_35_x86_64"
+        assert "manylinux_2_17_x86_64" in tags and tags[-1] == "manylinux2014_x86_64"
+        assert platform_tags("macosx_11_0_arm64") == ["macosx_11_0_arm64"]
+
+class TestRequirementsResolver:
+    @pytest.mark.asyncio
+    async def test_pip_report_becomes_a_lock(self):
+        resolver = RequirementsResolver()
+        report = pip_report(("python_dateutil", "2.9.0"), ("six", "1.17.0")).decode()
+        with patch.object(RequirementsResolver, "_pip_command", fake_pip(f"print({report!r})")):
+            lock = await resolver.resolve({"python-dateutil": ">=2.8"}, "3.12")
+
+        assert lock.requirements == ("python-dateutil==2.9.0", "six==1.17.0")
+        assert len(lock.hash) == 64
+        assert await resolver.resolve({}, "3.12") is None
+
+    @pytest.mark.asyncio
+    async def test_unresolvable_requirements_fail_with_pip_output(self):
+        resolver = RequirementsResolver()
+        script = "import sys; sys.stderr.write('ERROR: No matching distribution found for six==99.0'); sys.exit(1)"
+        with patch.object(RequirementsResolver, "_pip_command", fake_pip(script)):
+            with pytest.raises(RequirementsResolutionError, match="No matching distribution"):
+                await resolver.resolve({"six": "99.0"}, "3.12")
+
+    @pytest.mark.asyncio
+    async def test_locks_are_reused_per_requirements_and_python_version(self):
+        resolver = RequirementsResolver()
+        resolver._resolve = AsyncMock(return_value=["six==1.17.0"])
+
+        first = await resolver.resolve({"six": "*"}, "3.12")
+        assert await resolver.resolve({"Six": "*"}, "3.12") == first
+        await resolver.resolve({"six": "*"}, "3.10")
+        assert resolver._resolve.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_locks_are_resolved_again(self):
+        resolver = RequirementsResolver(ttl_seconds=5)
+        resolver._resolve = AsyncMock(return_value=["six==1.17.0"])
+
+        with patch("app.services.requirements_resolver.time.monotonic", side_effect=[0, 10, 10]):
+            await resolver.resolve({"six": "*"}, "3.12")
+            await resolver.resolve({"six": "*"}, "3.12")
+        assert resolver._resolve.await_count == 2
+
+    def test_offline_resolution_uses_only_the_wheelhouse(self):
+        with patch.multiple("app.services.requirements_resolver.settings",
+                            REQUIREMENTS_INDEX_URL=None, REQUIREMENTS_FIND_LINKS="/wheelhouse"):
+            cmd = RequirementsResolver()._pip_command("requirements.txt", "target", "3.12")
+
+        assert "--no-index" in cmd
+        assert cmd[cmd.index("--find-links") + 1] == "/wheelhouse"
+        assert cmd[cmd.index("--python-version") + 1] == "3.12"
@@ -0,0 +1,243 @@
+import asyncio
+import io
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.storage.cache import LRUCache, SingleFlight, get_notebook_cache
+from app.services.storage.s3_storage import S3Storage
+
+class TestLRUCache:
+    def test_evicts_least_recently_used_by_bytes(self):
+        cache = LRUCache(maxbytes=10, ttl=60)
+        cache.set("a", b"1234")
+        cache.set("b", b"1234")
+
+        # Touch "a" so that "b" becomes the least recently used entry
+        assert cache.get("a") == (b"1234", None)
+        cache.set("c", b"1234")
+
+        assert cache.get("b") == (None, None)
+        assert cache.get("a")[0] == b"1234"
+        assert cache.get("c")[0] == b"1234"
+        assert cache.stats()["bytes"] == 8
+        assert cache.stats()["evictions"] == 1
+
+    def test_values_larger_than_budget_are_not_cached(self):
+        cache = LRUCache(maxbytes=4, ttl=60)
+        cache.set("big", b"12345")
+
+        assert cache.get("big") == (None, None)
+        assert cache.stats()["bytes"] == 0
+
+    def test_counts_hits_and_misses(self):
+        cache = LRUCache(maxbytes=100, ttl=60)
+        cache.set("a", b"abc", etag='"e1"')
+
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["bytes"] == 3
+
+    def test_stores_immutable_bytes(self):
+        cache = LRUCache(maxbytes=100, ttl=60)
+        cache.set("a", bytearray(b"abc"))
+
+        value, _ = cache.get("a")
+        assert isinstance(value, bytes)
+
+    def test_invalidate_releases_bytes(self):
+        cache = LRUCache(maxbytes=100, ttl=60)
+        cache.set("a", b"abc")
+        cache.invalidate("a")
+
+        assert cache.get("a") == (None, None)
+        assert cache.stats()["bytes"] == 0
+
+    def test_value_fetched_before_invalidate_is_not_stored(self):
+        cache = LRUCache(maxbytes=100, ttl=60)
+        generation = cache.generation("a")
+        cache.invalidate("a")
+        cache.set("a", b"old", generation=generation)
+
+        assert cache.get("a") == (None, None)
+        cache.set("a", b"new", generation=cache.generation("a"))
+        assert cache.get("a")[0] == b"new"
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_invocation(self):
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return b"content"
+
+        flight = SingleFlight()
+        waiters = [asyncio.ensure_future(flight.do("key", fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*waiters) == [b"content"] * 5
+        assert calls == 1
+        assert flight.coalesced == 4
+
+    @pytest.mark.asyncio
+    async def test_failed_call_is_not_remembered(self):
+        attempts = 0
+
+        async def fetch():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise RuntimeError("boom")
+            return b"content"
+
+        flight = SingleFlight()
+        with pytest.raises(RuntimeError):
+            await flight.do("key", fetch)
+
+        assert await flight.do("key", fetch) == b"content"
+
+class TestSharedNotebookCache:
+    def test_storage_instances_share_the_process_cache(self):
+        with patch('app.services.storage.s3_storage.get_s3_client', return_value=MagicMock()):
+            first = S3Storage(bucket="nbforge")
+            second = S3Storage(bucket="nbforge")
+
+        assert first.cache is second.cache
+        assert first.cache is get_notebook_cache()
+
+    @pytest.mark.asyncio
+    async def test_cached_read_survives_new_storage_instance(self):
+        s3 = MagicMock()
+        body = MagicMock()
+        body.read.return_value = b'{"cells": []}'
+        s3.get_object.return_value = {"Body": body, "ETag": '"e1"'}
+        s3.head_object.return_value = {"ETag": '"e1"'}
+        cache = LRUCache(maxbytes=1024, ttl=60)
+
+        with patch('app.services.storage.s3_storage.get_s3_client', return_value=s3):
+            await S3Storage(bucket="nbforge", cache=cache).read_notebook("notebooks/a.ipynb")
+            content = await S3Storage(bucket="nbforge", cache=cache).read_notebook("notebooks/a.ipynb")
+
+        assert content.read() == b'{"cells": []}'
+        assert s3.get_object.call_count == 1
+        assert cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_issue_one_get(self):
+        s3 = MagicMock()
+        started = threading.Event()
+        release = threading.Event()
+
+        def get_object(**kwargs):
+            started.set()
+            release.wait(5)
+            body = MagicMock()
+            body.read.return_value = b'{"cells": []}'
+            return {"Body": body, "ETag": '"e1"'}
+
+        s3.get_object.side_effect = get_object
+        cache = LRUCache(maxbytes=1024, ttl=60)
+
+        with patch('app.services.storage.s3_storage.get_s3_client', return_value=s3):
+            storage = S3Storage(bucket="nbforge", cache=cache, inflight=SingleFlight())
+            reads = [asyncio.ensure_future(storage.download_notebook("notebooks/a.ipynb")) for _ in range(10)]
+            await asyncio.to_thread(started.wait, 5)
+            release.set()
+            results = await asyncio.gather(*reads)
+
+        assert results == [b'{"cells": []}'] * 10
+        assert s3.get_object.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_write_during_fetch_is_not_overwritten_by_the_old_content(self):
+        s3 = MagicMock()
+        started = threading.Event()
+        release = threading.Event()
+        versions = iter([(b"old", '"e1"', True), (b"new", '"e2"', False)])
+
+        def get_object(**kwargs):
+            content, etag, blocks = next(versions)
+            if blocks:
+                started.set()
+                release.wait(5)
+            body = MagicMock()
+            body.read.return_value = content
+            return {"Body": body, "ETag": etag}
+
+        s3.get_object.side_effect = get_object
+        cache = LRUCache(maxbytes=1024, ttl=60)
+
+        with patch('app.services.storage.s3_storage.get_s3_client', return_value=s3):
+            storage = S3Storage(bucket="nbforge", cache=cache, inflight=SingleFlight(), fresh_seconds=60)
+            stale_read = asyncio.ensure_future(storage.download_notebook("notebooks/a.ipynb"))
+            await asyncio.to_thread(started.wait, 5)
+            await storage.write_notebook("notebooks/a.ipynb", io.BytesIO(b"new"))
+
+            # A read after the write does not join the fetch started before it
+            assert await storage.download_notebook("notebooks/a.ipynb") == b"new"
+            release.set()
+            assert await stale_read == b"old"
+
+        assert cache.get("nbforge/notebooks/a.ipynb") == (b"new", '"e2"')
+
+class TestCacheFreshness:
+    def _s3(self, etag='"e1"', content=b'{"cells": []}'):
+        s3 = MagicMock()
+        body = MagicMock()
+        body.read.return_value = content
+        s3.get_object.return_value = {"Body": body, "ETag": etag}
+        s3.head_object.return_value = {"ETag": etag}
+        return s3
+
+    @pytest.mark.asyncio
+    async def test_fresh_entry_is_served_without_head(self):
+        s3 = self._s3()
+        with patch('app.services.storage.s3_storage.get_s3_client', return_value=s3):
+            storage = S3Storage(bucket="nbforge", cache=LRUCache(), inflight=SingleFlight(), fresh_seconds=60)
+            await storage.download_notebook("notebooks/a.ipynb")
+            await storage.download_notebook("notebooks/a.ipynb")
+
+        s3.head_object.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_served_and_refreshed_in_background(self):
+        s3 = self._s3()
+        cache = LRUCache()
+        with patch('app.services.storage.s3_storage.get_s3_client', return_value=s3):
+            storage = S3Storage(bucket="nbforge", cache=cache, inflight=SingleFlight(),
+                                fresh_seconds=0, stale_while_revalidate=True)
+            await storage.download_notebook("notebooks/a.ipynb")
+
+            # The template changes in S3 after it was cached
+            updated = MagicMock()
+            updated.read.return_value = b'{"cells": [1]}'
+            s3.get_object.return_value = {"Body": updated, "ETag": '"e2"'}
+            s3.head_object.return_value = {"ETag": '"e2"'}
+
+            assert await storage.download_notebook("notebooks/a.ipynb") == b'{"cells": []}'
+            for _ in range(20):
+                if cache.get("nbforge/notebooks/a.ipynb")[1] == '"e2"':
+                    break
+                await asyncio.sleep(0.01)
+
+        assert cache.get("nbforge/notebooks/a.ipynb") == (b'{"cells": [1]}', '"e2"')
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_revalidated_before_serving_without_swr(self):
+        s3 = self._s3()
+        with patch('app.services.storage.s3_storage.get_s3_client', return_value=s3):
+            storage = S3Storage(bucket="nbforge", cache=LRUCache(), inflight=SingleFlight(),
+                                fresh_seconds=0, stale_while_revalidate=False)
+            await storage.download_notebook("notebooks/a.ipynb")
+            await storage.download_notebook("notebooks/a.ipynb")
+
+        s3.head_object.assert_called_once()
+        assert s3.get_object.call_count == 1
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from app.services.storage.interface import BaseStorageService
+
+class SlowStorage(BaseStorageService):
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def download_notebook(self, path):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if path == "broken.ipynb":
+            raise RuntimeError("missing")
+        return path.encode("utf-8")
+
+    async def list_notebooks(self, prefix=""):
+        return []
+
+    async def read_notebook(self, path):
+        raise NotImplementedError
+
+    async def write_notebook(self, path, content):
+        raise NotImplementedError
+
+    async def delete_notebook(self, path):
+        raise NotImplementedError
+
+    async def get_presigned_url(self, path, expires_in=3600):
+        raise NotImplementedError
+
+class TestDownloadNotebooks:
+    @pytest.mark.asyncio
+    async def test_downloads_concurrently_up_to_the_limit(self):
+        storage = SlowStorage()
+        paths = [f"{i}.ipynb" for i in range(20)]
+
+        contents = await storage.download_notebooks(paths, limit=4)
+
+        assert contents == [path.encode("utf-8") for path in paths]
+        assert storage.max_in_flight == 4
+
+    @pytest.mark.asyncio
+    async def test_returns_failures_in_place(self):
+        storage = SlowStorage()
+
+        contents = await storage.download_notebooks(["a.ipynb", "broken.ipynb"], return_exceptions=True)
+
+        assert contents[0] == b"a.ipynb"
+        assert isinstance(contents[1], RuntimeError)
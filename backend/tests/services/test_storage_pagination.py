@@ -0,0 +1,75 @@
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from app.services.storage.interface import InvalidContinuationTokenError, encode_continuation_token
+from app.services.storage.memory_storage import InMemoryStorage
+from app.services.storage.s3_storage import S3Storage
+
+def page(keys, next_token=None):
+    response = {
+        "Contents": [{"Key": key, "LastModified": datetime(2025, 1, 1), "Size": 1, "ETag": f'"{key}"'} for key in keys],
+        "IsTruncated": next_token is not None,
+    }
+    if next_token:
+        response["NextContinuationToken"] = next_token
+    return response
+
+class TestS3Pagination:
+    @pytest.fixture
+    def s3(self):
+        s3 = MagicMock()
+        pages = {
+            None: page(["n/a.ipynb", "n/readme.md"], "t/1+=="),
+            "t/1+==": page(["n/b.ipynb"], "t/2"),
+            "t/2": page(["n/c.ipynb"]),
+        }
+        s3.list_objects_v2.side_effect = lambda **kwargs: pages[kwargs.get("ContinuationToken")]
+        return s3
+
+    @pytest.mark.asyncio
+    async def test_list_notebooks_follows_truncated_responses(self, s3):
+        with patch('app.services.storage.s3_storage.get_s3_client', return_value=s3):
+            notebooks = await S3Storage(bucket="nbforge").list_notebooks("n/")
+
+        assert [notebook["path"] for notebook in notebooks] == ["n/a.ipynb", "n/b.ipynb", "n/c.ipynb"]
+        assert s3.list_objects_v2.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_continuation_token_is_opaque_and_round_trips(self, s3):
+        with patch('app.services.storage.s3_storage.get_s3_client', return_value=s3):
+            storage = S3Storage(bucket="nbforge")
+            first, token = await storage.list_notebooks_page("n/", page_size=2)
+            second, token = await storage.list_notebooks_page("n/", page_size=2, continuation_token=token)
+
+        assert [notebook["path"] for notebook in first] == ["n/a.ipynb"]
+        assert [notebook["path"] for notebook in second] == ["n/b.ipynb"]
+        assert token is not None and "/" not in token and "+" not in token
+        assert s3.list_objects_v2.call_args.kwargs["MaxKeys"] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalid_continuation_token_is_rejected(self, s3):
+        with patch('app.services.storage.s3_storage.get_s3_client', return_value=s3):
+            with pytest.raises(ValueError):
+                await S3Storage(bucket="nbforge").list_notebooks_page("n/", continuation_token="!!!")
+
+class TestDefaultPagination:
+    @pytest.fixture
+    def storage(self):
+        storage = InMemoryStorage()
+        for name in "abc":
+            storage.put_object(f"n/{name}.ipynb", b"{}")
+        return storage
+
+    @pytest.mark.asyncio
+    async def test_pages_by_offset(self, storage):
+        first, token = await storage.list_notebooks_page("n/", page_size=2)
+        second, token = await storage.list_notebooks_page("n/", page_size=2, continuation_token=token)
+
+        assert [notebook["path"] for notebook in first + second] == ["n/a.ipynb", "n/b.ipynb", "n/c.ipynb"]
+        assert token is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("offset", ["next", "-1", "1.5"])
+    async def test_token_without_an_offset_is_rejected(self, storage, offset):
+        with pytest.raises(InvalidContinuationTokenError):
+            await storage.list_notebooks_page("n/", continuation_token=encode_continuation_token(offset))
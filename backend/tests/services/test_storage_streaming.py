@@ -0,0 +1,112 @@
+import io
+import pytest
+from unittest.mock import MagicMock, patch
+from botocore.exceptions import ClientError
+from app.services.storage.interface import STREAM_CHUNK_SIZE, RangeNotSatisfiableError, parse_byte_range
+from app.services.storage.s3_storage import S3Storage
+from tests.services.test_notebook_index import FakeStorage
+
+def client_error(code, headers=None):
+    return ClientError(
+        {"Error": {"Code": code}, "ResponseMetadata": {"HTTPHeaders": headers or {}}},
+        "GetObject"
+    )
+
+async def collect(stream):
+    return b"".join([chunk async for chunk in stream.body])
+
+class TestByteRanges:
+    @pytest.mark.parametrize("header,expected", [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=900-", (900, 999)),
+        ("bytes=-100", (900, 999)),
+        ("bytes=950-2000", (950, 999)),
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+        (None, None),
+    ])
+    def test_parse_byte_range(self, header, expected):
+        assert parse_byte_range(header, 1000) == expected
+
+    def test_range_outside_object_is_rejected(self):
+        with pytest.raises(RangeNotSatisfiableError):
+            parse_byte_range("bytes=1000-", 1000)
+
+class TestS3OpenObject:
+    @pytest.fixture
+    def s3(self):
+        with patch('app.services.storage.s3_storage.get_s3_client') as get_client:
+            yield get_client.return_value
+
+    @pytest.mark.asyncio
+    async def test_body_is_streamed_in_chunks_and_closed(self, s3):
+        size = 2 * STREAM_CHUNK_SIZE + 500
+        body = MagicMock(wraps=io.BytesIO(b"x" * size))
+        s3.get_object.return_value = {"Body": body, "ContentLength": size, "ETag": '"abc"'}
+
+        stream = await S3Storage(bucket="nbforge").open_object("out/report.html")
+        chunks = [chunk async for chunk in stream.body]
+
+        assert [len(chunk) for chunk in chunks] == [STREAM_CHUNK_SIZE, STREAM_CHUNK_SIZE, 500]
+        assert stream.content_length == size
+        assert stream.etag == '"abc"'
+        body.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_range_and_etag_are_passed_to_s3(self, s3):
+        s3.get_object.return_value = {
+            "Body": io.BytesIO(b"0123456789"),
+            "ContentLength": 10,
+            "ContentRange": "bytes 0-9/100",
+        }
+
+        stream = await S3Storage(bucket="nbforge").open_object(
+            "out/report.html", byte_range="bytes=0-9", if_none_match='"old"'
+        )
+
+        kwargs = s3.get_object.call_args.kwargs
+        assert kwargs["Range"] == "bytes=0-9"
+        assert kwargs["IfNoneMatch"] == '"old"'
+        assert stream.content_range == "bytes 0-9/100"
+
+    @pytest.mark.asyncio
+    async def test_multiple_ranges_are_not_forwarded(self, s3):
+        s3.get_object.return_value = {"Body": io.BytesIO(b""), "ContentLength": 0}
+
+        await S3Storage(bucket="nbforge").open_object("out/report.html", byte_range="bytes=0-1,4-5")
+
+        assert "Range" not in s3.get_object.call_args.kwargs
+
+    @pytest.mark.asyncio
+    async def test_not_modified(self, s3):
+        s3.get_object.side_effect = client_error("304", {"etag": '"abc"'})
+
+        stream = await S3Storage(bucket="nbforge").open_object("out/report.html", if_none_match='"abc"')
+
+        assert stream.not_modified
+        assert stream.body is None
+        assert stream.etag == '"abc"'
+
+    @pytest.mark.asyncio
+    async def test_errors_are_translated(self, s3):
+        storage = S3Storage(bucket="nbforge")
+
+        s3.get_object.side_effect = client_error("NoSuchKey")
+        with pytest.raises(FileNotFoundError):
+            await storage.open_object("out/missing.html")
+
+        s3.get_object.side_effect = client_error("InvalidRange")
+        with pytest.raises(RangeNotSatisfiableError):
+            await storage.open_object("out/report.html", byte_range="bytes=500-")
+
+class TestDefaultOpenObject:
+    @pytest.mark.asyncio
+    async def test_default_serves_ranges_from_downloaded_content(self):
+        storage = FakeStorage()
+        storage.download_notebook.side_effect = lambda path: b"0123456789"
+
+        stream = await storage.open_object("n/a.ipynb", byte_range="bytes=2-4")
+
+        assert await collect(stream) == b"234"
+        assert stream.content_length == 3
+        assert stream.content_range == "bytes 2-4/10"
@@ -0,0 +1,149 @@
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app.models import Execution, ExecutionQueueItem
+from app.crud import execution_queue
+from app.services.batch_executors.warm_pool_executor import WarmPoolExecutor, desired_workers
+
+@pytest.fixture
+def db(db):
+    for i in range(3):
+        db.add(Execution(id=f"exec-{i}", notebook_path="notebooks/report.ipynb", status="pending"))
+    db.commit()
+    return db
+
+@pytest.fixture
+def executor(db):
+    executor = WarmPoolExecutor.__new__(WarmPoolExecutor)
+    executor.namespace = "default"
+    executor.db = db
+    executor.apps_v1 = MagicMock()
+    executor.apps_v1.read_namespaced_deployment_scale.return_value = SimpleNamespace(spec=SimpleNamespace(replicas=1))
+    return executor
+
+def scaled_to(executor):
+    return executor.apps_v1.patch_namespaced_deployment_scale.call_args[0][2]["spec"]["replicas"]
+
+class TestExecutionQueue:
+    def test_claims_oldest_unclaimed_execution(self, db):
+        for i in range(2):
+            execution_queue.enqueue(db, execution_id=f"exec-{i}", payload={})
+
+        assert execution_queue.claim(db, worker_id="worker-a", lease_seconds=60).execution_id == "exec-0"
+        assert execution_queue.claim(db, worker_id="worker-b", lease_seconds=60).execution_id == "exec-1"
+        assert execution_queue.claim(db, worker_id="worker-c", lease_seconds=60) is None
+        assert execution_queue.depth(db) == (0, 2)
+
+    def test_expired_claims_are_handed_out_again_until_started(self, db):
+        execution_queue.enqueue(db, execution_id="exec-0", payload={})
+        execution_queue.enqueue(db, execution_id="exec-1", payload={})
+        claimed = [execution_queue.claim(db, worker_id="lost-worker", lease_seconds=60) for _ in range(2)]
+        for item in claimed:
+            item.claimed_at = datetime.utcnow() - timedelta(seconds=120)
+        db.commit()
+        execution_queue.mark_started(db, "exec-1")
+
+        item = execution_queue.claim(db, worker_id="worker-b", lease_seconds=60)
+        assert (item.execution_id, item.claimed_by, item.attempts) == ("exec-0", "worker-b", 2)
+        assert execution_queue.claim(db, worker_id="worker-c", lease_seconds=60) is None
+
+    def test_started_executions_without_heartbeat_are_failed(self, db):
+        for i in range(2):
+            execution_queue.enqueue(db, execution_id=f"exec-{i}", payload={})
+            execution_queue.claim(db, worker_id=f"worker-{i}", lease_seconds=60)
+            execution_queue.mark_started(db, f"exec-{i}")
+        db.query(ExecutionQueueItem).update({"claimed_at": datetime.utcnow() - timedelta(seconds=120)})
+        db.commit()
+
+        # Only the worker holding the claim renews it
+        assert not execution_queue.heartbeat(db, "exec-0", worker_id="worker-1")
+        assert execution_queue.heartbeat(db, "exec-1", worker_id="worker-1")
+
+        assert execution_queue.expire_runs(db, lease_seconds=60) == ["exec-0"]
+        execution = db.get(Execution, "exec-0")
+        assert execution.status == "failed" and "stopped responding" in execution.error
+        assert execution_queue.depth(db) == (0, 1)
+        assert execution_queue.expire_runs(db, lease_seconds=60) == []
+
+class TestScaling:
+    @pytest.mark.parametrize("queued,claimed,current,expected", [
+        (0, 0, 3, 1),    # idle pool shrinks to the minimum
+        (4, 1, 1, 5),    # grows with queued and running executions
+        (30, 0, 2, 10),  # capped at the maximum
+        (0, 1, 4, 4),    # never shrinks under a running execution
+    ])
+    def test_desired_workers(self, queued, claimed, current, expected):
+        with patch.multiple("app.services.batch_executors.warm_pool_executor.settings",
+                            WARM_POOL_MIN_WORKERS=1, WARM_POOL_MAX_WORKERS=10, WARM_POOL_EXECUTIONS_PER_WORKER=1):
+            assert desired_workers(queued, claimed, current) == expected
+
+class TestWarmPoolExecutor:
+    @pytest.mark.asyncio
+    async def test_create_job_queues_execution_and_scales_up(self, executor, db):
+        for i in range(2):
+            await executor.create_job(
+                notebook_path="notebooks/report.ipynb",
+                parameters={"n": i},
+                python_version="3.12",
+                job_name=f"exec-{i}",
+                callback_token="token",
+                notebook_content=b'{"cells": []}'
+            )
+
+        item = execution_queue.get(db, "exec-1")
+        assert item.payload["parameters"] == {"n": 1}
+        assert item.payload["output_path"] == "outputs/exec-1"
+        assert item.notebook_content == b'{"cells": []}'
+        assert scaled_to(executor) == 2
+
+    @pytest.mark.asyncio
+    async def test_status_reports_track_the_queue(self, executor, db):
+        execution_queue.enqueue(db, execution_id="exec-0", payload={})
+        execution_queue.claim(db, worker_id="worker-a", lease_seconds=60)
+
+        await executor.job_status_changed("exec-0", "running")
+        assert (await executor.get_job_status("exec-0"))["status"] == "running"
+
+        await executor.job_status_changed("exec-0", "completed")
+        assert db.query(ExecutionQueueItem).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_cancel_removes_queued_execution(self, executor, db):
+        execution_queue.enqueue(db, execution_id="exec-0", payload={})
+
+        assert await executor.cancel_job("notebook-execution-exec-0")
+        assert not await executor.cancel_job("notebook-execution-exec-0")
+        assert execution_queue.claim(db, worker_id="worker-a", lease_seconds=60) is None
+
+    @pytest.mark.asyncio
+    async def test_batch_is_queued_with_one_rescale(self, executor, db):
+        results = await executor.create_jobs([
+            {"notebook_path": "notebooks/report.ipynb", "parameters": {"i": i}, "python_version": "3.12",
+             "job_name": f"exec-{i}", "callback_token": "token"}
+            for i in range(3)
+        ])
+
+        assert results == ["exec-0", "exec-1", "exec-2"]
+        assert execution_queue.depth(db) == (3, 0)
+        assert execution_queue.get(db, "exec-1").payload["parameters"] == {"i": 1}
+        executor.apps_v1.read_namespaced_deployment_scale.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_bulk_cancel_removes_queued_executions_at_once(self, executor, db):
+        for i in range(2):
+            execution_queue.enqueue(db, execution_id=f"exec-{i}", payload={})
+
+        results = await executor.cancel_jobs(["notebook-execution-exec-0", "exec-1", "exec-2"])
+
+        assert results == {"notebook-execution-exec-0": True, "exec-1": True, "exec-2": False}
+        assert execution_queue.depth(db) == (0, 0)
+        executor.apps_v1.read_namespaced_deployment_scale.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_scaling_failures_do_not_fail_the_execution(self, executor, db):
+        executor.apps_v1.read_namespaced_deployment_scale.side_effect = Exception("forbidden")
+
+        await executor.create_job(notebook_path="notebooks/report.ipynb", parameters={},
+                                  python_version="3.12", job_name="exec-0", callback_token="token")
+        assert execution_queue.depth(db) == (1, 0)
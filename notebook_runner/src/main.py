@@ -21,10 +21,32 @@ import nbformat
 from nbconvert.preprocessors import ExecutePreprocessor
 from nbconvert import HTMLExporter
 import papermill as pm
+from papermill.clientwrap import PapermillNotebookClient
+from papermill.engines import NBClientEngine, papermill_engines
+from papermill.log import logger as papermill_logger
 import boto3
+from boto3.s3.transfer import TransferConfig
+from boto3.exceptions import S3UploadFailedError
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 import time
 import datetime
+import gzip
+import shutil
+import base64
+import socket
+import threading
+import atexit
+import hashlib
+import re
+import tarfile
+from contextlib import contextmanager
+from jupyter_client.manager import KernelManager
+
+try:
+    import zstandard
+except ImportError:  # zstd output compression is optional
+    zstandard = None
 
 # Configure logging
 logging.basicConfig(
@@ -43,10 +65,30 @@ def parse_args():
     parser.add_argument('--python-version', default='3.10', help='Python version to use')
     parser.add_argument('--requirements', default='{}', help='JSON string of requirements')
     parser.add_argument('--job-id', required=False, help='Unique job identifier')
+    parser.add_argument('--worker', action='store_true', help='Run as a warm-pool worker that claims jobs from the API')
     return parser.parse_args()
 
 
-def get_s3_client():
+MB = 1024 * 1024
+
+
+def get_transfer_config():
+    """
+    Get the S3 transfer settings from environment variables
+    
+    Files larger than S3_MULTIPART_THRESHOLD_MB are transferred in parts of
+    S3_MULTIPART_CHUNKSIZE_MB, with up to S3_MAX_CONCURRENCY parts in flight
+    per file.
+    """
+    return TransferConfig(
+        multipart_threshold=int(os.environ.get('S3_MULTIPART_THRESHOLD_MB', '8')) * MB,
+        multipart_chunksize=int(os.environ.get('S3_MULTIPART_CHUNKSIZE_MB', '8')) * MB,
+        max_concurrency=int(os.environ.get('S3_MAX_CONCURRENCY', '10')),
+        use_threads=True
+    )
+
+
+def get_s3_client(transfer_config=None):
     """Create and configure S3 client from environment variables"""
     # Check both naming conventions for S3 credentials
     aws_access_key_id = os.environ.get('AWS_ACCESS_KEY_ID')
@@ -61,7 +103,11 @@ def get_s3_client():
     s3_config = {
         'aws_access_key_id': aws_access_key_id,
         'aws_secret_access_key': aws_secret_access_key,
-        'config': boto3.session.Config(signature_version='s3v4')
+        # Enough pooled connections for the parts of all artifacts uploaded at once
+        'config': boto3.session.Config(
+            signature_version='s3v4',
+            max_pool_connections=max(10, (transfer_config or get_transfer_config()).max_concurrency * 2)
+        )
     }
     
     # Add endpoint URL for MinIO or custom S3 endpoints
@@ -76,7 +122,7 @@ def get_s3_client():
         sys.exit(1)
 
 
-def download_notebook_from_s3(s3_client, bucket, notebook_path, local_path):
+def download_notebook_from_s3(s3_client, bucket, notebook_path, local_path, transfer_config=None):
     """Download notebook from S3 bucket to local filesystem"""
     logger.info(f"Downloading notebook from s3://{bucket}/{notebook_path} to {local_path}")
     
@@ -85,28 +131,143 @@ def download_notebook_from_s3(s3_client, bucket, notebook_path, local_path):
         os.makedirs(os.path.dirname(local_path), exist_ok=True)
         
         # Download notebook from S3
-        s3_client.download_file(bucket, notebook_path, local_path)
+        s3_client.download_file(bucket, notebook_path, local_path, Config=transfer_config)
         logger.info(f"Successfully downloaded notebook: {local_path}")
         return True
     except ClientError as e:
         logger.error(f"Failed to download notebook from S3: {str(e)}")
-        sys.exit(1)
+        raise RuntimeError(f"Failed to download notebook s3://{bucket}/{notebook_path}: {str(e)}")
 
 
-def upload_to_s3(s3_client, local_path, bucket, s3_key):
-    """Upload a file to S3 bucket"""
+def write_inline_notebook(local_path, content_b64):
+    """Write a notebook received base64-encoded from the API to the local filesystem"""
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    with open(local_path, 'wb') as f:
+        f.write(base64.b64decode(content_b64))
+    logger.info(f"Using inline notebook received with the job")
+
+
+def get_inline_notebook(local_path):
+    """
+    Copy the notebook embedded in the job's ConfigMap to the local filesystem
+    
+    The backend mounts notebooks up to K8S_INLINE_NOTEBOOK_MAX_BYTES at
+    NOTEBOOK_INLINE_PATH; these are the exact bytes it hashed for the execution.
+    
+    Returns:
+        True if the inline notebook was used, False if it has to be downloaded
+    """
+    inline_path = os.environ.get('NOTEBOOK_INLINE_PATH')
+    if not inline_path:
+        return False
+    if not os.path.isfile(inline_path):
+        logger.warning(f"Inline notebook {inline_path} is missing, downloading from S3")
+        return False
+    
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    shutil.copyfile(inline_path, local_path)
+    logger.info(f"Using inline notebook from {inline_path}")
+    return True
+
+
+# Content types of the output artifacts, stored with the objects
+CONTENT_TYPES = {
+    '.html': 'text/html',
+    '.ipynb': 'application/x-ipynb+json',
+}
+
+
+def get_output_compression():
+    """
+    Get the content encoding for output artifacts from OUTPUT_COMPRESSION
+    
+    Supported values are 'gzip' (default), 'zstd' and 'none'. zstd needs the
+    zstandard package and falls back to gzip without it.
+    """
+    compression = os.environ.get('OUTPUT_COMPRESSION', 'gzip').lower()
+    if compression in ('none', 'identity', ''):
+        return None
+    if compression == 'zstd':
+        if zstandard is None:
+            logger.warning("OUTPUT_COMPRESSION=zstd requires the zstandard package, using gzip")
+            return 'gzip'
+        return 'zstd'
+    if compression != 'gzip':
+        logger.warning(f"Unknown OUTPUT_COMPRESSION {compression}, using gzip")
+    return 'gzip'
+
+
+def compress_file(local_path, encoding):
+    """
+    Compress a file with the given content encoding
+    
+    Returns:
+        Path of the compressed file, next to the original
+    """
+    local_path = Path(local_path)
+    compressed_path = local_path.with_name(f"{local_path.name}.{'zst' if encoding == 'zstd' else 'gz'}")
+    with open(local_path, 'rb') as source, open(compressed_path, 'wb') as target:
+        if encoding == 'zstd':
+            zstandard.ZstdCompressor(level=10).copy_stream(source, target)
+        else:
+            with gzip.GzipFile(fileobj=target, mode='wb', compresslevel=6, mtime=0) as compressed:
+                shutil.copyfileobj(source, compressed)
+    
+    original_size = local_path.stat().st_size
+    compressed_size = compressed_path.stat().st_size
+    logger.info(f"Compressed {local_path.name} with {encoding}: {original_size} -> {compressed_size} bytes")
+    return compressed_path
+
+
+def upload_to_s3(s3_client, local_path, bucket, s3_key, content_encoding=None, transfer_config=None):
+    """
+    Upload a file to S3 bucket
+    
+    With a content_encoding the file is compressed before the upload and stored
+    under the same key with Content-Encoding metadata, so clients that accept the
+    encoding receive it as is and the API decompresses it for the others.
+    """
     logger.info(f"Uploading {local_path} to s3://{bucket}/{s3_key}")
     
+    extra_args = {}
+    content_type = CONTENT_TYPES.get(Path(local_path).suffix)
+    if content_type:
+        extra_args['ContentType'] = content_type
+    
     try:
-        s3_client.upload_file(local_path, bucket, s3_key)
+        if content_encoding:
+            local_path = str(compress_file(local_path, content_encoding))
+            extra_args['ContentEncoding'] = content_encoding
+        s3_client.upload_file(local_path, bucket, s3_key, ExtraArgs=extra_args or None, Config=transfer_config)
         logger.info(f"Successfully uploaded to s3://{bucket}/{s3_key}")
         return True
-    except ClientError as e:
+    except (ClientError, S3UploadFailedError, OSError) as e:
         logger.error(f"Failed to upload to S3: {str(e)}")
         return False
 
 
-def report_status(status, job_id, details=None):
+def upload_artifacts_to_s3(s3_client, artifacts, bucket, content_encoding=None, transfer_config=None):
+    """
+    Upload several files to S3 at the same time
+    
+    Each file is compressed and uploaded in its own thread, and large files are
+    additionally split into parts according to transfer_config.
+    
+    Args:
+        artifacts: List of (local_path, s3_key) tuples
+        
+    Returns:
+        List of upload results in the order of artifacts
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(artifacts))) as executor:
+        futures = [
+            executor.submit(upload_to_s3, s3_client, str(local_path), bucket, s3_key, content_encoding, transfer_config)
+            for local_path, s3_key in artifacts
+        ]
+        return [future.result() for future in futures]
+
+
+def report_status(status, job_id, details=None, callback_token=None):
     """
     Report job status to backend API
     
@@ -118,7 +279,7 @@ def report_status(status, job_id, details=None):
     These status updates are sent back to the API and recorded in the database.
     """
     api_url = os.environ.get('API_URL')
-    callback_token = os.environ.get('CALLBACK_TOKEN')
+    callback_token = callback_token or os.environ.get('CALLBACK_TOKEN')
     
     if not api_url:
         logger.warning("API_URL not set. Skipping status reporting.")
@@ -182,40 +343,83 @@ def report_status(status, job_id, details=None):
             else:
                 return False
 
+# Kernel name and interpreter of each installed Python version
+PYTHON_ENVIRONMENTS = {
+    '3.10': ('python3.10', '/home/nbforge/venv310/bin/python'),
+    '3.12': ('python3.12', '/home/nbforge/venv312/bin/python'),
+}
+
+
 def select_python_environment(python_version):
     """Select the appropriate Jupyter kernel based on version
     
     The values need to match the available kernels installed in the Dockerfile.
     The backend should also be updated to request only one of the available kernels.
     """
-    version_map = {
-        '3.10': ('python3.10', '/home/nbforge/venv310/bin/python'),
-        '3.12': ('python3.12', '/home/nbforge/venv312/bin/python'),
-    }
-    
     # Default to the latest version if not found
-    kernel_name, python_path = version_map.get(python_version, ('python3.10', '/home/nbforge/venv310/bin/python'))
+    kernel_name, python_path = PYTHON_ENVIRONMENTS.get(python_version, PYTHON_ENVIRONMENTS['3.10'])
     
     return kernel_name, python_path
 
 
-def install_requirements(requirements, python_path):
-    """Install custom requirements using the selected Python environment"""
-    if not requirements:
-        return
+# Bump to invalidate every cached requirement environment
+ENV_CACHE_FORMAT = 1
+ENV_COMPLETE_MARKER = '.nbforge-complete'
+
+
+def requirement_lines(requirements):
+    """
+    Normalised, sorted pip requirement lines for a {package: version} mapping
     
-    logger.info(f"Installing custom requirements: {requirements}")
+    Versions are either '*' for any version, an exact version, or a specifier
+    such as '>=1.3.0'.
+    """
+    lines = []
+    for package, version in requirements.items():
+        name = re.sub(r'[-_.]+', '-', package).lower()
+        version = (version or '').strip()
+        if not version or version == '*':
+            lines.append(name)
+        elif version[0] in '<>=!~':
+            lines.append(f"{name}{version}")
+        else:
+            lines.append(f"{name}=={version}")
+    return sorted(lines)
+
+
+def requirements_key(lines, python_path):
+    """
+    Content address of a requirement environment
+    
+    Covers the exact interpreter build and platform as well as the requirement
+    lines, so an image with a different Python never picks up incompatible wheels.
+    """
+    interpreter = subprocess.check_output(
+        [python_path, '-c', 'import sys, platform; print(sys.version, platform.machine(), platform.libc_ver())'],
+        text=True
+    ).strip()
+    spec = {'format': ENV_CACHE_FORMAT, 'interpreter': interpreter, 'requirements': sorted(lines)}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def install_requirements(lines, python_path, target_dir, locked=False):
+    """
+    Install requirement lines for the selected Python environment into target_dir
+    
+    A lock resolved by the API already lists every dependency at an exact
+    version, so it is installed without resolving again.
+    """
+    logger.info(f"Installing {'locked' if locked else 'custom'} requirements: {lines}")
     with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as tmp:
-        for package, version in requirements.items():
-            if version == '*':
-                tmp.write(f"{package}\n")
-            else:
-                tmp.write(f"{package}=={version}\n")
+        tmp.write("\n".join(lines) + "\n")
         tmp_path = tmp.name
     
     try:
-        # Install requirements using the selected Python environment
-        cmd = [python_path, '-m', 'pip', 'install', '-r', tmp_path]
+        # --target installs the requirements with all their dependencies, outside the shared venv
+        cmd = [python_path, '-m', 'pip', 'install', '--disable-pip-version-check', '--no-warn-script-location',
+               '--target', str(target_dir), '-r', tmp_path]
+        if locked:
+            cmd.append('--no-deps')
         logger.info(f"Running: {' '.join(cmd)}")
         subprocess.check_call(cmd)
     except subprocess.CalledProcessError as e:
@@ -225,8 +429,287 @@ def install_requirements(requirements, python_path):
         os.unlink(tmp_path)
 
 
-def execute_notebook(notebook_path, output_path, parameters, kernel_name):
-    """Execute notebook with parameters using papermill"""
+def download_environment(s3_client, bucket, s3_key, target_dir, transfer_config=None):
+    """Unpack a prebuilt environment from S3 into target_dir; returns False if there is none"""
+    archive = Path(target_dir).with_suffix('.tar.gz')
+    try:
+        s3_client.download_file(bucket, s3_key, str(archive), Config=transfer_config)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey'):
+            logger.warning(f"Failed to download environment s3://{bucket}/{s3_key}: {str(e)}")
+        return False
+    try:
+        with tarfile.open(archive, 'r:gz') as tar:
+            if hasattr(tarfile, 'data_filter'):
+                tar.extractall(target_dir, filter='data')
+            else:
+                tar.extractall(target_dir)
+        return True
+    finally:
+        archive.unlink(missing_ok=True)
+
+
+def upload_environment(s3_client, bucket, s3_key, env_dir, transfer_config=None):
+    """Archive a built environment to S3 for other pods; failures only cost them a rebuild"""
+    archive = Path(env_dir).with_suffix('.tar.gz')
+    try:
+        with tarfile.open(archive, 'w:gz') as tar:
+            tar.add(env_dir, arcname='.')
+        upload_to_s3(s3_client, archive, bucket, s3_key, transfer_config=transfer_config)
+    except Exception as e:
+        logger.warning(f"Failed to upload environment to s3://{bucket}/{s3_key}: {str(e)}")
+    finally:
+        archive.unlink(missing_ok=True)
+
+
+def prepare_requirements_environment(requirements, python_path, s3_client=None, bucket=None, transfer_config=None,
+                                     requirements_lock=None):
+    """
+    Directory with the custom requirements installed, built once per requirement set
+    
+    Environments are keyed by requirements_key(). They are looked up in
+    ENV_CACHE_DIR (a node-local volume shared by runner pods, or the pod's own
+    disk), then under ENV_CACHE_PREFIX in the S3 bucket, and only built with pip
+    when neither has them; a new build is uploaded for the next pod. With a
+    requirements_lock from the API the environment is keyed by and built from
+    the lock. Otherwise unpinned requirements resolve to the versions current
+    when the environment was first built.
+    
+    Returns:
+        Directory to put on the kernel's PYTHONPATH, or None without requirements
+    """
+    if not requirements and not requirements_lock:
+        return None
+    
+    lines = requirements_lock or requirement_lines(requirements)
+    key = requirements_key(lines, python_path)
+    cache_dir = Path(os.environ.get('ENV_CACHE_DIR', '/tmp/nbforge-envs'))
+    env_dir = cache_dir / key
+    if (env_dir / ENV_COMPLETE_MARKER).exists():
+        logger.info(f"Using cached requirements environment {key}")
+        return env_dir
+    
+    prefix = os.environ.get('ENV_CACHE_PREFIX', 'envs').strip('/')
+    s3_key = f"{prefix}/{key}.tar.gz" if prefix and s3_client is not None and bucket else None
+    
+    # Build next to the final location and move it into place once complete, so
+    # pods sharing the cache never see a partial environment
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    build_dir = Path(tempfile.mkdtemp(prefix=f".build-{key[:12]}-", dir=cache_dir))
+    try:
+        if s3_key and download_environment(s3_client, bucket, s3_key, build_dir, transfer_config):
+            logger.info(f"Unpacked requirements environment {key} from s3://{bucket}/{s3_key}")
+        else:
+            install_requirements(lines, python_path, build_dir, locked=bool(requirements_lock))
+            if s3_key:
+                upload_environment(s3_client, bucket, s3_key, build_dir, transfer_config)
+        (build_dir / ENV_COMPLETE_MARKER).touch()
+        try:
+            os.rename(build_dir, env_dir)
+        except OSError:
+            # Another pod on the node finished the same environment first
+            if not (env_dir / ENV_COMPLETE_MARKER).exists():
+                raise
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    return env_dir
+
+
+@contextmanager
+def kernel_python_path(env_dir):
+    """Put a requirements environment in front of the venv for kernels started inside the block"""
+    if env_dir is None:
+        yield
+        return
+    previous = os.environ.get('PYTHONPATH')
+    os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [str(env_dir), previous]))
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop('PYTHONPATH', None)
+        else:
+            os.environ['PYTHONPATH'] = previous
+
+
+class PooledKernelEngine(NBClientEngine):
+    """
+    papermill engine running a notebook on a kernel checked out of a KernelPool
+    
+    The client takes ownership of the kernel, so nbclient shuts it down and stops
+    its channels after the run as it does for kernels it starts itself. The kernel
+    is discarded, so it is killed rather than asked to shut down. The exit
+    hook nbclient registers for every run is removed again, so that a long-lived
+    worker does not keep every executed notebook alive.
+    """
+    
+    @classmethod
+    def execute_managed_notebook(cls, nb_man, kernel_name, log_output=False, stdout_file=None,
+                                 stderr_file=None, start_timeout=60, execution_timeout=None, km=None, **kwargs):
+        client = PapermillNotebookClient(
+            nb_man,
+            km=km,
+            timeout=execution_timeout,
+            startup_timeout=start_timeout,
+            kernel_name=kernel_name,
+            log=papermill_logger,
+            log_output=log_output,
+            stdout_file=stdout_file,
+            stderr_file=stderr_file
+        )
+        client.owns_km = True
+        client.shutdown_kernel = "immediate"
+        try:
+            return client.execute()
+        finally:
+            atexit.unregister(client._cleanup_kernel)
+
+
+POOLED_KERNEL_ENGINE = 'nbforge-pooled-kernel'
+papermill_engines.register(POOLED_KERNEL_ENGINE, PooledKernelEngine)
+
+
+class KernelPool:
+    """
+    Pre-started Jupyter kernels for warm-pool workers
+    
+    Keeps `size` idle kernels per kernel name, each with `preload_modules` already
+    imported, so a notebook starts on a kernel that is up and has paid for its
+    heavy imports. The modules are imported silently and bind no names, so the
+    notebook still sees an empty namespace. A kernel runs a single notebook and is
+    shut down afterwards; checking one out starts its replacement in the
+    background while the notebook runs.
+    """
+    
+    def __init__(self, kernel_names, size=1, preload_modules=(), startup_timeout=60):
+        self.size = size
+        self.preload_modules = list(preload_modules)
+        self.startup_timeout = startup_timeout
+        self._idle = {kernel_name: [] for kernel_name in kernel_names}
+        self._starting = {kernel_name: 0 for kernel_name in kernel_names}
+        # Kernels are started in the background while jobs adjust PYTHONPATH
+        self._env = dict(os.environ)
+        self._lock = threading.Lock()
+        self._starter = ThreadPoolExecutor(max_workers=max(len(self._idle), 1), thread_name_prefix='kernel-pool')
+        with self._lock:
+            for kernel_name in self._idle:
+                self._replenish(kernel_name)
+    
+    def _start_kernel(self, kernel_name):
+        """Start a kernel and import the preloaded modules into it"""
+        km = KernelManager(kernel_name=kernel_name)
+        km.start_kernel(env=self._env)
+        kc = km.client()
+        kc.start_channels()
+        try:
+            kc.wait_for_ready(timeout=self.startup_timeout)
+            for module in self.preload_modules:
+                reply = kc.execute_interactive(
+                    f"__import__({module!r})", silent=True, store_history=False,
+                    timeout=self.startup_timeout, output_hook=lambda msg: None
+                )
+                if reply['content']['status'] != 'ok':
+                    logger.warning(f"Failed to preload {module} into {kernel_name} kernel: "
+                                   f"{reply['content'].get('ename')}: {reply['content'].get('evalue')}")
+        except Exception:
+            km.shutdown_kernel(now=True)
+            raise
+        finally:
+            kc.stop_channels()
+        return km
+    
+    def _replenish(self, kernel_name):
+        """Start kernels until idle and starting ones add up to `size`; call with the lock held"""
+        while len(self._idle[kernel_name]) + self._starting[kernel_name] < self.size:
+            self._starting[kernel_name] += 1
+            self._starter.submit(self._add_kernel, kernel_name)
+    
+    def _add_kernel(self, kernel_name):
+        try:
+            km = self._start_kernel(kernel_name)
+        except Exception as e:
+            logger.warning(f"Failed to pre-start a {kernel_name} kernel: {str(e)}")
+            with self._lock:
+                self._starting[kernel_name] -= 1
+            return
+        with self._lock:
+            self._starting[kernel_name] -= 1
+            self._idle[kernel_name].append(km)
+        logger.info(f"Pre-started a {kernel_name} kernel")
+    
+    def checkout(self, kernel_name):
+        """
+        Take an idle kernel and schedule its replacement
+        
+        Nothing is started when no kernel is idle: the kernels being started
+        already make up the pool.
+        
+        Returns:
+            A started KernelManager, or None if no kernel is ready, in which case
+            the caller starts its own
+        """
+        with self._lock:
+            idle = self._idle.get(kernel_name)
+            if idle is None:
+                return None
+            if not idle:
+                return None
+            km = idle.pop(0)
+            self._replenish(kernel_name)
+        if not km.is_alive():
+            logger.warning(f"Discarding a dead {kernel_name} kernel")
+            km.cleanup_resources()
+            return None
+        return km
+    
+    def release(self, km):
+        """Shut down a checked-out kernel if the run did not; kernels are never reused"""
+        try:
+            if km.has_kernel:
+                km.shutdown_kernel(now=True)
+        except Exception as e:
+            logger.warning(f"Failed to shut down kernel: {str(e)}")
+    
+    def close(self):
+        """Shut down all idle kernels"""
+        self._starter.shutdown(wait=True)
+        with self._lock:
+            kernels = [km for idle in self._idle.values() for km in idle]
+            for idle in self._idle.values():
+                idle.clear()
+        for km in kernels:
+            self.release(km)
+
+
+def get_kernel_pool():
+    """
+    Kernel pool configured from the environment, or None if disabled
+    
+    KERNEL_POOL_SIZE idle kernels are kept for each Python version in
+    KERNEL_POOL_PYTHON_VERSIONS (all installed versions by default), with the
+    comma-separated KERNEL_POOL_PRELOAD modules imported.
+    """
+    size = int(os.environ.get('KERNEL_POOL_SIZE', '1'))
+    if size <= 0:
+        return None
+    versions = [v.strip() for v in os.environ.get('KERNEL_POOL_PYTHON_VERSIONS', '').split(',') if v.strip()]
+    if versions:
+        kernel_names = sorted({select_python_environment(version)[0] for version in versions})
+    else:
+        kernel_names = sorted({kernel_name for kernel_name, _ in PYTHON_ENVIRONMENTS.values()})
+    preload = [m.strip() for m in os.environ.get('KERNEL_POOL_PRELOAD', '').split(',') if m.strip()]
+    logger.info(f"Keeping {size} pre-started kernel(s) for {', '.join(kernel_names)}"
+                + (f" with {', '.join(preload)} preloaded" if preload else ""))
+    return KernelPool(kernel_names, size=size, preload_modules=preload)
+
+
+def execute_notebook(notebook_path, output_path, parameters, kernel_name, kernel_manager=None):
+    """
+    Execute notebook with parameters using papermill
+    
+    With a started kernel_manager the notebook runs on that kernel, which is shut
+    down afterwards; otherwise papermill starts its own kernel.
+    """
     logger.info(f"Executing notebook: {notebook_path}")
     
     # Log parameters with their types in detail
@@ -243,12 +726,16 @@ def execute_notebook(notebook_path, output_path, parameters, kernel_name):
     
     try:
         # Execute notebook with papermill
+        engine_kwargs = {}
+        if kernel_manager is not None:
+            engine_kwargs = {'engine_name': POOLED_KERNEL_ENGINE, 'km': kernel_manager}
         pm.execute_notebook(
             notebook_path,
             output_path,
             parameters=parameters,
             kernel_name=kernel_name,
-            prepare_only=False
+            prepare_only=False,
+            **engine_kwargs
         )
         logger.info(f"Notebook executed successfully. Output saved to: {output_path}")
         return True
@@ -302,6 +789,87 @@ def extract_outputs(notebook_path):
     return outputs
 
 
+def run_job(job_id, notebook_path_s3, parameters, requirements, python_version, output_dir,
+            s3_client, s3_bucket, s3_output_path, transfer_config=None, notebook_content=None,
+            kernel_pool=None, requirements_lock=None):
+    """
+    Execute one notebook and upload its outputs
+    
+    The notebook is taken from notebook_content (base64, sent by the API to warm-pool
+    workers), from the inline file mounted by the job's ConfigMap, or downloaded
+    from S3, in this order. With a kernel_pool the notebook runs on a pre-started
+    kernel, unless it has custom requirements: those are only on the PYTHONPATH
+    of kernels started for the notebook.
+    
+    Returns:
+        Result details to report with the 'completed' status
+    """
+    # Prepare paths
+    local_notebook_dir = '/notebooks'
+    
+    # Use the notebook passed with the job, or download it from S3
+    notebook_name = os.path.basename(notebook_path_s3)
+    local_notebook_path = os.path.join(local_notebook_dir, notebook_name)
+    if notebook_content:
+        write_inline_notebook(local_notebook_path, notebook_content)
+    elif not get_inline_notebook(local_notebook_path):
+        download_notebook_from_s3(s3_client, s3_bucket, notebook_path_s3, local_notebook_path, transfer_config)
+    
+    # Prepare output paths
+    output_dir = Path(output_dir)
+    output_notebook = output_dir / f"output_{notebook_name}"
+    output_html = output_dir / f"{output_notebook.stem}.html"
+    
+    # Select Python environment
+    kernel_name, python_path = select_python_environment(python_version)
+    logger.info(f"Using Python interpreter: {python_path}")
+    
+    # Get the environment with the custom requirements, built once per requirement set
+    env_dir = prepare_requirements_environment(requirements, python_path, s3_client, s3_bucket, transfer_config,
+                                               requirements_lock)
+            
+    # Execute notebook (use parameters directly without validation)
+    kernel_manager = None
+    if kernel_pool is not None and env_dir is None:
+        kernel_manager = kernel_pool.checkout(kernel_name)
+    try:
+        with kernel_python_path(env_dir):
+            execute_notebook(local_notebook_path, output_notebook, parameters, kernel_name, kernel_manager)
+    finally:
+        if kernel_manager is not None:
+            kernel_pool.release(kernel_manager)
+    
+    # Convert to HTML
+    convert_notebook_to_html(output_notebook, output_html)
+    
+    # Output artifacts are mostly text and base64, so they are stored compressed
+    content_encoding = get_output_compression()
+    
+    # Upload notebook and HTML output concurrently
+    output_notebook_s3_key = f"{s3_output_path}/{output_notebook.name}"
+    output_html_s3_key = f"{s3_output_path}/{output_html.name}"
+    notebook_uploaded, html_uploaded = upload_artifacts_to_s3(
+        s3_client,
+        [(output_notebook, output_notebook_s3_key), (output_html, output_html_s3_key)],
+        s3_bucket,
+        content_encoding,
+        transfer_config
+    )
+    # Without the output notebook the execution has no result; the HTML can be regenerated from it
+    if not notebook_uploaded:
+        raise RuntimeError(f"Failed to upload the output notebook to s3://{s3_bucket}/{output_notebook_s3_key}")
+    if not html_uploaded:
+        logger.warning("Failed to upload the HTML output; reporting the execution without it")
+    
+    # Create result details for API
+    return {
+        'output_notebook': f"s3://{s3_bucket}/{output_notebook_s3_key}",
+        'output_html': f"s3://{s3_bucket}/{output_html_s3_key}" if html_uploaded else None,
+        'execution_time': time.time(),
+        'parameters': parameters,
+    }
+
+
 def main():
     """Main entry point for notebook execution"""
     # First try to get configuration from environment variables
@@ -309,6 +877,7 @@ def main():
     notebook_path_s3 = os.environ.get('NOTEBOOK_PATH')
     parameters_json = os.environ.get('PARAMETERS', '{}')
     requirements_json = os.environ.get('REQUIREMENTS', '{}')
+    requirements_lock_json = os.environ.get('REQUIREMENTS_LOCK')
     python_version = os.environ.get('PYTHON_VERSION', '3.10')
     output_dir = os.environ.get('OUTPUT_DIR', '/outputs')
     
@@ -338,6 +907,7 @@ def main():
     try:
         parameters = json.loads(parameters_json)
         requirements = json.loads(requirements_json)
+        requirements_lock = json.loads(requirements_lock_json) if requirements_lock_json else None
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse JSON: {str(e)}")
         sys.exit(1)
@@ -353,39 +923,14 @@ def main():
             sys.exit(1)
         
         # Get S3 client
-        s3_client = get_s3_client()
-        
-        # Prepare paths
-        local_notebook_dir = '/notebooks'
+        transfer_config = get_transfer_config()
+        s3_client = get_s3_client(transfer_config)
         
         # Verify notebook path
         if not notebook_path_s3:
             logger.error("Notebook path must be provided via NOTEBOOK_PATH environment variable or --notebook argument")
             sys.exit(1)
         
-        # Download notebook from S3
-        notebook_name = os.path.basename(notebook_path_s3)
-        local_notebook_path = os.path.join(local_notebook_dir, notebook_name)
-        download_notebook_from_s3(s3_client, s3_bucket, notebook_path_s3, local_notebook_path)
-        
-        # Prepare output paths
-        output_dir = Path(output_dir)
-        output_notebook = output_dir / f"output_{notebook_name}"
-        output_html = output_dir / f"{output_notebook.stem}.html"
-        
-        # Select Python environment
-        kernel_name, python_path = select_python_environment(python_version)
-        logger.info(f"Using Python interpreter: {python_path}")
-        
-        # Install custom requirements
-        install_requirements(requirements, python_path)
-                
-        # Execute notebook (use parameters directly without validation)
-        execute_notebook(local_notebook_path, output_notebook, parameters, kernel_name)
-        
-        # Convert to HTML
-        convert_notebook_to_html(output_notebook, output_html)
-        
         # Prepare S3 output path
         s3_output_prefix = os.environ.get('S3_OUTPUT_PREFIX', 'outputs')
         
@@ -397,21 +942,11 @@ def main():
             s3_output_path = f"{s3_output_prefix}/{job_id}"
             logger.info(f"OUTPUT_PATH not set, using: {s3_output_path}")
         
-        # Upload notebook output
-        output_notebook_s3_key = f"{s3_output_path}/{output_notebook.name}"
-        upload_to_s3(s3_client, str(output_notebook), s3_bucket, output_notebook_s3_key)
-        
-        # Upload HTML output
-        output_html_s3_key = f"{s3_output_path}/{output_html.name}"
-        upload_to_s3(s3_client, str(output_html), s3_bucket, output_html_s3_key)
-        
-        # Create result details for API
-        result_details = {
-            'output_notebook': f"s3://{s3_bucket}/{output_notebook_s3_key}",
-            'output_html': f"s3://{s3_bucket}/{output_html_s3_key}",
-            'execution_time': time.time(),
-            'parameters': parameters,
-        }
+        result_details = run_job(
+            job_id, notebook_path_s3, parameters, requirements, python_version, output_dir,
+            s3_client, s3_bucket, s3_output_path, transfer_config,
+            requirements_lock=requirements_lock
+        )
         
         # Report completion
         report_status('completed', job_id, result_details)
@@ -428,5 +963,117 @@ def main():
         report_status('failed', job_id, error_details)
         sys.exit(1)
 
+
+def claim_job(api_url, pool_token, worker_id, wait_seconds):
+    """
+    Ask the API for the next queued execution, waiting up to wait_seconds for one
+    
+    Returns:
+        The job description, or None if the queue stayed empty
+    """
+    response = requests.post(
+        f"{api_url}/runner-pool/claim",
+        params={'wait': wait_seconds},
+        json={'worker_id': worker_id},
+        headers={'X-Pool-Token': pool_token},
+        timeout=wait_seconds + 30
+    )
+    if response.status_code == 204:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+def send_heartbeats(api_url, pool_token, worker_id, job_id, stop, interval_seconds):
+    """
+    Renew the claim of the running execution until stop is set
+
+    The API fails executions whose worker stops sending heartbeats, so a worker
+    killed mid-run does not leave its execution running forever.
+    """
+    while not stop.wait(interval_seconds):
+        try:
+            response = requests.post(
+                f"{api_url}/runner-pool/heartbeat",
+                json={'worker_id': worker_id, 'execution_id': job_id},
+                headers={'X-Pool-Token': pool_token},
+                timeout=10
+            )
+            if response.status_code == 404:
+                logger.info(f"Execution {job_id} is no longer claimed by this worker")
+                return
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Failed to send heartbeat for execution {job_id}: {str(e)}")
+
+
+def run_worker():
+    """
+    Warm-pool worker: claim queued executions from the API and run them one by one
+    
+    The interpreter, papermill and nbconvert stay loaded between jobs, and every
+    notebook still runs in a fresh kernel. Custom requirements live in cached
+    environments outside the venv, so one job's requirements never leak into the
+    next.
+    """
+    api_url = os.environ.get('API_URL')
+    pool_token = os.environ.get('WARM_POOL_TOKEN')
+    s3_bucket = os.environ.get('S3_BUCKET')
+    output_root = os.environ.get('OUTPUT_DIR', '/outputs')
+    wait_seconds = int(os.environ.get('WARM_POOL_CLAIM_WAIT_SECONDS', '20'))
+    heartbeat_seconds = int(os.environ.get('WARM_POOL_HEARTBEAT_SECONDS', '60'))
+    worker_id = os.environ.get('HOSTNAME') or socket.gethostname()
+    
+    if not api_url or not pool_token or not s3_bucket:
+        logger.error("API_URL, WARM_POOL_TOKEN and S3_BUCKET environment variables are required in worker mode")
+        sys.exit(1)
+    
+    transfer_config = get_transfer_config()
+    s3_client = get_s3_client(transfer_config)
+    kernel_pool = get_kernel_pool()
+    logger.info(f"Worker {worker_id} waiting for executions")
+    
+    while True:
+        try:
+            job = claim_job(api_url, pool_token, worker_id, wait_seconds)
+        except Exception as e:
+            logger.warning(f"Failed to claim an execution: {str(e)}")
+            time.sleep(5)
+            continue
+        if job is None:
+            continue
+        
+        job_id = job['execution_id']
+        callback_token = job['callback_token']
+        output_dir = Path(output_root) / job_id
+        logger.info(f"Worker {worker_id} claimed execution {job_id}")
+        stop_heartbeats = threading.Event()
+        threading.Thread(
+            target=send_heartbeats,
+            args=(api_url, pool_token, worker_id, job_id, stop_heartbeats, heartbeat_seconds),
+            daemon=True
+        ).start()
+        try:
+            report_status('running', job_id, {'message': 'Job started'}, callback_token)
+            result_details = run_job(
+                job_id, job['notebook_path'], job.get('parameters') or {}, job.get('requirements') or {},
+                job.get('python_version') or '3.10', output_dir, s3_client,
+                job.get('s3_bucket') or s3_bucket, job['output_path'], transfer_config,
+                notebook_content=job.get('notebook_content'), kernel_pool=kernel_pool,
+                requirements_lock=job.get('requirements_lock')
+            )
+            report_status('completed', job_id, result_details, callback_token)
+            logger.info(f"Execution {job_id} completed successfully.")
+        except Exception as e:
+            logger.error(f"Notebook execution failed: {str(e)}")
+            report_status('failed', job_id, {'error': str(e), 'traceback': str(sys.exc_info())}, callback_token)
+        finally:
+            stop_heartbeats.set()
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    if os.environ.get('RUNNER_MODE') == 'worker' or '--worker' in sys.argv[1:]:
+        run_worker()
+    else:
+        main()